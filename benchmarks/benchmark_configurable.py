@@ -0,0 +1,85 @@
+"""
+Micro-benchmark of the per call overhead of `lib.configurable.configurable`.
+
+Motivation: Hyperparameter sweeps construct thousands of `SeqEncoder`, `SeqToLabel`, `Optimizer`
+and `Adam` instances; every call of a `@configurable` function pays for resolving its
+configuration.
+
+Example:
+    python -m benchmarks.benchmark_configurable --n_calls 100000
+"""
+import argparse
+import logging
+import timeit
+
+from lib.configurable import add_config
+from lib.configurable import clear_config
+from lib.configurable import _function_info
+from lib.configurable import configurable
+
+
+def function(arg, kwarg=None, other_kwarg=None):
+    return arg
+
+
+undecorated = function
+function = configurable(function)
+
+
+class UndecoratedModule(object):
+
+    def __init__(self, arg, kwarg=None, other_kwarg=None):
+        self.arg = arg
+
+
+class Module(object):
+    """ Configurable constructor like `SeqToLabel.__init__`. """
+
+    @configurable
+    def __init__(self, arg, kwarg=None, other_kwarg=None):
+        self.arg = arg
+
+
+def main(n_calls, repeat):
+    # NOTE: The defaults below are typical of `SeqToLabel.__init__`.
+    add_config({
+        __name__: {
+            'function': {
+                'kwarg': 'kwarg',
+                'other_kwarg': 0.5,
+            },
+            'Module.__init__': {
+                'kwarg': 'kwarg',
+                'other_kwarg': 0.5,
+            }
+        }
+    })
+    comparisons = [
+        ('function', undecorated, function),
+        ('constructor', UndecoratedModule, Module),
+    ]
+    for name, baseline_callable, callable_ in comparisons:
+        baseline = None
+        for label, measured in [('undecorated', baseline_callable), ('configurable', callable_)]:
+            seconds = min(timeit.repeat(lambda: measured('arg'), number=n_calls, repeat=repeat))
+            microseconds = seconds / n_calls * 10**6
+            baseline = microseconds if baseline is None else baseline
+            print('%s %s: %.3f µs per call (%.3f µs overhead)' % (label, name, microseconds,
+                                                                  microseconds - baseline))
+    # NOTE: Every instance constructed must share one cache entry.
+    print('@configurable cache entries: %d' % len(_function_info))
+    clear_config()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--n_calls', type=int, default=10000, help='Calls per measurement')
+    parser.add_argument('--repeat', type=int, default=5, help='Measurements; the best is kept')
+    parser.add_argument(
+        '--log_level', default='WARNING', help='Level of the `lib.configurable` logger')
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level)
+    # NOTE: `configurable` keys `__main__` functions by their file; therefore, the benchmark runs
+    # from its importable module.
+    import benchmarks.benchmark_configurable as benchmark
+    benchmark.main(args.n_calls, args.repeat)
@@ -0,0 +1,153 @@
+import logging
+
+from collections import defaultdict
+
+from numpy import nan
+
+from lib.database import iterate_query
+from lib.utils import FB2M_NAME_TABLE
+
+logger = logging.getLogger(__name__)
+
+
+def question_ngrams(tokens, max_n_tokens=None):
+    """ List every contiguous n-gram of `tokens`.
+
+    NOTE: SimpleQuestions questions are short; therefore, this typically yields fewer than 100
+    n-grams.
+
+    Args:
+        tokens (list of str): preprocessed question tokens
+        max_n_tokens (int, optional): maximum number of tokens in an n-gram
+    Returns:
+        (list of tuples): (start_index, end_index) pairs such that `tokens[start_index:end_index]`
+            is an n-gram
+    """
+    n_tokens = len(tokens)
+    max_n_tokens = n_tokens if max_n_tokens is None else min(max_n_tokens, n_tokens)
+    return [(start_index, end_index)
+            for start_index in range(n_tokens)
+            for end_index in range(start_index + 1, min(start_index + max_n_tokens, n_tokens) + 1)]
+
+
+class AliasIndex(object):
+    """ In-memory hash index from a normalized alias to subject MIDs.
+
+    Motivation: `Step 2 - Generate Candidates` falls back through sequential SQL lookups per
+    predicted subject name. If the subject name appears verbatim in the question, one batch of
+    hash lookups over every question n-gram finds it faster.
+
+    Args:
+        rows (iterable of tuples): (mid, normalized alias) pairs
+    """
+
+    def __init__(self, rows):
+        self._index = defaultdict(list)
+        self.max_n_tokens = 0
+        for mid, alias in rows:
+            if alias is None or len(alias.strip()) == 0:
+                continue
+            self._index[alias].append(mid)
+            self.max_n_tokens = max(self.max_n_tokens, len(alias.split()))
+        self._index = dict(self._index)
+        logger.info('Indexed %d aliases with at most %d tokens', len(self._index),
+                    self.max_n_tokens)
+
+    @classmethod
+    def from_cursor(cls, cursor, table=FB2M_NAME_TABLE, column='alias_preprocessed'):
+        """ Build the index from a normalized alias column created in `Step 2 - Generate
+        Candidates`.
+
+        Args:
+            cursor (psycopg2.extensions.cursor)
+            table (str): name table with a `mid` column
+            column (str): normalized alias column
+        """
+        cursor.execute('SELECT mid, ' + column + ' FROM ' + table)
+        return cls(cursor)
+
+    @classmethod
+    def from_connection(cls, connection, table=FB2M_NAME_TABLE, column='alias_preprocessed',
+                        itersize=10000):
+        """ Same as `from_cursor` except the table is streamed with a server-side cursor.
+
+        Args:
+            connection (psycopg2.extensions.connection)
+            table (str): name table with a `mid` column
+            column (str): normalized alias column
+            itersize (int): number of rows fetched per round trip
+        """
+        return cls(iterate_query(
+            connection, 'SELECT mid, ' + column + ' FROM ' + table, itersize=itersize))
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, alias):
+        return alias in self._index
+
+    def lookup(self, aliases):
+        """ Look up a batch of normalized aliases.
+
+        Args:
+            aliases (iterable of str)
+        Returns:
+            (dict): every alias found in the index mapped to its list of MIDs
+        """
+        return {alias: self._index[alias] for alias in self._index.keys() & set(aliases)}
+
+
+def _get_span_scores(predicted_subject_names):
+    """ Map each CRF span `(start_index, end_index)` to its best Viterbi score. """
+    span_scores = {}
+    for predicted in predicted_subject_names:
+        span = (predicted['start_index'], predicted['end_index'])
+        score = float(predicted['score'])
+        span_scores[span] = max(span_scores.get(span, score), score)
+    return span_scores
+
+
+def generate_ngram_candidates(alias_index, row, normalize=None):
+    """ Generate candidate MIDs from question n-grams found in `alias_index`.
+
+    Hits are ranked by the number of tokens and then by the CRF span score from Step 1; spans the
+    CRF did not decode rank last among hits of the same length.
+
+    This follows the `generate_candidates(cursor, row)` contract of `Step 2 - Generate Candidates`.
+    If no n-gram is an alias, `candidate_mids` is empty so the caller can fall back to the
+    SQL lookups.
+
+    Args:
+        alias_index (AliasIndex)
+        row (pandas.Series): row with `predicted_question_tokens` and `predicted_subject_names`
+        normalize (callable, optional): normalize an n-gram string the same way as the indexed
+            aliases; by default, tokens are joined with spaces like `alias_preprocessed`.
+    Returns:
+        row (pandas.Series): row with `candidate_mids`, `predicted_start_index`,
+            `predicted_end_index` and `predicted_subject_name`
+    """
+    tokens = row['predicted_question_tokens']
+    spans = question_ngrams(tokens, alias_index.max_n_tokens)
+    texts = [' '.join(tokens[start_index:end_index]) for start_index, end_index in spans]
+    if normalize is not None:
+        texts = [normalize(text) for text in texts]
+
+    hits = alias_index.lookup(texts)
+    if len(hits) > 0:
+        span_scores = _get_span_scores(row['predicted_subject_names'])
+        ranked = sorted(
+            [(span, text) for span, text in zip(spans, texts) if text in hits],
+            key=lambda item: (item[0][1] - item[0][0], span_scores.get(item[0], -float('inf'))),
+            reverse=True)
+        (start_index, end_index), text = ranked[0]
+        row['candidate_mids'] = list(hits[text])
+        row['predicted_start_index'] = start_index
+        row['predicted_end_index'] = end_index
+        row['predicted_subject_name'] = ' '.join(tokens[start_index:end_index])
+        return row
+
+    row['candidate_mids'] = []
+    row['predicted_start_index'] = nan
+    row['predicted_end_index'] = nan
+    row['predicted_subject_name'] = nan
+    return row
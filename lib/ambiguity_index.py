@@ -0,0 +1,249 @@
+"""
+Inverted index from `(alias, relation)` to the subject MIDs the pair could refer to.
+
+Motivation: `HYPOTHESIS - Question Refers to Multiple Subjects` joins the name table with the KG
+table once per question and `HYPOTHESIS - Accuracy Upperbound` fetches every fact of every
+candidate MID. Both only need the MIDs, and their number of objects, per `(alias, relation)`;
+here, that mapping is built with one scan and queried in batches so the upper bound and
+`question_interpretations.txt` are recomputed for any split in seconds.
+
+Example:
+    index = AmbiguityIndex.load_or_build(
+        'ambiguity_index/', FB2M_KG_TABLE, lambda: AmbiguityIndex.from_connection(connection))
+    index.get_mids([('sasha vujacic', 'people/person/place_of_birth')])
+"""
+from collections import Counter
+from collections import defaultdict
+
+import logging
+import os
+import pickle
+import random
+
+from lib.database import iterate_query
+from lib.utils import FB2M_NAME_TABLE
+from lib.utils import FB2M_SUBJECT_RELATION_TABLE
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_alias(alias):
+    """ Normalize an alias or subject name like the `subject_name.lower()` lookups of the
+    HYPOTHESIS notebooks.
+
+    Args:
+        alias (str)
+    Returns:
+        (str)
+    """
+    return alias.strip().lower()
+
+
+class AmbiguityIndex(object):
+    """
+    Aliases are normalized with `normalize_alias` when the index is built and when it is queried;
+    therefore, lookups with a raw subject name (e.g. 'Sasha Vujacic') find the alias.
+
+    Args:
+        rows (iterable of tuples): `(alias, relation, subject_mid, n_objects)` rows
+    """
+
+    # NOTE: Bump whenever the indexed keys change; indices saved by another version are rebuilt
+    # (e.g. version 1 indices have aliases that are not normalized).
+    VERSION = 2
+
+    def __init__(self, rows):
+        self.version = self.VERSION
+        self._index = defaultdict(lambda: defaultdict(dict))
+        n_rows = 0
+        for alias, relation, subject_mid, n_objects in rows:
+            self._index[normalize_alias(alias)][relation][subject_mid] = n_objects
+            n_rows += 1
+        self._index = {alias: dict(relations) for alias, relations in self._index.items()}
+        logger.info('Indexed %d (alias, relation, subject) rows for %d aliases', n_rows,
+                    len(self._index))
+
+    @classmethod
+    def from_facts(cls, aliases, facts):
+        """
+        Args:
+            aliases (iterable of tuples): `(mid, alias)` rows of the name table
+            facts (iterable of tuples): `(subject_mid, relation, object_mid)` facts
+        """
+        n_objects = defaultdict(Counter)
+        for subject_mid, relation, _ in facts:
+            n_objects[subject_mid][relation] += 1
+        return cls((alias, relation, mid, n)
+                   for mid, alias in aliases
+                   for relation, n in n_objects.get(mid, {}).items())
+
+    @classmethod
+    def from_connection(cls,
+                        connection,
+                        name_table=FB2M_NAME_TABLE,
+                        subject_relation_table=FB2M_SUBJECT_RELATION_TABLE,
+                        itersize=100000):
+        """ Build the index with one join of the name table and the subject relation table
+        created by `lib.knowledge_graph.create_subject_relation_index`.
+
+        Args:
+            connection (psycopg2.extensions.connection)
+            name_table (str, optional)
+            subject_relation_table (str, optional)
+            itersize (int, optional): number of rows fetched per round trip
+        """
+        return cls(iterate_query(
+            connection, """SELECT alias, relation, subject_mid, n_objects
+                           FROM {name_table}
+                           INNER JOIN {subject_relation_table}
+                           ON subject_mid = mid""".format(
+                name_table=name_table, subject_relation_table=subject_relation_table),
+            itersize=itersize))
+
+    @classmethod
+    def get_path(cls, directory, kg_version):
+        return os.path.join(directory, 'ambiguity_index.%s.v%d.pkl' % (kg_version, cls.VERSION))
+
+    def save(self, path):
+        with open(path, 'wb') as file_:
+            pickle.dump(self, file_, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def load(path):
+        with open(path, 'rb') as file_:
+            return pickle.load(file_)
+
+    @classmethod
+    def load_or_build(cls, directory, kg_version, build):
+        """ Load the index for `kg_version` from `directory` or build and save it.
+
+        Indices are keyed by `kg_version` and `VERSION`; an index saved by another `VERSION` is
+        rebuilt.
+
+        Args:
+            directory (str)
+            kg_version (str): identifier of the KG and name table the index describes
+            build (callable): returns a new `AmbiguityIndex`
+        Returns:
+            (AmbiguityIndex)
+        """
+        path = cls.get_path(directory, kg_version)
+        if os.path.isfile(path):
+            logger.info('Loading ambiguity index from %s', path)
+            index = cls.load(path)
+            if getattr(index, 'version', None) == cls.VERSION:
+                return index
+            logger.warning('Rebuilding ambiguity index %s saved by version %s', path,
+                           getattr(index, 'version', None))
+        index = build()
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        index.save(path)
+        logger.info('Saved ambiguity index to %s', path)
+        return index
+
+    def __len__(self):
+        return len(self._index)
+
+    def get_relations(self, aliases):
+        """ Batch lookup of every relation the subjects of an alias take.
+
+        Args:
+            aliases (list of str): aliases or subject names; see `normalize_alias`
+        Returns:
+            (list of dict): per alias, relation mapped to a dict of subject MIDs mapped to their
+                number of objects
+        """
+        return [self._index.get(normalize_alias(alias), {}) for alias in aliases]
+
+    def get_mids(self, pairs):
+        """ Batch lookup replacing `get_duplicate_mids`.
+
+        Args:
+            pairs (list of tuples): `(alias, relation)` pairs; see `normalize_alias`
+        Returns:
+            (list of dict): per pair, subject MIDs mapped to their number of objects
+        """
+        return [
+            self._index.get(normalize_alias(alias), {}).get(relation, {})
+            for alias, relation in pairs
+        ]
+
+
+def get_predicate_to_relation(predicates, relations):
+    """ Count the relations every question predicate maps to in the training data.
+
+    Args:
+        predicates (iterable of str)
+        relations (iterable of str)
+    Returns:
+        (dict): question predicate mapped to a `Counter` of relations
+    """
+    predicate_to_relation = defaultdict(Counter)
+    for predicate, relation in zip(predicates, relations):
+        predicate_to_relation[predicate][relation] += 1
+    return dict(predicate_to_relation)
+
+
+def get_upper_bound(index, rows, predicate_to_relation, random_state=None):
+    """ Accuracy upper bound given perfect subject names and a relation distribution overfit to
+    the questions like `HYPOTHESIS - Accuracy Upperbound`.
+
+    Args:
+        index (AmbiguityIndex)
+        rows (list of dict): examples with `subject_name`, `predicate`, `relation` and `subject`
+            keys; `subject_name` is `None` if it is not referenced in the question.
+        predicate_to_relation (dict): see `get_predicate_to_relation`
+        random_state (random.Random, optional): breaks ties between relations and subjects
+    Returns:
+        interpretations (list of lists of tuples): `(relation, subject_mid)` interpretations per
+            example like `question_interpretations.txt`
+        metrics (dict): counts of `relation_correct`, `subject_and_relation_correct`,
+            `given_relation_subject_correct`, `answerable`, `multiple_relations`,
+            `multiple_subjects`, `skipped` and `n_examples`.
+    """
+    random_state = random.Random() if random_state is None else random_state
+    rows = list(rows)
+    linked = [row for row in rows if isinstance(row['subject_name'], str)]
+    candidates = dict(zip([id(row) for row in linked],
+                          index.get_relations([row['subject_name'] for row in linked])))
+
+    def get_top_subject(subjects):
+        max_score = max(subjects.values())
+        return random_state.choice(sorted(s for s, n in subjects.items() if n == max_score))
+
+    metrics = Counter()
+    metrics['n_examples'] = len(rows)
+    interpretations = []
+    for row in rows:
+        if not isinstance(row['subject_name'], str):
+            # Not answerable because the subject name is not referenced in the question
+            metrics['skipped'] += 1
+            interpretations.append([])
+            continue
+
+        entity_relations = candidates[id(row)]
+        question_relations = predicate_to_relation.get(row['predicate'], {})
+        candidate_relations = sorted(r for r in entity_relations if question_relations.get(r, 0) > 0)
+        interpretations.append([(relation, subject_mid)
+                                for relation in candidate_relations
+                                for subject_mid in entity_relations[relation]])
+        if len(candidate_relations) == 0:
+            continue
+
+        scores = [question_relations[r] for r in candidate_relations]
+        max_relation = random_state.choice(
+            [r for r, score in zip(candidate_relations, scores) if score == max(scores)])
+        subject_mid = get_top_subject(entity_relations[max_relation])
+
+        candidate_mids = set(mid for r in candidate_relations for mid in entity_relations[r])
+        metrics['answerable'] += len(candidate_mids) == 1 and len(candidate_relations) == 1
+        metrics['multiple_subjects'] += len(entity_relations[max_relation]) > 1
+        metrics['multiple_relations'] += len(candidate_relations) > 1
+        metrics['relation_correct'] += max_relation == row['relation']
+        metrics['subject_and_relation_correct'] += (
+            max_relation == row['relation'] and subject_mid == row['subject'])
+        if row['relation'] in entity_relations:
+            metrics['given_relation_subject_correct'] += (
+                get_top_subject(entity_relations[row['relation']]) == row['subject'])
+    return interpretations, dict(metrics)
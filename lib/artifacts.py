@@ -0,0 +1,71 @@
+"""
+Typed inter-stage artifacts in the Arrow IPC file format.
+
+Motivation: `step_1_predict_subject_name.pkl` and `step_2_generate_candidates.pkl` are pickled
+DataFrames of nested Python objects; they are slow to write, fully deserialized on read and tied
+to the Python and pandas versions that wrote them. Arrow stores the same columns typed (e.g.
+`candidate_mids` as `list<string>` and `candidate_mid_ids` as `list<int64>`), the file is memory
+mapped on read and only the requested columns are touched.
+
+Example:
+    write_artifact(df, 'step_2_generate_candidates.arrow')
+    df = read_artifact('step_2_generate_candidates.arrow',
+                       columns=['candidate_mids', 'predicted_predicate'])
+"""
+import logging
+import os
+
+import pyarrow as pa
+
+logger = logging.getLogger(__name__)
+
+
+def write_artifact(df, path):
+    """ Write `df` with its index to `path`.
+
+    The file is written to a temporary path first and moved into place; therefore, a reader never
+    sees a partial artifact.
+
+    Args:
+        df (pandas.DataFrame)
+        path (str)
+    """
+    table = pa.Table.from_pandas(df)
+    tmp_path = path + '.tmp'
+    with pa.OSFile(tmp_path, 'wb') as sink:
+        writer = pa.RecordBatchFileWriter(sink, table.schema)
+        writer.write_table(table)
+        writer.close()
+    os.replace(tmp_path, path)
+    logger.info('Wrote %d rows and %d columns to %s', df.shape[0], df.shape[1], path)
+
+
+def _is_string_list(type_):
+    return pa.types.is_list(type_) and pa.types.is_string(type_.value_type)
+
+
+def read_artifact(path, columns=None):
+    """ Read the artifact at `path` memory mapped.
+
+    Args:
+        path (str)
+        columns (list of str, optional): columns to read; by default, every column is read.
+    Returns:
+        (pandas.DataFrame): `list<string>` columns are Python lists like the pickles; numeric list
+            columns are NumPy arrays.
+    """
+    with pa.memory_map(path, 'r') as source:
+        table = pa.ipc.open_file(source).read_all()
+        if columns is not None:
+            # NOTE: The index is stored as ordinary columns named by the pandas metadata.
+            index_columns = [c for c in table.schema.pandas_metadata.get('index_columns', [])
+                             if isinstance(c, str)]
+            names = list(columns) + [c for c in index_columns if c not in columns]
+            fields = [table.schema[table.schema.get_field_index(name)] for name in names]
+            table = pa.Table.from_arrays([table.column(name) for name in names],
+                                         schema=pa.schema(fields, metadata=table.schema.metadata))
+        df = table.to_pandas()
+    for field in table.schema:
+        if field.name in df.columns and _is_string_list(field.type):
+            df[field.name] = [None if v is None else list(v) for v in df[field.name]]
+    return df
@@ -0,0 +1,264 @@
+"""
+Columnar candidate facts for a whole split.
+
+Motivation: `Step 3 - Predict Relation and Finish` keeps a dict of dicts of sets per DataFrame row
+and iterates it in Python to evaluate, score and select. Here, the candidate facts of every
+question are flattened into compressed sparse rows: per question, a segment of candidate
+relations; per candidate relation, a segment of subjects; per subject, a segment of objects. The
+selection, its tie breaking and the evaluation are then gathers and segment maximums over the
+split.
+
+Example:
+    vocabulary = RelationVocabulary(relation_statistics.relations)
+    candidate_facts = CandidateFacts.from_dicts(df['candidate_facts'], vocabulary)
+    scores = candidate_facts.flatten(df['softmax_scores'])
+    scores *= relation_statistics.prior[candidate_facts.relation_ids]
+    predicted = candidate_facts.predict(scores * candidate_facts.get_relation_n_objects())
+    candidate_facts.evaluate(predicted, vocabulary.encode(df.relation),
+                             encode_mids(df.subject), encode_mids(df.object))
+"""
+import logging
+
+import numpy as np
+
+from lib.codec import decode_mids
+from lib.codec import encode_mids
+
+logger = logging.getLogger(__name__)
+
+
+def _to_offsets(lengths):
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return offsets
+
+
+def _segment_ids(offsets):
+    """ Segment of every element given the `offsets` of `n` segments. """
+    return np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+
+
+def _take(values, index, fill_value=-1):
+    """ `values[index]` with `fill_value` where `index` is -1. """
+    return np.append(values, fill_value)[index]
+
+
+def segment_sum(values, offsets):
+    """
+    Args:
+        values (np.ndarray [offsets[-1]])
+        offsets (np.ndarray [n_segments + 1] int)
+    Returns:
+        (np.ndarray [n_segments]): sum per segment; zero for empty segments
+    """
+    cumulative = np.concatenate([[0], np.cumsum(values)])
+    return cumulative[offsets[1:]] - cumulative[offsets[:-1]]
+
+
+def segment_argmax(values, offsets, random_state=None, tie_breaker=None):
+    """ Index of the maximum of every segment.
+
+    Args:
+        values (np.ndarray [offsets[-1]])
+        offsets (np.ndarray [n_segments + 1] int)
+        random_state (np.random.RandomState, optional): break ties at random like `random.choice`;
+            otherwise, ties are broken by the first maximum like a stable sort.
+        tie_breaker (np.ndarray [offsets[-1]], optional): the maximum with the highest tie breaker
+            wins; overrides `random_state` (e.g. `lib.sharding.get_tie_breaker`).
+    Returns:
+        (np.ndarray [n_segments] int): index into `values` or -1 for empty segments
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if tie_breaker is None and random_state is None:
+        tie_breaker = -np.arange(len(values))
+    elif tie_breaker is None:
+        tie_breaker = random_state.random_sample(len(values))
+    # NOTE: `np.lexsort` sorts by the last key first; within a segment, the maximum is last.
+    order = np.lexsort((tie_breaker, values, _segment_ids(offsets)))
+    is_empty = offsets[1:] == offsets[:-1]
+    return _take(order, np.where(is_empty, -1, offsets[1:] - 1))
+
+
+class CandidateFacts(object):
+    """ Candidate facts of every question in compressed sparse rows.
+
+    Args:
+        relation_offsets (np.ndarray [n_questions + 1] int)
+        relation_ids (np.ndarray [n_pairs] int32): candidate relation of every (question, relation)
+            pair in the order the relations are scored.
+        subject_offsets (np.ndarray [n_pairs + 1] int)
+        subject_ids (np.ndarray [n_subjects] int64): subject MID id of every
+            (question, relation, subject) group.
+        object_offsets (np.ndarray [n_subjects + 1] int)
+        object_ids (np.ndarray [n_facts] int64): object MID ids sorted within every group
+    """
+
+    def __init__(self, relation_offsets, relation_ids, subject_offsets, subject_ids,
+                 object_offsets, object_ids):
+        self.relation_offsets = relation_offsets
+        self.relation_ids = relation_ids
+        self.subject_offsets = subject_offsets
+        self.subject_ids = subject_ids
+        self.object_offsets = object_offsets
+        self.object_ids = object_ids
+
+    @classmethod
+    def from_dicts(cls, candidate_facts, vocabulary):
+        """
+        Args:
+            candidate_facts (iterable of dict): per question, relation mapped to a dict of subject
+                MIDs mapped to a set of object MIDs like
+                `lib.knowledge_graph.DatabaseKnowledgeGraph.get_candidate_facts`. The order of the
+                relations is kept; therefore, it lines up with scores computed from
+                `list(facts.keys())`.
+            vocabulary (lib.codec.RelationVocabulary)
+        """
+        n_relations = []
+        relations = []
+        n_subjects = []
+        subjects = []
+        n_objects = []
+        objects = []
+        for facts in candidate_facts:
+            facts = {} if facts is None else facts
+            n_relations.append(len(facts))
+            for relation, subject_to_objects in facts.items():
+                relations.append(relation)
+                n_subjects.append(len(subject_to_objects))
+                for subject, object_mids in subject_to_objects.items():
+                    subjects.append(subject)
+                    n_objects.append(len(object_mids))
+                    objects.extend(sorted(encode_mids(list(object_mids)).tolist()))
+        logger.info('Flattened %d questions into %d relations, %d subjects and %d facts',
+                    len(n_relations), len(relations), len(subjects), len(objects))
+        return cls(
+            _to_offsets(n_relations), vocabulary.encode(relations), _to_offsets(n_subjects),
+            encode_mids(subjects), _to_offsets(n_objects), np.array(objects, dtype=np.int64))
+
+    def __len__(self):
+        return len(self.relation_offsets) - 1
+
+    def get_n_relations(self):
+        """ (np.ndarray [n_questions] int): number of candidate relations per question """
+        return np.diff(self.relation_offsets)
+
+    def get_n_objects(self):
+        """ (np.ndarray [n_subjects] int): number of objects per (question, relation, subject) """
+        return np.diff(self.object_offsets)
+
+    def get_relation_n_objects(self):
+        """ (np.ndarray [n_pairs] int): number of facts per (question, relation) """
+        return segment_sum(self.get_n_objects(), self.subject_offsets)
+
+    def flatten(self, scores):
+        """ Flatten per question lists of relation scores into one array aligned with
+        `relation_ids`.
+
+        Args:
+            scores (iterable of lists of float or None): `None` for questions without candidates
+        Returns:
+            (np.ndarray [n_pairs] float64)
+        """
+        scores = [[] if s is None else s for s in scores]
+        if not np.array_equal([len(s) for s in scores], self.get_n_relations()):
+            raise ValueError('Every question needs one score per candidate relation.')
+        return np.concatenate([np.asarray(s, dtype=np.float64) for s in scores] + [[]])
+
+    def predict(self, scores, random_state=None, tie_breaker=None):
+        """ Pick the highest scoring relation, ties at random, then the subject with the most
+        objects, ties by the first subject, like `Step 3`.
+
+        Args:
+            scores (np.ndarray [n_pairs]): score of every candidate relation
+            random_state (np.random.RandomState, optional)
+            tie_breaker (np.ndarray [n_pairs], optional): see `segment_argmax`
+        Returns:
+            pair_index (np.ndarray [n_questions] int): index into `relation_ids` or -1
+            subject_index (np.ndarray [n_questions] int): index into `subject_ids` or -1
+        """
+        random_state = np.random.RandomState() if random_state is None else random_state
+        pair_index = segment_argmax(scores, self.relation_offsets, random_state, tie_breaker)
+        top_subject = segment_argmax(self.get_n_objects(), self.subject_offsets)
+        return pair_index, _take(top_subject, pair_index)
+
+    def evaluate(self, predicted, relation_ids, subject_ids, object_ids):
+        """
+        Args:
+            predicted (tuple): returned by `predict`
+            relation_ids (np.ndarray [n_questions] int): true relation per question
+            subject_ids (np.ndarray [n_questions] int64): true subject per question
+            object_ids (np.ndarray [n_questions] int64): true object per question
+        Returns:
+            (dict): boolean array per question for `relation`, `subject`, `subject_and_relation`
+                and `object` correctness
+        """
+        pair_index, subject_index = predicted
+        has_prediction = pair_index >= 0
+        relation = has_prediction & (_take(self.relation_ids, pair_index) == relation_ids)
+        subject = has_prediction & (_take(self.subject_ids, subject_index) == subject_ids)
+
+        # NOTE: Every subject group belongs to one question; therefore, the true object of the
+        # question is scattered to its predicted group and compared against every object. The
+        # extra group is indexed by questions without a prediction.
+        target = np.full(len(self.subject_ids) + 1, -1, dtype=np.int64)
+        target[subject_index[has_prediction]] = object_ids[has_prediction]
+        object_segments = _segment_ids(self.object_offsets)
+        hits = np.bincount(object_segments[self.object_ids == target[object_segments]],
+                           minlength=len(self.subject_ids) + 1) > 0
+        object_ = has_prediction & hits[subject_index]
+        return {
+            'relation': relation,
+            'subject': subject,
+            'subject_and_relation': relation & subject,
+            'object': object_,
+        }
+
+    def get_candidate_recall(self, relation_ids, subject_ids, object_ids):
+        """ Whether the true relation, subject and object are among the candidates of every
+        question.
+
+        Args:
+            relation_ids (np.ndarray [n_questions] int)
+            subject_ids (np.ndarray [n_questions] int64)
+            object_ids (np.ndarray [n_questions] int64)
+        Returns:
+            (dict): boolean array per question for `relation`, `subject` and `object`
+        """
+        n_questions = len(self)
+        pair_question = _segment_ids(self.relation_offsets)
+        pair_hit = self.relation_ids == relation_ids[pair_question]
+        subject_pair = _segment_ids(self.subject_offsets)
+        subject_question = pair_question[subject_pair]
+        subject_hit = pair_hit[subject_pair] & (self.subject_ids == subject_ids[subject_question])
+        object_subject = _segment_ids(self.object_offsets)
+        object_question = subject_question[object_subject]
+        object_hit = subject_hit[object_subject] & (self.object_ids == object_ids[object_question])
+        return {
+            'relation': np.bincount(pair_question[pair_hit], minlength=n_questions) > 0,
+            'subject': np.bincount(subject_question[subject_hit], minlength=n_questions) > 0,
+            'object': np.bincount(object_question[object_hit], minlength=n_questions) > 0,
+        }
+
+    def to_tuples(self, predicted, vocabulary):
+        """ Decode predictions at the output boundary.
+
+        Args:
+            predicted (tuple): returned by `predict`
+            vocabulary (lib.codec.RelationVocabulary)
+        Returns:
+            (list of tuples): `(relation, subject_mid, object_mids)` per question or
+                `(None, None, None)` for questions without candidates
+        """
+        pair_index, subject_index = predicted
+        is_predicted = pair_index >= 0
+        relations = iter(vocabulary.decode(self.relation_ids[pair_index[is_predicted]]))
+        subjects = iter(decode_mids(self.subject_ids[subject_index[is_predicted]]))
+        ret = []
+        for subject in subject_index:
+            if subject < 0:
+                ret.append(tuple([None, None, None]))
+                continue
+            start, end = self.object_offsets[subject], self.object_offsets[subject + 1]
+            objects = set(decode_mids(self.object_ids[start:end]))
+            ret.append(tuple([next(relations), next(subjects), objects]))
+        return ret
@@ -0,0 +1,84 @@
+"""
+Popularity based pruning of candidate subject MIDs.
+
+Motivation: Common aliases (e.g. "john smith") map to hundreds of MIDs and every fact of every MID
+is fetched before the relation is scored; yet, one subject wins per question. Ranking candidates
+by how connected they are in the KG and keeping the top N bounds the rows fetched per question.
+"""
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def get_popularity(statistics, mids):
+    """ Popularity of every MID; the number of facts with the MID as subject plus its in-degree.
+
+    Args:
+        statistics (lib.relation_statistics.RelationStatistics)
+        mids (list of str)
+    Returns:
+        (np.ndarray [len(mids)] int)
+    """
+    return np.array([
+        statistics.subject_counts.get(mid, 0) + statistics.object_counts.get(mid, 0)
+        for mid in mids
+    ], dtype=np.int64)
+
+
+def prune_candidate_mids(statistics, mids, top_n=None):
+    """ Keep the `top_n` most popular candidate MIDs.
+
+    Ties keep the order of `mids` so the candidate generator ranking breaks them.
+
+    Args:
+        statistics (lib.relation_statistics.RelationStatistics)
+        mids (list of str): candidate MIDs
+        top_n (int, optional): number of MIDs to keep; if `None`, every MID is kept.
+    Returns:
+        (list of str): kept MIDs from most to least popular
+    """
+    if top_n is None or len(mids) <= top_n:
+        return list(mids)
+    popularity = get_popularity(statistics, mids)
+    # NOTE: `np.argsort` with `kind='mergesort'` is stable
+    order = np.argsort(-popularity, kind='mergesort')[:top_n]
+    return [mids[i] for i in order]
+
+
+def get_pruning_tradeoff(statistics, candidate_mids, subject_mids, top_ns):
+    """ Recall of the true subject MID against the number of KG rows fetched per setting of
+    `top_n`.
+
+    Args:
+        statistics (lib.relation_statistics.RelationStatistics)
+        candidate_mids (iterable of lists of str): candidate MIDs per question
+        subject_mids (iterable of str): true subject MID per question
+        top_ns (list of int or None): settings of `top_n` to compare; `None` disables pruning.
+    Returns:
+        (list of dict): per `top_n`, the recall and the rows fetched in total and as a fraction of
+            the unpruned rows fetched.
+    """
+    candidate_mids = [list(mids) for mids in candidate_mids]
+    subject_mids = list(subject_mids)
+    n_questions = len(candidate_mids)
+    n_unpruned_rows = sum(statistics.subject_counts.get(mid, 0)
+                          for mids in candidate_mids for mid in mids)
+
+    ret = []
+    for top_n in top_ns:
+        n_rows = 0
+        n_recalled = 0
+        for mids, subject_mid in zip(candidate_mids, subject_mids):
+            kept = prune_candidate_mids(statistics, mids, top_n)
+            n_rows += sum(statistics.subject_counts.get(mid, 0) for mid in kept)
+            n_recalled += subject_mid in kept
+        ret.append({
+            'Top N': 'All' if top_n is None else top_n,
+            'Recall': n_recalled / n_questions if n_questions > 0 else 0.0,
+            'Rows Fetched': n_rows,
+            'Fraction of Rows': n_rows / n_unpruned_rows if n_unpruned_rows > 0 else 0.0,
+        })
+        logger.info('Top %s: %f recall with %d rows fetched', top_n, ret[-1]['Recall'], n_rows)
+    return ret
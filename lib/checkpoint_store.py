@@ -0,0 +1,109 @@
+"""
+Disk spilling store for hyperparameter search checkpoints.
+
+Motivation: `successive_halving` keeps every model's checkpoint in memory until the model is
+eliminated; with 45+ models that hold a full `SeqToLabel` state, memory blows up. Here, every
+checkpoint is written to disk, a bounded LRU of checkpoints stays warm in memory for the
+survivors, and the checkpoints of eliminated models are deleted right away.
+
+Example:
+    store = CheckpointStore('experiments/hyperband_checkpoints/', max_in_memory=2)
+    hyperband(objective, space, checkpoint_store=store)
+"""
+from collections import OrderedDict
+
+import logging
+import os
+import re
+
+import dill
+
+logger = logging.getLogger(__name__)
+
+
+def load_checkpoint(path):
+    """ Load a checkpoint spilled by `CheckpointStore.put` (e.g. in a worker process).
+
+    Args:
+        path (str): `CheckpointStore.get_path` of the checkpoint key
+    Returns:
+        (any): checkpoint
+    """
+    with open(path, 'rb') as file_:
+        return dill.load(file_)
+
+
+class CheckpointStore(object):
+    """
+    Args:
+        directory (str): directory checkpoints are spilled to
+        max_in_memory (int, optional): maximum number of checkpoints kept in memory
+        delete_paths (bool, optional): checkpoints that are already a path (e.g. returned by
+            `Checkpoint.save`) are stored as is; if True, the file is deleted with the model too.
+    """
+
+    def __init__(self, directory, max_in_memory=2, delete_paths=False):
+        self.directory = directory
+        self.max_in_memory = max_in_memory
+        self.delete_paths = delete_paths
+        self._in_memory = OrderedDict()
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def get_path(self, key):
+        """ Path of the spilled checkpoint for `key`. """
+        return os.path.join(self.directory, re.sub(r'[^\w.-]', '_', str(key)) + '.pkl')
+
+    def _remember(self, key, checkpoint):
+        self._in_memory[key] = checkpoint
+        self._in_memory.move_to_end(key)
+        while len(self._in_memory) > self.max_in_memory:
+            self._in_memory.popitem(last=False)
+
+    def put(self, key, checkpoint):
+        """ Store the checkpoint of `key` replacing the previous one.
+
+        Args:
+            key (str)
+            checkpoint (any): picklable checkpoint
+        """
+        path = self.get_path(key)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as file_:
+            dill.dump(checkpoint, file_)
+        os.replace(tmp_path, path)
+        self._remember(key, checkpoint)
+
+    def get(self, key):
+        """
+        Args:
+            key (str)
+        Returns:
+            (any): checkpoint of `key`
+        Raises:
+            (KeyError): no checkpoint is stored for `key`
+        """
+        if key in self._in_memory:
+            self._in_memory.move_to_end(key)
+            return self._in_memory[key]
+        path = self.get_path(key)
+        if not os.path.isfile(path):
+            raise KeyError(key)
+        checkpoint = load_checkpoint(path)
+        self._remember(key, checkpoint)
+        return checkpoint
+
+    def __contains__(self, key):
+        return key in self._in_memory or os.path.isfile(self.get_path(key))
+
+    def delete(self, key):
+        """ Delete every artifact of `key`; missing keys are ignored. """
+        if key not in self:
+            return
+        if self.delete_paths:
+            checkpoint = self.get(key)
+            if isinstance(checkpoint, str) and os.path.isfile(checkpoint):
+                os.remove(checkpoint)
+        self._in_memory.pop(key, None)
+        os.remove(self.get_path(key))
+        logger.info('Deleted checkpoint %s', key)
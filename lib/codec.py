@@ -0,0 +1,154 @@
+"""
+Integer codec for Freebase MIDs and relations.
+
+Motivation: MIDs like `01g4wmh` and relations like `people/person/place_of_birth` travel as
+Python strings through DataFrame object columns, candidate lists and pickles. A MID is a base-32
+number; therefore, it decodes losslessly to an int64. Relations are a small closed vocabulary and
+map to dense int32 IDs. Both are carried as NumPy arrays and decoded only at the output boundary.
+
+Example:
+    mid_ids = encode_mids(['01g4wmh', '0f2y0'])
+    vocabulary = RelationVocabulary(df_train.relation)
+    relation_ids = vocabulary.encode(['people/person/place_of_birth'])
+    decode_mids(mid_ids), vocabulary.decode(relation_ids)
+"""
+import logging
+
+import numpy as np
+
+from lib.database import iterate_query
+from lib.utils import FB2M_KG_TABLE
+
+logger = logging.getLogger(__name__)
+
+# Freebase MIDs are written with digits, lower case consonants and underscore.
+MID_ALPHABET = '0123456789bcdfghjklmnpqrstvwxyz_'
+# NOTE: 12 characters of 5 bits and the sentinel bit fit in 61 bits.
+MAX_MID_LENGTH = 12
+MID_PREFIXES = ('www.freebase.com/m/', 'm.', '/m/')
+
+_CHAR_TO_VALUE = np.full(256, -1, dtype=np.int64)
+for _value, _char in enumerate(MID_ALPHABET):
+    _CHAR_TO_VALUE[ord(_char)] = _value
+
+
+def _strip_prefix(mid):
+    for prefix in MID_PREFIXES:
+        if mid.startswith(prefix):
+            return mid[len(prefix):]
+    return mid
+
+
+def encode_mid(mid):
+    """ Decode the base-32 MID into an integer.
+
+    A leading 1 bit is prepended so leading zeros in the MID (e.g. `01g4wmh`) are kept.
+
+    Args:
+        mid (str): MID with or without the `m.` or `www.freebase.com/m/` prefix
+    Returns:
+        (int)
+    """
+    return int(encode_mids([mid])[0])
+
+
+def decode_mid(mid_id):
+    """ Inverse of `encode_mid`; returns the MID without a prefix. """
+    mid_id = int(mid_id)
+    if mid_id <= 1:
+        raise ValueError('Invalid MID id: %d' % mid_id)
+    chars = []
+    while mid_id > 1:
+        chars.append(MID_ALPHABET[mid_id & 31])
+        mid_id >>= 5
+    return ''.join(reversed(chars))
+
+
+def encode_mids(mids):
+    """ Vectorized `encode_mid`.
+
+    Args:
+        mids (iterable of str)
+    Returns:
+        (np.ndarray [len(mids)] int64)
+    """
+    mids = [_strip_prefix(mid) for mid in mids]
+    if len(mids) == 0:
+        return np.zeros(0, dtype=np.int64)
+    lengths = np.array([len(mid) for mid in mids], dtype=np.int64)
+    if lengths.min() == 0 or lengths.max() > MAX_MID_LENGTH:
+        raise ValueError('MIDs must have 1 to %d characters' % MAX_MID_LENGTH)
+
+    # Right align every MID in a byte matrix padded on the left with the zero byte
+    chars = np.array([mid.rjust(MAX_MID_LENGTH, '\0') for mid in mids],
+                     dtype='S%d' % MAX_MID_LENGTH)
+    codes = chars.view(np.uint8).reshape(len(mids), MAX_MID_LENGTH)
+    values = _CHAR_TO_VALUE[codes]
+    is_padding = np.arange(MAX_MID_LENGTH)[None, :] < (MAX_MID_LENGTH - lengths)[:, None]
+    if (values[~is_padding] < 0).any():
+        raise ValueError('MIDs must only contain characters in %s' % MID_ALPHABET)
+
+    values = np.where(is_padding, 0, values)
+    shifts = 5 * np.arange(MAX_MID_LENGTH - 1, -1, -1, dtype=np.int64)
+    return (values << shifts).sum(axis=1) | (np.int64(1) << (5 * lengths))
+
+
+def decode_mids(mid_ids):
+    """ Batch `decode_mid`; decoding only happens at the output boundary.
+
+    Args:
+        mid_ids (iterable of int)
+    Returns:
+        (list of str)
+    """
+    return [decode_mid(mid_id) for mid_id in mid_ids]
+
+
+class RelationVocabulary(object):
+    """ Dense int32 IDs for relations.
+
+    Args:
+        relations (iterable of str): relations in the vocabulary; duplicates are ignored.
+    """
+
+    def __init__(self, relations):
+        self.relations = sorted(set(relations))
+        self._relation_ids = {relation: i for i, relation in enumerate(self.relations)}
+        # NOTE: Like `RelationStatistics`, the last id is reserved for unknown relations.
+        self.unknown_id = len(self.relations)
+
+    @classmethod
+    def from_connection(cls, connection, table=FB2M_KG_TABLE):
+        """ Vocabulary of every relation in the KG table.
+
+        Args:
+            connection (psycopg2.extensions.connection)
+            table (str, optional): KG table
+        """
+        return cls(relation for (relation,) in iterate_query(
+            connection, 'SELECT DISTINCT relation FROM ' + table))
+
+    def __len__(self):
+        return len(self.relations)
+
+    def __contains__(self, relation):
+        return relation in self._relation_ids
+
+    def encode(self, relations):
+        """
+        Args:
+            relations (iterable of str)
+        Returns:
+            (np.ndarray int32): relation IDs; `unknown_id` for relations not in the vocabulary
+        """
+        return np.array([self._relation_ids.get(r, self.unknown_id) for r in relations],
+                        dtype=np.int32)
+
+    def decode(self, relation_ids):
+        """
+        Args:
+            relation_ids (iterable of int)
+        Returns:
+            (list of str or None): relations; `None` for `unknown_id`
+        """
+        return [self.relations[i] if i < self.unknown_id else None for i in relation_ids]
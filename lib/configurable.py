@@ -16,11 +16,16 @@ from functools import reduce
 from collections import defaultdict
 
 import ast
+import atexit
+import cProfile
 import inspect
+import io
 import logging
 import operator
+import pstats
 import sys
 import pprint
+import time
 from importlib import import_module
 
 import wrapt
@@ -62,6 +67,17 @@ class _KeyListDictionary(dict):
 # DO NOT IMPORT. Use @configurable instead.
 _configuration = _KeyListDictionary()
 
+# Version of `_configuration`; `add_config` and `clear_config` bump it to invalidate the defaults
+# resolved by `@configurable`.
+_generation = 0
+
+# Per function cache of `@configurable`; see `_get_function_info`.
+_function_info = {}
+
+# Profiling state; see `get_profiling_config`.
+_profiling = {'generation': None, 'config': None, 'is_atexit_registered': False, 'active': None}
+_profile = {}  # Function name mapped to a `_FunctionProfile`
+
 
 def _dict_merge(dict_, merge_dict, overwrite=False):
     """ Recursive `dict` merge. `dict_merge` recurses down into dicts nested to an arbitrary depth,
@@ -254,12 +270,13 @@ def add_config(dict_):
         (TypeError) module names (keys) are formatted improperly (Example: 'lib..models')
         (TypeError) duplicate functions/modules/packages are defined
     """
-    global _configuration
+    global _configuration, _generation
     parsed = _parse_configuration(dict_)
     logger.info('Checking configuration...')
     _check_configuration(parsed)
     _dict_merge(_configuration, parsed, overwrite=True)
     _configuration = _KeyListDictionary(_configuration)
+    _generation += 1
     logger.info('Configuration checked.')
 
 
@@ -271,14 +288,28 @@ def log_config():
     logging.info(pretty_printer.pformat(_configuration))
 
 
+def get_config():
+    """
+    Get a flat copy of the global configuration.
+
+    Returns:
+        (dict) shallow dictionary with every key concatenated by "." similar to module names in
+        python
+    """
+    flat = {}
+    _dict_to_flat_config_helper(_configuration, flat, [])
+    return flat
+
+
 def clear_config():
     """
     Clear the global configuration
     
     Returns: None
     """
-    global _configuration
+    global _configuration, _generation
     _configuration = _KeyListDictionary()
+    _generation += 1
 
 
 def _get_module_name(func):
@@ -292,6 +323,56 @@ def _get_module_name(func):
         return module.__name__
 
 
+class _FunctionInfo(object):
+    """ Everything `@configurable` needs about a function that does not change between calls.
+
+    Args:
+        func (callable): decorated function
+    """
+
+    def __init__(self, func):
+        parameters = inspect.signature(func).parameters
+        # Parameters that can be filled by positional arguments
+        self.positional = []
+        for name, parameter in parameters.items():
+            if parameter.kind == parameter.VAR_POSITIONAL:
+                break
+            self.positional.append(name)
+        module_keys = _get_module_name(func).split('.')
+        self.keys = module_keys + func.__qualname__.split('.')
+        self.print_name = module_keys[-1] + '.' + func.__qualname__
+        self.generation = None
+        self.default = None
+
+    def get_default(self):
+        """ Get the defaults of the function in the global configuration.
+
+        Returns:
+            (dict)
+        """
+        if self.generation != _generation:
+            keys = self.keys
+            self.default = _configuration[keys] if keys in _configuration else {}
+            self.generation = _generation
+            if not isinstance(self.default, dict):
+                logger.info('%s:%s config malformed must be a dict of arguments', self.print_name,
+                            '.'.join(keys))
+        return self.default
+
+
+def _get_function_info(func):
+    """ Get the cached `_FunctionInfo` of `func`.
+
+    NOTE: `wrapt` passes methods bound to their instance; therefore, the cache is keyed by the
+    underlying function. Otherwise, the cache would never hit and would keep every instance alive.
+    A bound method does not take `self` positionally, so bound and unbound calls are cached apart.
+    """
+    key = (getattr(func, '__func__', func), hasattr(func, '__self__'))
+    if key not in _function_info:
+        _function_info[key] = _FunctionInfo(func)
+    return _function_info[key]
+
+
 @wrapt.decorator
 def configurable(func, instance, args, kwargs):
     """
@@ -299,41 +380,158 @@ def configurable(func, instance, args, kwargs):
     arguments and key word arguments passed to the function are merged with the globally defined
     arguments.
 
+    NOTE: The signature and module keys of `func` are computed once; its defaults are resolved
+    again after the global configuration changes.
+    NOTE: With profiling enabled, every call is timed; see `get_profiling_config`.
+
     Args/Return are defined by `wrapt.decorator`.
     """
-    global _configuration
-    parameters = inspect.signature(func).parameters
-    module_keys = _get_module_name(func).split('.')
-    keys = module_keys + func.__qualname__.split('.')
-    print_name = module_keys[-1] + '.' + func.__qualname__
-    default = _configuration[keys] if keys in _configuration else {}  # Get default
-    if not isinstance(default, dict):
-        logger.info('%s:%s config malformed must be a dict of arguments', print_name,
-                    '.'.join(keys))
+    info = _get_function_info(func)
+    print_name = info.print_name
+    default = info.get_default()
     merged = default.copy()
     merged.update(kwargs)  # Add kwargs
     # Add args
-    args = list(args)
-    for parameter in parameters:
-        if len(args) == 0 or parameters[parameter].kind == parameters[parameter].VAR_POSITIONAL:
-            break
-        merged[parameter] = args.pop(0)
+    n_positional = min(len(args), len(info.positional))
+    for parameter, arg in zip(info.positional, args):
+        merged[parameter] = arg
         # No POSITIONAL_ONLY arguments
         # https://docs.python.org/3/library/inspect.html#inspect.Parameter
         assert parameter not in kwargs, "Python is broken. Args overwriting kwargs."
+    args = args[n_positional:]
 
     try:
-        if len(default) == 0:
-            logger.info('%s no config for: %s', print_name, '.'.join(keys))
-        # TODO: Does not print all parameters; FIX
-        logger.info('%s was configured with:\n%s', print_name, pretty_printer.pformat(merged))
-        return func(*args, **merged)
+        # NOTE: `pformat` is expensive; therefore, it only runs if the message is logged.
+        if logger.isEnabledFor(logging.INFO):
+            if len(default) == 0:
+                logger.info('%s no config for: %s', print_name, '.'.join(info.keys))
+            # TODO: Does not print all parameters; FIX
+            logger.info('%s was configured with:\n%s', print_name, pretty_printer.pformat(merged))
+        profiling_config = _get_profiling_config()
+        if not profiling_config['enabled']:
+            return func(*args, **merged)
+        return _profile_call(info, profiling_config, func, args, merged)
     except TypeError as error:
         logger.info('%s was passed defaults: %s', print_name, default)
         logger.error(error, exc_info=True)
         raise
 
 
+@configurable
+def get_profiling_config(enabled=False, cprofile=False, report_path=None, cprofile_limit=20):
+    """ Configuration of the profiling mode of `@configurable`.
+
+    With profiling enabled, the calls and cumulative wall time of every `@configurable` function
+    are recorded and a report sorted by cumulative time is logged at exit.
+
+    Example:
+        add_config({'lib.configurable.get_profiling_config': {'enabled': True, 'cprofile': True}})
+
+    Args:
+        enabled (bool, optional): if True, `@configurable` functions are profiled.
+        cprofile (bool, optional): if True, `cProfile` stats are recorded per function as well.
+            NOTE: One profiler runs at a time; therefore, a function called by another
+            `@configurable` function is only `cProfile`d when it is called on its own.
+        report_path (str, optional): file the report is written to at exit as well
+        cprofile_limit (int, optional): number of `cProfile` entries reported per function
+    Returns:
+        (dict): the arguments
+    """
+    return {
+        'enabled': enabled,
+        'cprofile': cprofile,
+        'report_path': report_path,
+        'cprofile_limit': cprofile_limit,
+    }
+
+
+def _get_profiling_config():
+    """ Get `get_profiling_config` for the current configuration without profiling it. """
+    if _profiling['generation'] != _generation:
+        function = get_profiling_config.__wrapped__
+        _profiling['config'] = function(**_get_function_info(function).get_default())
+        _profiling['generation'] = _generation
+        if _profiling['config']['enabled'] and not _profiling['is_atexit_registered']:
+            atexit.register(log_profile_report)
+            _profiling['is_atexit_registered'] = True
+    return _profiling['config']
+
+
+class _FunctionProfile(object):
+    """ Calls and cumulative wall time of a `@configurable` function. """
+
+    def __init__(self):
+        self.n_calls = 0
+        self.seconds = 0.0
+        self.cprofile = None
+
+
+def _profile_call(info, profiling_config, func, args, kwargs):
+    name = '.'.join(info.keys)
+    if name not in _profile:
+        _profile[name] = _FunctionProfile()
+    profile = _profile[name]
+    is_cprofiled = profiling_config['cprofile'] and _profiling['active'] is None
+    if is_cprofiled:
+        if profile.cprofile is None:
+            profile.cprofile = cProfile.Profile()
+        _profiling['active'] = profile.cprofile
+        profile.cprofile.enable()
+    start = time.perf_counter()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        profile.seconds += time.perf_counter() - start
+        profile.n_calls += 1
+        if is_cprofiled:
+            profile.cprofile.disable()
+            _profiling['active'] = None
+
+
+def get_profile_report(cprofile_limit=None):
+    """ Get the profiling report of the `@configurable` functions.
+
+    NOTE: The cumulative time of a function includes the `@configurable` functions it calls.
+
+    Args:
+        cprofile_limit (int, optional): number of `cProfile` entries per function; by default,
+            `cprofile_limit` of `get_profiling_config`.
+    Returns:
+        (str)
+    """
+    if cprofile_limit is None:
+        cprofile_limit = _get_profiling_config()['cprofile_limit']
+    profiles = sorted(_profile.items(), key=lambda item: item[1].seconds, reverse=True)
+    lines = ['%12s %14s %14s  %s' % ('calls', 'cumtime (s)', 'percall (ms)', 'function')]
+    for name, profile in profiles:
+        lines.append('%12d %14.4f %14.4f  %s' % (profile.n_calls, profile.seconds,
+                                                 profile.seconds / profile.n_calls * 1000, name))
+    for name, profile in profiles:
+        if profile.cprofile is not None:
+            stream = io.StringIO()
+            stats = pstats.Stats(profile.cprofile, stream=stream)
+            stats.sort_stats('cumulative').print_stats(cprofile_limit)
+            lines.extend(['', 'cProfile of %s:' % name, stream.getvalue()])
+    return '\n'.join(lines)
+
+
+def log_profile_report():
+    """ Log the profiling report and write it to `report_path` of `get_profiling_config`. """
+    if len(_profile) == 0:
+        return
+    report = get_profile_report()
+    logger.info('Profile of @configurable functions:\n%s', report)
+    report_path = _get_profiling_config()['report_path']
+    if report_path is not None:
+        with open(report_path, 'w') as file_:
+            file_.write(report)
+
+
+def clear_profile():
+    """ Clear the recorded profile. """
+    _profile.clear()
+
+
 class HyperparameterSpaceConfig(object):
     """
     Define a set of (key, value) pairs for a parameter space.
@@ -0,0 +1,341 @@
+"""
+Pooled PostgreSQL access with cached prepared statements.
+
+Motivation: `lib.utils.get_connection` opens a bare connection per call and every lookup is planned
+again on every execution. Here, connections are reused across threads, recreated after a fork, and
+the named lookups used across the notebooks are prepared once per connection.
+
+Example:
+    database = Database()
+    database.query('alias_to_mid', 'sasha vujacic')
+    DatabaseKnowledgeGraph(database).get_candidate_facts(['0f2y0'])
+    await database.query_async('mid_to_alias', '0f2y0')
+    database.get_stats()
+
+    for mid, alias in database.iterate('SELECT mid, alias FROM fb_two_subject_name'):
+        ...
+"""
+from collections import deque
+from contextlib import contextmanager
+
+import asyncio
+import logging
+import os
+import itertools
+import threading
+import time
+
+import numpy as np
+import psycopg2
+
+from lib.utils import FB2M_KG_TABLE
+from lib.utils import FB2M_NAME_TABLE
+from lib.utils import FB2M_SUBJECT_RELATION_TABLE
+from lib.utils import get_credentials
+
+logger = logging.getLogger(__name__)
+
+# Named lookups used across the notebooks as `(parameter types, query)`; `{kg}`, `{name}` and
+# `{subject_relation}` are replaced by the KG, subject name and subject relation tables.
+QUERIES = {
+    'alias_to_mid': (['text'], 'SELECT mid FROM {name} WHERE alias = $1'),
+    'alias_preprocessed_to_alias':
+        (['text'], 'SELECT DISTINCT alias FROM {name} WHERE alias_preprocessed = $1'),
+    'alias_normalized_punctuation_to_alias':
+        (['text'], 'SELECT DISTINCT alias FROM {name} WHERE alias_normalized_punctuation = $1'),
+    'alias_normalized_punctuation_stem_to_alias':
+        (['text'],
+         'SELECT DISTINCT alias FROM {name} WHERE alias_normalized_punctuation_stem = $1'),
+    'mid_to_alias': (['text'], 'SELECT alias FROM {name} WHERE mid = $1'),
+    'mids_to_alias': (['text[]'], 'SELECT mid, alias FROM {name} WHERE mid = ANY($1)'),
+    'candidate_facts':
+        (['text[]'],
+         'SELECT subject_mid, relation, object_mid FROM {kg} WHERE subject_mid = ANY($1)'),
+    'relations': (['text'], 'SELECT DISTINCT relation FROM {kg} WHERE subject_mid = $1'),
+    'candidate_relations':
+        (['text[]'],
+         'SELECT subject_mid, relation, n_objects FROM {subject_relation} '
+         'WHERE subject_mid = ANY($1)'),
+    'objects':
+        (['varchar[]', 'varchar[]'],
+         'SELECT subject_mid, relation, object_mid FROM {kg} '
+         'WHERE (subject_mid, relation) IN (SELECT * FROM unnest($1, $2))'),
+}
+
+
+_cursor_counter = itertools.count()
+
+
+def iterate_query(connection, query, args=None, itersize=10000, name=None):
+    """ Stream the rows of `query` with a named server-side cursor.
+
+    Unlike `cursor.fetchall`, only `itersize` rows are held client-side at a time and the first
+    rows are yielded before the scan finishes.
+
+    NOTE: Named cursors only exist within a transaction. If `connection` is in autocommit mode, a
+    transaction is opened for the scan and rolled back afterwards; otherwise, the scan runs in the
+    current transaction and a `commit` before the generator is exhausted closes the cursor.
+
+    Args:
+        connection (psycopg2.extensions.connection)
+        query (str)
+        args (tuple, optional): query parameters
+        itersize (int, optional): number of rows fetched from the server per round trip
+        name (str, optional): cursor name; by default, a name unique in this process
+    Returns:
+        (generator): rows
+    """
+    if name is None:
+        name = 'iterate_query_%d_%d' % (os.getpid(), next(_cursor_counter))
+    autocommit = connection.autocommit
+    if autocommit:
+        connection.autocommit = False
+    try:
+        cursor = connection.cursor(name)
+        try:
+            cursor.itersize = itersize
+            cursor.execute(query, args)
+            for row in cursor:
+                yield row
+        finally:
+            cursor.close()
+    finally:
+        if autocommit:
+            connection.rollback()
+            connection.autocommit = True
+
+
+class ConnectionPool(object):
+    """ Thread safe pool of connections that is safe to inherit by forked workers.
+
+    After a fork, the child drops the inherited connections without closing them (closing would
+    terminate the parent's sessions) and opens its own.
+
+    Args:
+        max_connections (int, optional): maximum number of open connections
+        connection_factory (callable, optional): returns a new connection; by default,
+            `psycopg2.connect` with `lib.utils.get_credentials`.
+        autocommit (bool, optional): set `autocommit` on new connections so idle pooled
+            connections do not hold a transaction open.
+    """
+
+    def __init__(self, max_connections=8, connection_factory=None, autocommit=True):
+        self.max_connections = max_connections
+        if connection_factory is None:
+            connection_factory = lambda: psycopg2.connect(**get_credentials())
+        self.connection_factory = connection_factory
+        self.autocommit = autocommit
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._condition = threading.Condition()
+        self._idle = []
+        self._n_connections = 0
+        # Prepared statement names per connection
+        self.prepared = {}
+
+    def _check_fork(self):
+        if self._pid != os.getpid():
+            logger.info('Discarding %d connections inherited from process %d', self._n_connections,
+                        self._pid)
+            self._reset()
+
+    def get(self):
+        """ Take a connection from the pool, opening one if none are idle.
+
+        Blocks while `max_connections` connections are in use.
+        """
+        self._check_fork()
+        with self._condition:
+            while len(self._idle) == 0 and self._n_connections >= self.max_connections:
+                self._condition.wait()
+            if len(self._idle) > 0:
+                return self._idle.pop()
+            self._n_connections += 1
+        try:
+            connection = self.connection_factory()
+            if self.autocommit:
+                connection.autocommit = True
+        except Exception:
+            with self._condition:
+                self._n_connections -= 1
+                self._condition.notify()
+            raise
+        self.prepared[id(connection)] = set()
+        return connection
+
+    def put(self, connection, discard=False):
+        """ Return a connection to the pool.
+
+        Args:
+            connection (psycopg2.extensions.connection)
+            discard (bool, optional): close the connection instead, e.g. after an error
+        """
+        if self._pid != os.getpid():
+            return
+        if discard or connection.closed:
+            self.prepared.pop(id(connection), None)
+            try:
+                connection.close()
+            except Exception:
+                pass
+        with self._condition:
+            if discard or connection.closed:
+                self._n_connections -= 1
+            else:
+                self._idle.append(connection)
+            self._condition.notify()
+
+    @contextmanager
+    def connection(self):
+        """ Borrow a connection; it is discarded if the block raises a database error. """
+        connection = self.get()
+        discard = False
+        try:
+            yield connection
+        except psycopg2.Error:
+            discard = True
+            raise
+        except Exception:
+            if not connection.autocommit:
+                connection.rollback()
+            raise
+        finally:
+            self.put(connection, discard=discard)
+
+    @contextmanager
+    def cursor(self, *args, **kwargs):
+        """ Borrow a cursor; the transaction is committed unless `autocommit` is set. """
+        with self.connection() as connection:
+            cursor = connection.cursor(*args, **kwargs)
+            try:
+                yield cursor
+                if not connection.autocommit:
+                    connection.commit()
+            finally:
+                cursor.close()
+
+    def close(self):
+        """ Close the idle connections. """
+        with self._condition:
+            for connection in self._idle:
+                self.prepared.pop(id(connection), None)
+                connection.close()
+            self._n_connections -= len(self._idle)
+            self._idle = []
+
+
+class Database(object):
+    """ Named lookups over a `ConnectionPool` with per-query latency counters.
+
+    Every named query in `QUERIES` is sent as `PREPARE` the first time a connection runs it;
+    afterwards, only `EXECUTE` is sent so PostgreSQL reuses the plan.
+
+    Args:
+        pool (ConnectionPool, optional)
+        kg_table (str, optional)
+        name_table (str, optional)
+        subject_relation_table (str, optional): see `lib.knowledge_graph.create_subject_relation_index`
+        queries (dict, optional): named queries like `QUERIES`
+        max_latencies (int, optional): number of most recent latencies kept per query
+    """
+
+    def __init__(self,
+                 pool=None,
+                 kg_table=FB2M_KG_TABLE,
+                 name_table=FB2M_NAME_TABLE,
+                 subject_relation_table=FB2M_SUBJECT_RELATION_TABLE,
+                 queries=QUERIES,
+                 max_latencies=10000):
+        self.pool = ConnectionPool() if pool is None else pool
+        self.queries = {
+            name: (types,
+                   query.format(kg=kg_table, name=name_table,
+                                subject_relation=subject_relation_table))
+            for name, (types, query) in queries.items()
+        }
+        self.max_latencies = max_latencies
+        self._latencies = {}
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def _record(self, name, seconds):
+        with self._lock:
+            if name not in self._latencies:
+                self._latencies[name] = deque(maxlen=self.max_latencies)
+            self._latencies[name].append(seconds)
+            self._counts[name] = self._counts.get(name, 0) + 1
+
+    def query(self, name, *args):
+        """ Execute a named query.
+
+        Args:
+            name (str): key of `queries`
+            *args: query parameters
+        Returns:
+            (list of tuples): rows
+        """
+        types, query = self.queries[name]
+        if len(args) != len(types):
+            raise ValueError(
+                'Query %s expects %d parameters, got %d.' % (name, len(types), len(args)))
+        start = time.time()
+        with self.pool.connection() as connection:
+            with connection.cursor() as cursor:
+                prepared = self.pool.prepared[id(connection)]
+                if name not in prepared:
+                    cursor.execute('PREPARE %s (%s) AS %s' % (name, ', '.join(types), query))
+                    prepared.add(name)
+                if len(args) == 0:
+                    cursor.execute('EXECUTE %s' % name)
+                else:
+                    cursor.execute('EXECUTE %s (%s)' % (name, ', '.join(['%s'] * len(args))),
+                                   args)
+                rows = cursor.fetchall()
+        self._record(name, time.time() - start)
+        return rows
+
+    def iterate(self, query, args=None, itersize=10000):
+        """ `iterate_query` on a pooled connection held until the generator is exhausted or
+        closed.
+
+        Args:
+            query (str): SQL query; `{kg}` and `{name}` are not replaced.
+            args (tuple, optional): query parameters
+            itersize (int, optional): number of rows fetched from the server per round trip
+        Returns:
+            (generator): rows
+        """
+        with self.pool.connection() as connection:
+            for row in iterate_query(connection, query, args, itersize=itersize):
+                yield row
+
+    async def query_async(self, name, *args, executor=None):
+        """ `query` in `executor` so the event loop is not blocked.
+
+        Args:
+            executor (concurrent.futures.Executor, optional): by default, the event loop default
+                executor.
+        """
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(executor, lambda: self.query(name, *args))
+
+    def get_stats(self):
+        """
+        Returns:
+            (dict): query name mapped to the number of executions and the recent latencies in
+                milliseconds
+        """
+        with self._lock:
+            latencies = {name: np.array(values) * 1000 for name, values in self._latencies.items()}
+            counts = dict(self._counts)
+        return {
+            name: {
+                'count': counts[name],
+                'mean': float(values.mean()),
+                'p50': float(np.percentile(values, 50)),
+                'p95': float(np.percentile(values, 95)),
+                'max': float(values.max()),
+            } for name, values in latencies.items()
+        }
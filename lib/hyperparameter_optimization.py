@@ -5,12 +5,25 @@ https://scikit-optimize.github.io/.
 Gist: https://gist.github.com/Deepblue129/2c5fae9daf0529ed589018c6353c9f7b
 """
 
+from concurrent.futures import as_completed
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import Future
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import wait
+
 import math
 import logging
 import random
 
+from functools import partial
+from itertools import chain
+
 from tqdm import tqdm
 
+from lib.checkpoint_store import load_checkpoint
+from lib.pruners import Reporter
+from lib.worker_pool import StickyProcessPool
+
 logger = logging.getLogger(__name__)
 
 
@@ -28,6 +41,70 @@ def _random_points(dimensions, n_points, random_seed=None):
     return points
 
 
+class _SerialExecutor(object):
+    """ Executor running every call in the calling process as it is submitted. """
+
+    def submit(self, function, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(function(*args, **kwargs))
+        except Exception as error:
+            future.set_exception(error)
+        return future
+
+    def shutdown(self, wait=True):
+        pass
+
+
+def _get_executor(n_workers, executor):
+    """ Get an executor for `n_workers` unless `executor` is given.
+
+    Returns:
+        executor (concurrent.futures.Executor)
+        is_owned (bool): if True, the caller must shut down the executor.
+    """
+    if executor is not None:
+        return executor, False
+    if n_workers > 1:
+        return ProcessPoolExecutor(max_workers=n_workers), True
+    return _SerialExecutor(), True
+
+
+def _check_pruner(pruner, n_workers, executor):
+    """ Raise if the reports of `pruner` would be lost in worker processes.
+
+    Raises:
+        (ValueError): `pruner` has process local storage and the models run in other processes.
+    """
+    if pruner is None or not isinstance(pruner.storage, dict):
+        return
+    is_process_executor = (executor is None and n_workers > 1) or isinstance(
+        executor, (ProcessPoolExecutor, StickyProcessPool))
+    if is_process_executor:
+        raise ValueError('Every worker process reports to its own copy of the pruner storage; '
+                         'therefore, no model is pruned. Pass the pruner a shared `storage` '
+                         '(e.g. `multiprocessing.Manager().dict()`).')
+
+
+def _submit(executor, key, function, **kwargs):
+    """ Submit `function` pinned to `key` if `executor` supports it (e.g. `StickyProcessPool`). """
+    if hasattr(executor, 'submit_to'):
+        return executor.submit_to(key, function, **kwargs)
+    return executor.submit(function, **kwargs)
+
+
+def _call_with_checkpoint_path(objective, checkpoint_path, **kwargs):
+    """ Load the checkpoint spilled to `checkpoint_path` in the worker and call `objective`. """
+    return objective(checkpoint=load_checkpoint(checkpoint_path), **kwargs)
+
+
+def _release(executor, keys):
+    """ Release the keys pinned by `_submit`. """
+    if hasattr(executor, 'release'):
+        for key in keys:
+            executor.release(key)
+
+
 def successive_halving(
         objective,
         dimensions,
@@ -36,7 +113,13 @@ def successive_halving(
         initial_resources=3,
         n_models=45,
         random_seed=None,
-        progress_bar=True):
+        progress_bar=True,
+        n_workers=1,
+        executor=None,
+        checkpoint_store=None,
+        trial_prefix='',
+        journal=None,
+        pruner=None):
     """
     Adaptation of the Successive Halving algorithm.
 
@@ -57,6 +140,9 @@ def successive_halving(
             Named Args:
                 resources (int): number of resources (e.g. epochs) to use while training model
                 checkpoint (any): saved data from past run
+                report (callable, optional): only passed with a `pruner`; call `report(step, score)`
+                    after `step` resources (e.g. epochs) of this call and stop early if it
+                    returns True.
                 **hyperparameters (any): hyperparameters to run
             Returns:
                 score (float): score to minimize
@@ -69,21 +155,52 @@ def successive_halving(
         n_models (int): Number of models to evaluate
         random_seed (int, optional): Random seed for generating hyperparameters
         progress_bar (boolean or tqdm): Iff to use or update a progress bar.
+        n_workers (int, optional): Number of processes evaluating the models of a rung in
+            parallel. With more than one worker, `objective` and its arguments must be picklable;
+            therefore, return a checkpoint path rather than the model (e.g. `Checkpoint.save`).
+        executor (concurrent.futures.Executor, optional): Executor to evaluate the models with;
+            overrides `n_workers`. With a `lib.worker_pool.StickyProcessPool`, every model is
+            evaluated on the worker that evaluated it in the previous rungs.
+        checkpoint_store (lib.checkpoint_store.CheckpointStore, optional): Store spilling
+            checkpoints to disk; eliminated models are deleted from it. With an executor other
+            than the serial one, every worker loads its checkpoint from disk; therefore, the
+            `directory` must be shared with the workers. By default, every checkpoint is kept in
+            memory.
+        trial_prefix (str, optional): Prefix of the key of every model in `checkpoint_store` and
+            `journal`; it must be unique per successive halving round sharing them.
+        journal (lib.journal.Journal, optional): Journal every completed objective call is
+            appended to; journaled calls, their pruner reports and the models promoted every rung
+            are replayed instead of recomputed. The checkpoints must be paths or
+            `checkpoint_store` must be given.
+        pruner (lib.pruners.PercentilePruner, optional): Pruner stopping models mid-rung based on
+            their reports; pruned models rank below every other model of their rung. With worker
+            processes, its `storage` must be shared between processes.
     Returns:
         scores (list of floats): Scores of the top objective executions
         hyperparameters (list of lists of dict): Hyperparameters with a one to one correspondence
             to scores.
+    Raises:
+        (ValueError): `pruner` storage is not shared with the worker processes.
     """
     if downsample <= 1:
         raise ValueError('Downsample must be > 1; otherwise, the number of resources allocated' +
                          'does not grow')
+    _check_pruner(pruner, n_workers, executor)
 
     round_n_models = lambda n: max(round(n), 1)
+    executor, is_owned_executor = _get_executor(n_workers, executor)
 
     total_resources_per_model = 0
     hyperparameters = _random_points(dimensions, round_n_models(n_models), random_seed)
     checkpoints = [None for _ in range(round_n_models(n_models))]
     scores = [math.inf for _ in range(round_n_models(n_models))]
+    trial_ids = ['%s%d' % (trial_prefix, i) for i in range(round_n_models(n_models))]
+    if journal is not None:
+        # NOTE: Without a `random_seed`, the sampled hyperparameters differ after a restart.
+        records = [journal.get_trial(trial_id, 0) for trial_id in trial_ids]
+        hyperparameters = [p if r is None else r['hyperparameters']
+                           for r, p in zip(records, hyperparameters)]
+    rung = 0
 
     # Create a new progress bar
     remember_to_close = False
@@ -94,48 +211,120 @@ def successive_halving(
         # Keep tabs on a set of stats
         setattr(progress_bar, 'stats', {'min_score': math.inf, 'models_evaluated': 0})
 
-    while total_resources_per_model < max_resources_per_model:
-        # Compute number of resources to continue running each model with
-        if total_resources_per_model == 0:
-            update_n_resources = initial_resources
-        else:
-            update_n_resources = min(
-                total_resources_per_model * downsample - total_resources_per_model,
-                max_resources_per_model - total_resources_per_model)
-
-        results = []
-        for score, checkpoint, params in zip(scores, checkpoints, hyperparameters):
-            new_score, new_checkpoint = objective(
-                resources=update_n_resources, checkpoint=checkpoint, **params)
-            new_score = min(score, new_score)
-            results.append(tuple([new_score, new_checkpoint]))
-            if isinstance(progress_bar, tqdm):
-                progress_bar.update(update_n_resources)
-                if progress_bar.stats['min_score'] > new_score:
-                    progress_bar.stats['min_score'] = new_score
-                    progress_bar.set_postfix(progress_bar.stats)
-
-        total_resources_per_model += update_n_resources
-
-        # NOTE: If this is not the last
-        is_last_iteration = total_resources_per_model >= max_resources_per_model
-        if not is_last_iteration:
-            # Sort by minimum score `k[0][0]`
-            results = sorted(zip(results, hyperparameters), key=lambda k: k[0][0])
-            models_evaluated = len(results) - round_n_models(n_models / downsample)
-            results = results[:round_n_models(n_models / downsample)]
-            # Update `hyperparameters` lists
-            results, hyperparameters = zip(*results)
-            n_models = n_models / downsample
-        else:
-            models_evaluated = len(results)
+    try:
+        while total_resources_per_model < max_resources_per_model:
+            # Compute number of resources to continue running each model with
+            if total_resources_per_model == 0:
+                update_n_resources = initial_resources
+            else:
+                update_n_resources = min(
+                    total_resources_per_model * downsample - total_resources_per_model,
+                    max_resources_per_model - total_resources_per_model)
+
+            # NOTE: Every model in a rung is independent; therefore, they are evaluated
+            # concurrently and the progress bar is updated as they complete.
+            futures = {}
+            replayed = []
+            for i, (checkpoint, params) in enumerate(zip(checkpoints, hyperparameters)):
+                record = None if journal is None else journal.get_trial(trial_ids[i], rung)
+                if record is not None:
+                    if pruner is not None and record.get('pruner_state') is not None:
+                        pruner.set_state(trial_ids[i], record['pruner_state'])
+                    replayed.append((i, record))
+                    continue
+                kwargs = dict(params)
+                if pruner is not None:
+                    kwargs['report'] = Reporter(pruner, trial_ids[i], total_resources_per_model)
+                function = objective
+                if checkpoint_store is None or checkpoint is None:
+                    kwargs['checkpoint'] = checkpoint
+                elif isinstance(executor, _SerialExecutor):
+                    # NOTE: The call runs before the next model is submitted; therefore, at most
+                    # one checkpoint is loaded at a time and warm ones come from the LRU.
+                    kwargs['checkpoint'] = checkpoint_store.get(checkpoint)
+                else:
+                    # NOTE: Pending calls would hold every checkpoint of the rung in memory and
+                    # pickle each to its worker; therefore, the worker loads it from disk.
+                    function = partial(_call_with_checkpoint_path, objective)
+                    kwargs['checkpoint_path'] = checkpoint_store.get_path(checkpoint)
+                future = _submit(
+                    executor, trial_ids[i], function, resources=update_n_resources, **kwargs)
+                futures[future] = i
+            results = [None for _ in range(len(checkpoints))]
+            is_pruned = [False for _ in range(len(checkpoints))]
+            completed = chain(
+                ((i, r['score'], r['checkpoint'], True) for i, r in replayed),
+                ((futures[f], ) + tuple(f.result()) + (False, ) for f in as_completed(futures)))
+            for i, new_score, new_checkpoint, is_replayed in completed:
+                new_score = min(scores[i], new_score)
+                if is_replayed:
+                    is_pruned[i] = journal.get_trial(trial_ids[i], rung).get('pruned', False)
+                elif pruner is not None:
+                    is_pruned[i] = pruner.is_pruned(trial_ids[i], total_resources_per_model)
+                if checkpoint_store is not None and not is_replayed:
+                    # NOTE: Every rung is stored under a new key; therefore, if the process dies
+                    # before the call is journaled, the resumed call starts from the journaled
+                    # checkpoint rather than from the one this call already advanced.
+                    key = '%s-rung%d' % (trial_ids[i], rung)
+                    checkpoint_store.put(key, new_checkpoint)
+                    new_checkpoint = key
+                if journal is not None and not is_replayed:
+                    pruner_state = None if pruner is None else pruner.get_state(trial_ids[i])
+                    journal.record_trial(trial_ids[i], rung, update_n_resources, new_score,
+                                         new_checkpoint, hyperparameters[i], is_pruned[i],
+                                         pruner_state)
+                if (checkpoint_store is not None and checkpoints[i] is not None and
+                        checkpoints[i] != new_checkpoint):
+                    # The previous rung checkpoint is deleted once the new one is journaled
+                    checkpoint_store.delete(checkpoints[i])
+                results[i] = tuple([new_score, new_checkpoint])
+                if isinstance(progress_bar, tqdm):
+                    progress_bar.update(update_n_resources)
+                    if progress_bar.stats['min_score'] > new_score:
+                        progress_bar.stats['min_score'] = new_score
+                        progress_bar.set_postfix(progress_bar.stats)
+
+            total_resources_per_model += update_n_resources
+            rung += 1
+
+            # NOTE: If this is not the last
+            is_last_iteration = total_resources_per_model >= max_resources_per_model
+            if not is_last_iteration:
+                # Sort pruned models `k[3]` last and then by minimum score `k[0][0]`
+                results = sorted(
+                    zip(results, hyperparameters, trial_ids, is_pruned),
+                    key=lambda k: (k[3], k[0][0]))
+                survivors = None if journal is None else journal.get_rung(trial_prefix, rung - 1)
+                if survivors is not None:
+                    # NOTE: A resumed round promotes the journaled survivors even if a replayed
+                    # score or pruner decision differs.
+                    order = {trial_id: j for j, trial_id in enumerate(survivors)}
+                    results = sorted(results, key=lambda k: order.get(k[2], len(order)))
+                models_evaluated = len(results) - round_n_models(n_models / downsample)
+                eliminated = results[round_n_models(n_models / downsample):]
+                _release(executor, [k[2] for k in eliminated])
+                if checkpoint_store is not None:
+                    for (_, checkpoint), _, _, _ in eliminated:
+                        checkpoint_store.delete(checkpoint)
+                results = results[:round_n_models(n_models / downsample)]
+                # Update `hyperparameters` lists
+                results, hyperparameters, trial_ids, _ = zip(*results)
+                if journal is not None and survivors is None:
+                    journal.record_rung(trial_prefix, rung - 1, trial_ids)
+                n_models = n_models / downsample
+            else:
+                models_evaluated = len(results)
+
+            # Update `scores` and `checkpoints` lists
+            scores, checkpoints = zip(*results)
 
-        # Update `scores` and `checkpoints` lists
-        scores, checkpoints = zip(*results)
-
-        if isinstance(progress_bar, tqdm):
-            progress_bar.stats['models_evaluated'] += models_evaluated
-            progress_bar.set_postfix(progress_bar.stats)
+            if isinstance(progress_bar, tqdm):
+                progress_bar.stats['models_evaluated'] += models_evaluated
+                progress_bar.set_postfix(progress_bar.stats)
+        _release(executor, trial_ids)
+    finally:
+        if is_owned_executor:
+            executor.shutdown()
 
     if remember_to_close:
         progress_bar.close()
@@ -149,7 +338,12 @@ def hyperband(objective,
               downsample=3,
               total_resources=None,
               random_seed=None,
-              progress_bar=True):
+              progress_bar=True,
+              n_workers=1,
+              executor=None,
+              checkpoint_store=None,
+              journal=None,
+              pruner=None):
     """
     Adaptation of the Hyperband algorithm
 
@@ -184,15 +378,29 @@ def hyperband(objective,
             entirety of the algorithm.
         random_seed (int, optional): Random seed for generating hyperparameters
         progress_bar (boolean, optional): Boolean for displaying tqdm
+        n_workers (int, optional): Number of processes evaluating models in parallel; see
+            `successive_halving`.
+        executor (concurrent.futures.Executor, optional): Executor shared by every successive
+            halving round; overrides `n_workers`.
+        checkpoint_store (lib.checkpoint_store.CheckpointStore, optional): see
+            `successive_halving`
+        journal (lib.journal.Journal, optional): see `successive_halving`; after a restart, every
+            completed objective call is replayed.
+        pruner (lib.pruners.PercentilePruner, optional): see `successive_halving`; models are
+            compared with the models of every round at the same number of resources.
     Returns:
         scores (list of floats): Scores of the top objective executions
         hyperparameters (list of lists of dict): Hyperparameters with a one to one correspondence
             to scores.
+    Raises:
+        (ValueError): `pruner` storage is not shared with the worker processes.
     """
     if downsample <= 1:
         raise ValueError('Downsample must be > 1; otherwise, the number of resources allocated' +
                          'does not grow')
 
+    _check_pruner(pruner, n_workers, executor)
+
     all_scores = []
     all_hyperparameters = []
 
@@ -214,38 +422,49 @@ def hyperband(objective,
         progress_bar = tqdm(total=total_resources_per_round * n_hyperband_rounds)
         setattr(progress_bar, 'stats', {'min_score': math.inf, 'models_evaluated': 0})
 
-    for i in reversed(range(n_hyperband_rounds)):
-        n_successive_halving_rounds = i + 1
-
-        # NOTE: Attained by running the below code on https://sandbox.open.wolframcloud.com:
-        #   Reduce[Power[d, j - 1] * (x / Power[d, j]) +
-        #   Sum[(Power[d, i] - Power[d, i - 1]) * (x / Power[d, i]), {i, j, k}] == e
-        #   && k >=j>=1 && k>=1 && d>=1, {x}]
-        # `e` is `total_resources_per_round`
-        # `x` is `n_models`
-        # `k - j` is `i`
-        # `d` is downsample
-        # The summation is similar to the successive halving rounds loop. It computes the number
-        # of resources with reuse run in total. This is different from hyperband that assumes
-        # no reuse.
-        n_models = downsample * total_resources_per_round
-        n_models /= downsample * (1 + i) - i
-        n_models /= downsample**(-i + n_hyperband_rounds - 1)
-        total_models_evaluated += n_models
-
-        scores, hyperparameters = successive_halving(
-            objective=objective,
-            dimensions=dimensions,
-            max_resources_per_model=max_resources_per_model,
-            downsample=downsample,
-            initial_resources=max_resources_per_model / downsample**i,
-            n_models=n_models,
-            random_seed=random_seed,
-            progress_bar=progress_bar)
-        logger.info('Finished hyperband round: %d of %d', n_hyperband_rounds - i - 1,
-                    n_hyperband_rounds - 1)
-        all_scores.extend(scores)
-        all_hyperparameters.extend(hyperparameters)
+    executor, is_owned_executor = _get_executor(n_workers, executor)
+
+    try:
+        for i in reversed(range(n_hyperband_rounds)):
+            n_successive_halving_rounds = i + 1
+
+            # NOTE: Attained by running the below code on https://sandbox.open.wolframcloud.com:
+            #   Reduce[Power[d, j - 1] * (x / Power[d, j]) +
+            #   Sum[(Power[d, i] - Power[d, i - 1]) * (x / Power[d, i]), {i, j, k}] == e
+            #   && k >=j>=1 && k>=1 && d>=1, {x}]
+            # `e` is `total_resources_per_round`
+            # `x` is `n_models`
+            # `k - j` is `i`
+            # `d` is downsample
+            # The summation is similar to the successive halving rounds loop. It computes the number
+            # of resources with reuse run in total. This is different from hyperband that assumes
+            # no reuse.
+            n_models = downsample * total_resources_per_round
+            n_models /= downsample * (1 + i) - i
+            n_models /= downsample**(-i + n_hyperband_rounds - 1)
+            total_models_evaluated += n_models
+
+            scores, hyperparameters = successive_halving(
+                objective=objective,
+                dimensions=dimensions,
+                max_resources_per_model=max_resources_per_model,
+                downsample=downsample,
+                initial_resources=max_resources_per_model / downsample**i,
+                n_models=n_models,
+                random_seed=random_seed,
+                progress_bar=progress_bar,
+                executor=executor,
+                checkpoint_store=checkpoint_store,
+                trial_prefix='%d.' % i,
+                journal=journal,
+                pruner=pruner)
+            logger.info('Finished hyperband round: %d of %d', n_hyperband_rounds - i - 1,
+                        n_hyperband_rounds - 1)
+            all_scores.extend(scores)
+            all_hyperparameters.extend(hyperparameters)
+    finally:
+        if is_owned_executor:
+            executor.shutdown()
 
     if isinstance(progress_bar, tqdm):
         progress_bar.close()
@@ -258,12 +477,150 @@ def hyperband(objective,
     return all_scores, all_hyperparameters
 
 
+def _get_rung_resources(max_resources_per_model, downsample, initial_resources):
+    """ Total resources (e.g. epochs) of every model at the end of each rung. """
+    rung_resources = [min(initial_resources, max_resources_per_model)]
+    while rung_resources[-1] < max_resources_per_model:
+        rung_resources.append(min(rung_resources[-1] * downsample, max_resources_per_model))
+    return rung_resources
+
+
+def asynchronous_successive_halving(objective,
+                                    dimensions,
+                                    max_resources_per_model=81,
+                                    downsample=3,
+                                    initial_resources=3,
+                                    n_models=45,
+                                    random_seed=None,
+                                    progress_bar=True,
+                                    n_workers=1,
+                                    executor=None):
+    """
+    Adaptation of the Asynchronous Successive Halving algorithm (ASHA).
+
+    tl;dr `successive_halving` without the rung barrier; a model is promoted as soon as it ranks
+    in the top `1 / downsample` of the models its rung completed so far. Otherwise, a new model is
+    started; therefore, workers never wait on stragglers.
+
+    Adaptation: Like `successive_halving`, a promoted model continues from its checkpoint.
+
+    Reference: https://arxiv.org/pdf/1810.05934.pdf
+
+    Args:
+        objective (callable): objective function to minimize; see `successive_halving`.
+        dimensions (list of skopt.Dimensions): list of dimensions to minimize under
+        max_resources_per_model: Max number of resources (e.g. epochs) to use per model
+        downsample: Downsampling of models (e.g. halving is a downsampling of 2)
+        initial_resources: Number of resources (e.g. epochs) to use initially to evaluate the
+            first rung.
+        n_models (int): Number of models to start
+        random_seed (int, optional): Random seed for generating hyperparameters
+        progress_bar (boolean or tqdm): Iff to use or update a progress bar.
+        n_workers (int, optional): Number of models evaluated concurrently in processes
+        executor (concurrent.futures.Executor, optional): Executor to evaluate the models with;
+            `n_workers` models are submitted to it at once.
+    Returns:
+        scores (list of floats): Scores of the models in the highest rung reached from best to
+            worst
+        hyperparameters (list of lists of dict): Hyperparameters with a one to one correspondence
+            to scores.
+    """
+    if downsample <= 1:
+        raise ValueError('Downsample must be > 1; otherwise, the number of resources allocated' +
+                         'does not grow')
+
+    n_models = max(round(n_models), 1)
+    hyperparameters = _random_points(dimensions, n_models, random_seed)
+    scores = [math.inf for _ in range(n_models)]
+    checkpoints = [None for _ in range(n_models)]
+    rung_resources = _get_rung_resources(max_resources_per_model, downsample, initial_resources)
+    # `rungs[k]` lists the `(score, model)` pairs that completed rung `k`
+    rungs = [[] for _ in rung_resources]
+    promoted = [set() for _ in rung_resources]
+    n_started = 0
+
+    executor, is_owned_executor = _get_executor(n_workers, executor)
+    n_slots = 1 if isinstance(executor, _SerialExecutor) else n_workers
+
+    remember_to_close = False
+    if not isinstance(progress_bar, tqdm) and progress_bar:
+        remember_to_close = True
+        progress_bar = tqdm()
+        setattr(progress_bar, 'stats', {'min_score': math.inf, 'models_evaluated': 0})
+
+    def get_job():
+        """ Promote a model from the highest possible rung; otherwise, start a new model. """
+        for k in reversed(range(len(rung_resources) - 1)):
+            n_promotable = len(rungs[k]) // downsample
+            for _, model in sorted(rungs[k])[:n_promotable]:
+                if model not in promoted[k]:
+                    promoted[k].add(model)
+                    return model, k + 1
+        nonlocal n_started
+        if n_started < n_models:
+            n_started += 1
+            return n_started - 1, 0
+        return None
+
+    running = {}
+    try:
+        while True:
+            while len(running) < n_slots:
+                job = get_job()
+                if job is None:
+                    break
+                model, rung = job
+                resources = rung_resources[rung] - (rung_resources[rung - 1] if rung > 0 else 0)
+                future = executor.submit(
+                    objective,
+                    resources=resources,
+                    checkpoint=checkpoints[model],
+                    **hyperparameters[model])
+                running[future] = (model, rung, resources)
+
+            if len(running) == 0:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                model, rung, resources = running.pop(future)
+                new_score, checkpoints[model] = future.result()
+                scores[model] = min(scores[model], new_score)
+                rungs[rung].append(tuple([scores[model], model]))
+                if isinstance(progress_bar, tqdm):
+                    progress_bar.update(resources)
+                    if rung == len(rung_resources) - 1:
+                        progress_bar.stats['models_evaluated'] += 1
+                    if progress_bar.stats['min_score'] > scores[model]:
+                        progress_bar.stats['min_score'] = scores[model]
+                    progress_bar.set_postfix(progress_bar.stats)
+    finally:
+        if is_owned_executor:
+            executor.shutdown()
+
+    if remember_to_close:
+        progress_bar.close()
+
+    top_rung = sorted(next(rung for rung in reversed(rungs) if len(rung) > 0))
+    return ([scores[model] for _, model in top_rung],
+            [hyperparameters[model] for _, model in top_rung])
+
+
 ### TEST ###
 import unittest
 
+import multiprocessing
+import os
 import random
+import tempfile
+
 from skopt.space import Real, Integer
 
+from lib.checkpoint_store import CheckpointStore
+from lib.journal import Journal
+from lib.pruners import MedianPruner
+from lib.worker_pool import get_trial_cache
+
 from lib.utils import config_logging
 config_logging()
 
@@ -277,6 +634,21 @@ def mock(resources, integer=0, checkpoint=None):
     return integer, integer
 
 
+def pruned_mock(resources, integer=0, checkpoint=None, report=None):
+    for epoch in range(int(resources)):
+        if report is not None and report(epoch + 1, integer):
+            break
+    return integer, integer
+
+
+def sticky_mock(resources, integer=0, checkpoint=None):
+    # A promoted model is warm iff the worker still caches its last checkpoint
+    cache = get_trial_cache()
+    is_warm = checkpoint is None or cache.get('checkpoint') == checkpoint
+    cache['checkpoint'] = (integer, os.getpid(), resources)
+    return integer if is_warm else -math.inf, cache['checkpoint']
+
+
 class TestHyperparameterOptimization(unittest.TestCase):
 
     def test_hyperband_simple(self):
@@ -305,6 +677,253 @@ class TestHyperparameterOptimization(unittest.TestCase):
         for score, hyperparameter in zip(scores, hyperparameters):
             self.assertEqual(score, hyperparameter['integer'])
 
+    def test_successive_halving_n_workers(self):
+        # Parallel rungs return the same results as serial rungs
+        expected = successive_halving(
+            objective=mock, dimensions=mock_dimensions, progress_bar=False, random_seed=123)
+        scores, hyperparameters = successive_halving(
+            objective=mock,
+            dimensions=mock_dimensions,
+            progress_bar=False,
+            random_seed=123,
+            n_workers=2)
+        self.assertEqual(list(scores), list(expected[0]))
+        self.assertEqual(list(hyperparameters), list(expected[1]))
+
+    def test_hyperband_executor(self):
+        executor = ProcessPoolExecutor(max_workers=2)
+        scores, hyperparameters = hyperband(
+            objective=mock, dimensions=mock_dimensions, progress_bar=False, executor=executor)
+        executor.shutdown()
+        for score, hyperparameter in zip(scores, hyperparameters):
+            self.assertEqual(score, hyperparameter['integer'])
+
+    def test_hyperband_sticky_process_pool(self):
+        with StickyProcessPool(n_workers=2) as executor:
+            scores, hyperparameters = hyperband(
+                objective=sticky_mock,
+                dimensions=mock_dimensions,
+                progress_bar=False,
+                executor=executor)
+            self.assertEqual(len(executor._assignments), 0)
+        for score, hyperparameter in zip(scores, hyperparameters):
+            self.assertEqual(score, hyperparameter['integer'])
+
+    def test_successive_halving_objective_error(self):
+
+        def fail(*args, **kwargs):
+            raise RuntimeError('Out of memory')
+
+        with self.assertRaises(RuntimeError):
+            successive_halving(objective=fail, dimensions=mock_dimensions, progress_bar=False)
+
+    def test_asynchronous_successive_halving(self):
+        scores, hyperparameters = asynchronous_successive_halving(
+            objective=mock, dimensions=mock_dimensions, progress_bar=False, random_seed=123)
+        for score, hyperparameter in zip(scores, hyperparameters):
+            self.assertEqual(score, hyperparameter['integer'])
+        self.assertEqual(list(scores), sorted(scores))
+        # The best model of the first rung is promoted to the last rung
+        points = _random_points(mock_dimensions, 45, 123)
+        self.assertEqual(scores[0], min(p['integer'] for p in points))
+
+    def test_asynchronous_successive_halving_n_workers(self):
+        scores, hyperparameters = asynchronous_successive_halving(
+            objective=mock, dimensions=mock_dimensions, n_workers=2, n_models=9)
+        self.assertGreater(len(scores), 0)
+        for score, hyperparameter in zip(scores, hyperparameters):
+            self.assertEqual(score, hyperparameter['integer'])
+
+    def test_get_rung_resources(self):
+        self.assertEqual(_get_rung_resources(81, 3, 3), [3, 9, 27, 81])
+        self.assertEqual(_get_rung_resources(30, 3, 3), [3, 9, 27, 30])
+        self.assertEqual(_get_rung_resources(1, 3, 3), [1])
+
+    def test_successive_halving_checkpoint_store(self):
+        with tempfile.TemporaryDirectory() as directory:
+            checkpoint_store = CheckpointStore(directory, max_in_memory=1)
+            scores, hyperparameters = successive_halving(
+                objective=mock,
+                dimensions=mock_dimensions,
+                progress_bar=False,
+                n_models=9,
+                checkpoint_store=checkpoint_store)
+            for score, hyperparameter in zip(scores, hyperparameters):
+                self.assertEqual(score, hyperparameter['integer'])
+            # Only the checkpoints of the surviving models are kept
+            self.assertEqual(len(os.listdir(directory)), len(scores))
+
+    def test_successive_halving_checkpoint_store_executor(self):
+
+        class WorkerLoadedStore(CheckpointStore):
+
+            def get(self, key):
+                raise AssertionError('Workers load their checkpoints.')
+
+        with tempfile.TemporaryDirectory() as directory:
+            with ProcessPoolExecutor(max_workers=2) as executor:
+                scores, hyperparameters = successive_halving(
+                    objective=mock,
+                    dimensions=mock_dimensions,
+                    progress_bar=False,
+                    n_models=9,
+                    executor=executor,
+                    checkpoint_store=WorkerLoadedStore(directory, max_in_memory=1))
+            for score, hyperparameter in zip(scores, hyperparameters):
+                self.assertEqual(score, hyperparameter['integer'])
+            self.assertEqual(len(os.listdir(directory)), len(scores))
+
+    def test_successive_halving_pruner(self):
+        epochs = []
+
+        def objective(resources, integer=0, checkpoint=None, report=None):
+            for epoch in range(int(resources)):
+                epochs.append(integer)
+                if report is not None and report(epoch + 1, integer):
+                    break
+            return integer, integer
+
+        kwargs = {
+            'objective': objective,
+            'dimensions': mock_dimensions,
+            'progress_bar': False,
+            'random_seed': 123,
+            'n_models': 9,
+            'max_resources_per_model': 27,
+        }
+        expected = successive_halving(**kwargs)
+        n_epochs = len(epochs)
+
+        del epochs[:]
+        scores, hyperparameters = successive_halving(
+            pruner=MedianPruner(n_startup_trials=2), **kwargs)
+        self.assertLess(len(epochs), n_epochs)
+        self.assertEqual(min(scores), min(expected[0]))
+        for score, hyperparameter in zip(scores, hyperparameters):
+            self.assertEqual(score, hyperparameter['integer'])
+
+    def test_successive_halving_pruner_process_pool(self):
+        kwargs = {
+            'objective': pruned_mock,
+            'dimensions': mock_dimensions,
+            'progress_bar': False,
+            'random_seed': 123,
+            'n_models': 9,
+            'max_resources_per_model': 27,
+        }
+        expected = successive_halving(**kwargs)
+
+        # The reports of every worker process are lost without a shared storage
+        with self.assertRaises(ValueError):
+            successive_halving(n_workers=2, pruner=MedianPruner(n_startup_trials=2), **kwargs)
+
+        with multiprocessing.Manager() as manager:
+            pruner = MedianPruner(n_startup_trials=2, storage=manager.dict())
+            with ProcessPoolExecutor(max_workers=2) as executor:
+                scores, hyperparameters = successive_halving(
+                    executor=executor, pruner=pruner, **kwargs)
+            self.assertTrue(any(key[0] == 'pruned' for key in pruner.storage.keys()))
+        self.assertEqual(min(scores), min(expected[0]))
+        for score, hyperparameter in zip(scores, hyperparameters):
+            self.assertEqual(score, hyperparameter['integer'])
+
+    def test_hyperband_journal(self):
+        calls = []
+
+        def objective(resources, integer=0, checkpoint=None):
+            calls.append(integer)
+            if crash and len(calls) == 20:
+                raise RuntimeError('Process died')
+            return mock(resources, integer, checkpoint)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'journal.jsonl')
+            kwargs = {
+                'objective': objective,
+                'dimensions': mock_dimensions,
+                'progress_bar': False,
+                'random_seed': 123,
+                'checkpoint_store': CheckpointStore(os.path.join(directory, 'checkpoints')),
+            }
+            crash = False
+            expected = hyperband(**kwargs)
+            n_calls = len(calls)
+
+            crash = True
+            del calls[:]
+            with self.assertRaises(RuntimeError):
+                hyperband(journal=Journal(path), **kwargs)
+
+            # Resume skipping the journaled objective calls
+            crash = False
+            del calls[:]
+            scores, hyperparameters = hyperband(journal=Journal(path), **kwargs)
+            self.assertLess(len(calls), n_calls)
+            self.assertEqual(list(scores), list(expected[0]))
+            self.assertEqual(list(hyperparameters), list(expected[1]))
+
+            # Every call is journaled; therefore, a second resume calls nothing.
+            del calls[:]
+            hyperband(journal=Journal(path), **kwargs)
+            self.assertEqual(len(calls), 0)
+
+    def test_successive_halving_journal_checkpoint(self):
+        records = []
+        n_previous_calls = []
+
+        def objective(resources, integer=0, checkpoint=None, report=None):
+            # The checkpoint lists the calls the model trained for; a call starting from a
+            # checkpoint that already includes its rung is counted twice.
+            calls = [] if checkpoint is None else checkpoint
+            n_previous_calls.append(len(calls) - [3, 6, 18].index(resources))
+            for epoch in range(int(resources)):
+                if report(epoch + 1, integer):
+                    break
+            return integer, calls + [resources]
+
+        class CrashingJournal(Journal):
+
+            def record_trial(self, *args, **kwargs):
+                records.append(args)
+                if crash and len(records) == 12:
+                    raise RuntimeError('Process died')
+                return super().record_trial(*args, **kwargs)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'journal.jsonl')
+            kwargs = {
+                'objective': objective,
+                'dimensions': mock_dimensions,
+                'progress_bar': False,
+                'random_seed': 123,
+                'n_models': 9,
+                'max_resources_per_model': 27,
+            }
+            store = CheckpointStore(os.path.join(directory, 'checkpoints'))
+            crash = True
+            # The checkpoint of the 12th call is stored but the process dies before journaling it
+            with self.assertRaises(RuntimeError):
+                successive_halving(
+                    checkpoint_store=store,
+                    journal=CrashingJournal(path),
+                    pruner=MedianPruner(n_startup_trials=2),
+                    **kwargs)
+
+            crash = False
+            journal = CrashingJournal(path)
+            pruner = MedianPruner(n_startup_trials=2)
+            scores, hyperparameters = successive_halving(
+                checkpoint_store=store, journal=journal, pruner=pruner, **kwargs)
+            for score, hyperparameter in zip(scores, hyperparameters):
+                self.assertEqual(score, hyperparameter['integer'])
+            # Every call started from the checkpoint of the previous rung
+            self.assertEqual(set(n_previous_calls), {0})
+            # The reports of the replayed calls are restored
+            replayed_state = journal.get_trial('0', 0)['pruner_state']
+            self.assertEqual(pruner.get_state('0')['scores'][:3], replayed_state['scores'])
+            # Only the checkpoints of the surviving models are kept
+            self.assertEqual(len(os.listdir(os.path.join(directory, 'checkpoints'))), len(scores))
+
     def test_successive_halving_downsample(self):
         with self.assertRaises(ValueError):
             successive_halving(
@@ -0,0 +1,131 @@
+"""
+Append-only journal of hyperparameter search trials.
+
+Motivation: `hyperband` runs for days and its scores and checkpoints only live in local variables;
+if the process dies, every completed objective call is lost. Here, every completed call is
+appended to a JSON lines file; on restart, `successive_halving` replays the journaled calls
+instead of recomputing them and continues from the last rung.
+
+Example:
+    journal = Journal('experiments/hyperband.jsonl')
+    hyperband(objective, space, journal=journal)
+"""
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+
+def _to_json(value):
+    """ JSON default for NumPy scalars sampled by `skopt` dimensions. """
+    if hasattr(value, 'item'):
+        return value.item()
+    raise TypeError('%r is not JSON serializable' % (value,))
+
+
+class Journal(object):
+    """
+    Args:
+        path (str): JSON lines file; existing records are loaded to resume from.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._trials = {}
+        self._rungs = {}
+        self.n_records = 0
+        if os.path.isfile(path):
+            with open(path, 'r') as file_:
+                for line in file_:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # NOTE: The process can die while appending the last record.
+                        logger.warning('Skipping a partial journal record: %s', line)
+                        continue
+                    self._load(record)
+            logger.info('Loaded %d journal records from %s', self.n_records, path)
+
+    def _load(self, record):
+        self.n_records += 1
+        if record['type'] == 'trial':
+            self._trials[(record['trial_id'], record['rung'])] = record
+        elif record['type'] == 'rung':
+            self._rungs[(record['trial_prefix'], record['rung'])] = record
+
+    def _append(self, record):
+        line = json.dumps(record, default=_to_json, sort_keys=True)
+        with open(self.path, 'a') as file_:
+            file_.write(line + '\n')
+            file_.flush()
+            os.fsync(file_.fileno())
+        self._load(json.loads(line))
+
+    def record_trial(self,
+                     trial_id,
+                     rung,
+                     resources,
+                     score,
+                     checkpoint,
+                     hyperparameters,
+                     is_pruned=False,
+                     pruner_state=None):
+        """ Record a completed objective call.
+
+        Args:
+            trial_id (str): model identifier
+            rung (int): rung of the model in its successive halving round
+            resources (float): resources used by the call
+            score (float): best score of the model so far
+            checkpoint (str or None): checkpoint path or `CheckpointStore` key
+            hyperparameters (dict)
+            is_pruned (bool, optional): if True, the call was stopped early by a pruner
+            pruner_state (dict, optional): `PercentilePruner.get_state` of the model after the call
+        Raises:
+            (ValueError): `checkpoint` cannot be journaled
+        """
+        if checkpoint is not None and not isinstance(checkpoint, str):
+            raise ValueError('The journal requires the objective to return a checkpoint path or '
+                             'a `checkpoint_store`.')
+        self._append({
+            'type': 'trial',
+            'trial_id': trial_id,
+            'rung': rung,
+            'resources': resources,
+            'score': score,
+            'checkpoint': checkpoint,
+            'hyperparameters': hyperparameters,
+            'pruned': is_pruned,
+            'pruner_state': pruner_state,
+        })
+
+    def get_trial(self, trial_id, rung):
+        """
+        Returns:
+            (dict or None): record of a completed objective call
+        """
+        return self._trials.get((trial_id, rung))
+
+    def record_rung(self, trial_prefix, rung, survivors):
+        """ Record the models promoted past `rung` of a successive halving round.
+
+        Args:
+            trial_prefix (str): successive halving round
+            rung (int)
+            survivors (list of str): trial ids of the promoted models
+        """
+        self._append({
+            'type': 'rung',
+            'trial_prefix': trial_prefix,
+            'rung': rung,
+            'survivors': list(survivors),
+        })
+
+    def get_rung(self, trial_prefix, rung):
+        """
+        Returns:
+            (list of str or None): trial ids of the models promoted past `rung`, if recorded
+        """
+        record = self._rungs.get((trial_prefix, rung))
+        return None if record is None else record['survivors']
@@ -0,0 +1,174 @@
+import logging
+
+from collections import defaultdict
+
+from lib.database import Database
+from lib.utils import FB2M_KG_TABLE
+from lib.utils import FB2M_SUBJECT_RELATION_TABLE
+
+logger = logging.getLogger(__name__)
+
+
+def to_candidate_facts(rows):
+    """ Group `(subject_mid, relation, object_mid)` rows like `Step 3 - Predict Relation and Finish`.
+
+    Returns:
+        (dict): relation mapped to a dict of subject MIDs mapped to a set of object MIDs
+    """
+    candidate_facts = defaultdict(lambda: defaultdict(set))
+    for subject_mid, relation, object_mid in rows:
+        candidate_facts[relation][subject_mid].add(object_mid)
+    return {relation: dict(subjects) for relation, subjects in candidate_facts.items()}
+
+
+def to_candidate_relations(rows):
+    """ Group `(subject_mid, relation, n_objects)` rows.
+
+    Returns:
+        (dict): relation mapped to a dict of subject MIDs mapped to their number of objects
+    """
+    candidate_relations = defaultdict(dict)
+    for subject_mid, relation, n_objects in rows:
+        candidate_relations[relation][subject_mid] = n_objects
+    return dict(candidate_relations)
+
+
+def to_objects(rows):
+    """ Group `(subject_mid, relation, object_mid)` rows.
+
+    Returns:
+        (dict): `(subject_mid, relation)` mapped to a set of object MIDs
+    """
+    objects = defaultdict(set)
+    for subject_mid, relation, object_mid in rows:
+        objects[(subject_mid, relation)].add(object_mid)
+    return dict(objects)
+
+
+def create_subject_relation_index(cursor, kg_table=FB2M_KG_TABLE,
+                                  table=FB2M_SUBJECT_RELATION_TABLE):
+    """ Create the compact subject to relation set index used for relation first retrieval and
+    a `(subject_mid, relation)` index on the KG table to fetch objects of a winning pair.
+
+    Args:
+        cursor (psycopg2.extensions.cursor)
+        kg_table (str, optional)
+        table (str, optional): new table with `subject_mid`, `relation` and `n_objects` columns
+    """
+    cursor.execute("""
+        CREATE TABLE {table} AS
+            SELECT subject_mid, relation, count(*) AS n_objects
+            FROM {kg}
+            GROUP BY subject_mid, relation;
+        CREATE INDEX {table}_subject_mid_index ON {table} (subject_mid);
+        CREATE INDEX {kg}_subject_mid_relation_index ON {kg} (subject_mid, relation);
+        """.format(table=table, kg=kg_table))
+
+
+class DatabaseKnowledgeGraph(object):
+    """ Knowledge graph facts from the PostgreSQL KG table.
+
+    Relation first retrieval, `get_candidate_relations` and then `get_objects` for the winning
+    pairs, requires `create_subject_relation_index`.
+
+    Args:
+        database (lib.database.Database, optional): pooled database running the `candidate_facts`,
+            `candidate_relations` and `objects` queries; its `kg_table` and
+            `subject_relation_table` select the tables. By default, `Database()`.
+    """
+
+    def __init__(self, database=None):
+        self.database = Database() if database is None else database
+
+    def get_candidate_facts(self, mids):
+        """
+        Args:
+            mids (list of str): candidate subject MIDs
+        Returns:
+            (dict): relation mapped to a dict of subject MIDs mapped to a set of object MIDs
+        """
+        return to_candidate_facts(self.database.query('candidate_facts', list(mids)))
+
+    def get_candidate_relations(self, mids):
+        """ Relations of the candidate MIDs without fetching their objects.
+
+        Args:
+            mids (list of str): candidate subject MIDs
+        Returns:
+            (dict): relation mapped to a dict of subject MIDs mapped to their number of objects
+        """
+        return to_candidate_relations(self.database.query('candidate_relations', list(mids)))
+
+    def get_objects(self, pairs):
+        """
+        Args:
+            pairs (list of tuples): `(subject_mid, relation)` pairs
+        Returns:
+            (dict): `(subject_mid, relation)` mapped to a set of object MIDs
+        """
+        pairs = list(pairs)
+        return to_objects(
+            self.database.query('objects', [p[0] for p in pairs], [p[1] for p in pairs]))
+
+
+class InMemoryKnowledgeGraph(object):
+    """ Knowledge graph facts held in memory; a stand-in for the PostgreSQL KG table.
+
+    Args:
+        facts (iterable of tuples): `(subject_mid, relation, object_mid)` facts
+    """
+
+    def __init__(self, facts):
+        self._facts = defaultdict(list)
+        n_facts = 0
+        for subject_mid, relation, object_mid in facts:
+            self._facts[subject_mid].append((relation, object_mid))
+            n_facts += 1
+        self._facts = dict(self._facts)
+        logger.info('Loaded %d facts for %d subjects', n_facts, len(self._facts))
+
+    @classmethod
+    def from_file(cls, path):
+        """ Load a SimpleQuestions Freebase subset (e.g. `lib.utils.FB2M_KG`).
+
+        Example line:
+            www.freebase.com/m/01g4wmh	www.freebase.com/music/album/release_type	www.freebase.com/m/02lx2r
+        """
+
+        def facts():
+            with open(path) as file_:
+                for line in file_:
+                    subject, relation, objects = line.strip().split('\t')
+                    subject = subject.replace('www.freebase.com/m/', '')
+                    relation = relation.replace('www.freebase.com/', '')
+                    for object_ in objects.split():
+                        yield subject, relation, object_.replace('www.freebase.com/m/', '')
+
+        return cls(facts())
+
+    def get_candidate_facts(self, mids):
+        """
+        Args:
+            mids (list of str): candidate subject MIDs
+        Returns:
+            (dict): relation mapped to a dict of subject MIDs mapped to a set of object MIDs
+        """
+        return to_candidate_facts((subject_mid, relation, object_mid)
+                                  for subject_mid in set(mids)
+                                  for relation, object_mid in self._facts.get(subject_mid, []))
+
+    def get_candidate_relations(self, mids):
+        """ Same as `DatabaseKnowledgeGraph.get_candidate_relations`. """
+        candidate_facts = self.get_candidate_facts(mids)
+        return {
+            relation: {subject_mid: len(objects) for subject_mid, objects in subjects.items()}
+            for relation, subjects in candidate_facts.items()
+        }
+
+    def get_objects(self, pairs):
+        """ Same as `DatabaseKnowledgeGraph.get_objects`. """
+        pairs = set(pairs)
+        return to_objects((subject_mid, relation, object_mid)
+                          for subject_mid in set(p[0] for p in pairs)
+                          for relation, object_mid in self._facts.get(subject_mid, [])
+                          if (subject_mid, relation) in pairs)
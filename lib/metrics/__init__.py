@@ -1,2 +1,4 @@
+from lib.metrics.accuracy import AccuracyAccumulator
 from lib.metrics.accuracy import get_accuracy
 from lib.metrics.random_sample import print_random_sample
+from lib.metrics.random_sample import RandomSampleAccumulator
@@ -24,3 +24,58 @@ def get_accuracy(targets, outputs, ignore_index=None, print_=False):
     if print_:
         logger.info('Accuracy: %s [%d of %d]', accuracy, n_correct, len(targets))
     return accuracy, n_correct, len(targets)
+
+
+class AccuracyAccumulator(object):
+    """ Streaming `get_accuracy` updated with whole batches.
+
+    Unlike `get_accuracy`, the outputs are not kept; every batch is compared in one vectorized
+    operation.
+
+    Args:
+        ignore_index (int, optional): target index that is ignored
+        top_k (int, optional): an example is correct if, at every position, the target is one of
+            the `top_k` predictions.
+    """
+
+    def __init__(self, ignore_index=None, top_k=1):
+        self.ignore_index = ignore_index
+        self.top_k = top_k
+        self.n_correct = 0
+        self.n_total = 0
+
+    def update(self, targets, outputs):
+        """
+        Args:
+            targets (torch.LongTensor [batch_size] or [batch_size, seq_len])
+            outputs (torch.FloatTensor [batch_size, n_classes] or [batch_size, seq_len, n_classes])
+        """
+        # NOTE: `Variable` is unwrapped so no graph is built
+        targets = getattr(targets, 'data', targets)
+        outputs = getattr(outputs, 'data', outputs)
+        if self.top_k == 1:
+            # NOTE: `max` breaks ties like `get_accuracy`
+            is_correct = outputs.max(outputs.dim() - 1)[1].view(targets.size()).eq(targets)
+        else:
+            predictions = outputs.topk(self.top_k, dim=outputs.dim() - 1)[1]
+            is_correct = predictions.eq(targets.unsqueeze(-1).expand_as(predictions))
+            is_correct = is_correct.sum(dim=is_correct.dim() - 1).gt(0)
+        if self.ignore_index is not None:
+            is_correct = is_correct | targets.eq(self.ignore_index)
+        # An example is correct if every position is correct
+        is_correct = is_correct.view(targets.size()[0], -1).long()
+        is_correct = is_correct.sum(dim=1).eq(is_correct.size()[1])
+        self.n_correct += int(is_correct.long().sum())
+        self.n_total += targets.size()[0]
+
+    def get_accuracy(self, print_=False):
+        """
+        Returns:
+            accuracy (float)
+            n_correct (int)
+            n_total (int)
+        """
+        accuracy = float(self.n_correct) / self.n_total
+        if print_:
+            logger.info('Accuracy: %s [%d of %d]', accuracy, self.n_correct, self.n_total)
+        return accuracy, self.n_correct, self.n_total
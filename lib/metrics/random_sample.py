@@ -45,3 +45,73 @@ def print_random_sample(sources,
             prefix, pd.DataFrame(data, columns=['Source', 'Target', 'Prediction']))
 
     logger.info(ret)
+
+
+class RandomSampleAccumulator(object):
+    """ Streaming `print_random_sample` updated with whole batches.
+
+    Unlike `print_random_sample`, only the sampled examples are kept; each of the positive and
+    negative samples is a uniform reservoir sample over every example seen.
+
+    Reference: https://en.wikipedia.org/wiki/Reservoir_sampling
+
+    Args:
+        n_samples (int, optional): number of positive and of negative samples
+        ignore_index (int, optional): target index that is ignored
+        random_state (random.Random, optional)
+    """
+
+    def __init__(self, n_samples=5, ignore_index=None, random_state=None):
+        self.n_samples = n_samples
+        self.ignore_index = ignore_index
+        self.random_state = random.Random() if random_state is None else random_state
+        # Category mapped to the number of examples seen and the sampled examples
+        self.n_seen = {'Positive': 0, 'Negative': 0}
+        self.samples = {'Positive': [], 'Negative': []}
+
+    def update(self, sources, targets, outputs):
+        """
+        Args:
+            sources (torch.LongTensor [batch_size, source_len])
+            targets (torch.LongTensor [batch_size] or [batch_size, seq_len])
+            outputs (torch.FloatTensor [batch_size, n_classes] or [batch_size, seq_len, n_classes])
+        """
+        sources = getattr(sources, 'data', sources)
+        targets = getattr(targets, 'data', targets)
+        outputs = getattr(outputs, 'data', outputs)
+        predictions = outputs.max(outputs.dim() - 1)[1].view(targets.size())
+        is_correct = predictions.eq(targets)
+        if self.ignore_index is not None:
+            is_correct = is_correct | targets.eq(self.ignore_index)
+        is_correct = is_correct.view(targets.size()[0], -1).long()
+        is_correct = is_correct.sum(dim=1).eq(is_correct.size()[1]).tolist()
+        for i, is_positive in enumerate(is_correct):
+            category = 'Positive' if is_positive else 'Negative'
+            self.n_seen[category] += 1
+            samples = self.samples[category]
+            if len(samples) < self.n_samples:
+                index = len(samples)
+                samples.append(None)
+            else:
+                index = self.random_state.randrange(self.n_seen[category])
+                if index >= self.n_samples:
+                    continue
+            # NOTE: `clone` so the batch is not kept in memory by a view
+            samples[index] = (sources[i].clone(), targets[i].clone(), predictions[i].clone())
+
+    def print_random_sample(self, input_text_encoder, output_text_encoder):
+        """ Print the random sample of positive and negative samples like `print_random_sample`.
+        """
+        ret = 'Random Sample:\n'
+        for prefix in ['Positive', 'Negative']:
+            data = []
+            for source, target, prediction in self.samples[prefix]:
+                data.append([
+                    input_text_encoder.decode(source),
+                    output_text_encoder.decode(target.view(-1)),
+                    output_text_encoder.decode(prediction.view(-1))
+                ])
+            ret += '\n%s Samples:\n%s\n' % (
+                prefix, pd.DataFrame(data, columns=['Source', 'Target', 'Prediction']))
+
+        logger.info(ret)
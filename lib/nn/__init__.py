@@ -1,3 +1,6 @@
 from lib.nn.seq_encoder import SeqEncoder
 from lib.nn.seq_to_label import SeqToLabel
+from lib.nn.seq_tagger import SeqTagger
+from lib.nn.crf import CRF
+from lib.nn.character_encoder import CharacterEncoder
 from lib.nn.lock_dropout import LockedDropout
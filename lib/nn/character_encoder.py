@@ -0,0 +1,77 @@
+import torch
+import torch.nn as nn
+
+from lib.configurable import configurable
+
+# NOTE: Same as the `allennlp` padding index of the `token_characters` namespace
+CHARACTER_PADDING_INDEX = 0
+
+
+def encode_characters(batch_tokens, character_to_index, n_end_padding=4, unknown_index=1):
+    """ Encode the characters of a batch of token sequences like the `allennlp`
+    `TokenCharactersIndexer`.
+
+    Args:
+        batch_tokens (list of lists of str): token sequences
+        character_to_index (dict): character mapped to its index (e.g. from
+            `vocabulary/token_characters.txt`)
+        n_end_padding (int, optional): padding characters appended to every token; with a CNN, at
+            least `ngram_size - 1` so short tokens are not shorter than the filter.
+        unknown_index (int, optional): index of characters not in `character_to_index`
+    Returns:
+        (torch.LongTensor [seq_len, batch_size, n_characters])
+    """
+    seq_len = max([len(tokens) for tokens in batch_tokens] + [1])
+    n_characters = max([len(t) for tokens in batch_tokens for t in tokens] + [1]) + n_end_padding
+    characters = torch.LongTensor(seq_len, len(batch_tokens), n_characters)
+    characters.fill_(CHARACTER_PADDING_INDEX)
+    for i, tokens in enumerate(batch_tokens):
+        for j, token in enumerate(tokens):
+            for k, character in enumerate(token):
+                characters[j, i, k] = character_to_index.get(character, unknown_index)
+    return characters
+
+
+class CharacterEncoder(nn.Module):
+    """
+    Character CNN encoding every token into a fixed size feature vector.
+
+    Motivation: Same as the `allennlp` `character_encoding` token embedder with a `cnn` encoder;
+    therefore, `SeqTagger` loads the `token_characters` weights of a `CrfTagger` archive.
+
+    Args:
+        n_characters (int): size of the character vocabulary
+        embedding_size (int, optional): size of the character embeddings
+        n_filters (int, optional): number of CNN filters; size of the token features
+        ngram_size (int, optional): number of characters every CNN filter spans
+        dropout (float, optional): dropout applied to the token features
+    """
+
+    @configurable
+    def __init__(self, n_characters, embedding_size=25, n_filters=100, ngram_size=5, dropout=0.0):
+        super().__init__()
+        self.n_filters = n_filters
+        self.ngram_size = ngram_size
+        self.embedding = nn.Embedding(
+            n_characters, embedding_size, padding_idx=CHARACTER_PADDING_INDEX)
+        self.conv = nn.Conv1d(embedding_size, n_filters, ngram_size)
+        self.dropout = nn.Dropout(p=dropout)
+
+    def forward(self, characters):
+        """
+        Args:
+            characters (torch.LongTensor [seq_len, batch_size, n_characters])
+        Returns:
+            (torch.FloatTensor [seq_len, batch_size, n_filters])
+        """
+        seq_len, batch_size, n_characters = characters.size()
+        if n_characters < self.ngram_size:
+            raise ValueError('Tokens must be padded to at least %d characters.' % self.ngram_size)
+        characters = characters.view(seq_len * batch_size, n_characters)
+        mask = (characters != CHARACTER_PADDING_INDEX).float().unsqueeze(2)
+        # [seq_len * batch_size, n_characters, embedding_size]
+        embedded = self.embedding(characters) * mask
+        # [seq_len * batch_size, n_filters, n_characters - ngram_size + 1]
+        features = torch.nn.functional.relu(self.conv(embedded.transpose(1, 2)))
+        features = features.max(dim=2)[0]
+        return self.dropout(features.view(seq_len, batch_size, self.n_filters))
@@ -0,0 +1,156 @@
+import torch
+import torch.nn as nn
+
+from torch.autograd import Variable
+
+
+def _log_sum_exp(tensor, dim):
+    """ Numerically stable `log(sum(exp(tensor), dim))`. """
+    max_, _ = tensor.max(dim, keepdim=True)
+    return (max_ + (tensor - max_).exp().sum(dim, keepdim=True).log()).squeeze(dim)
+
+
+class CRF(nn.Module):
+    """
+    Linear-chain conditional random field over a batch of time-major sequences.
+
+    The forward algorithm and Viterbi decoding are vectorized over the batch and tags; the only
+    loop is over timesteps. Parameter names match `allennlp.modules.ConditionalRandomField` so
+    archived weights load without renaming.
+
+    Args:
+        n_tags (int): number of tags
+    """
+
+    def __init__(self, n_tags):
+        super().__init__()
+        self.n_tags = n_tags
+        # `transitions[i, j]` is the score of transitioning from tag `i` to tag `j`
+        self.transitions = nn.Parameter(torch.Tensor(n_tags, n_tags))
+        self.start_transitions = nn.Parameter(torch.Tensor(n_tags))
+        self.end_transitions = nn.Parameter(torch.Tensor(n_tags))
+        self.reset_parameters()
+
+    def reset_parameters(self):
+        for parameter in [self.transitions, self.start_transitions, self.end_transitions]:
+            parameter.data.uniform_(-0.1, 0.1)
+
+    def _log_partition(self, logits, mask):
+        """ Forward algorithm computing the log partition per sequence.
+
+        Args:
+            logits (torch.FloatTensor [seq_len, batch_size, n_tags])
+            mask (torch.FloatTensor [seq_len, batch_size])
+        Returns:
+            (torch.FloatTensor [batch_size])
+        """
+        seq_len = logits.size()[0]
+        alpha = self.start_transitions.unsqueeze(0) + logits[0]
+        for timestep in range(1, seq_len):
+            # [batch_size, n_tags (from), n_tags (to)]
+            inner = (alpha.unsqueeze(2) + self.transitions.unsqueeze(0) +
+                     logits[timestep].unsqueeze(1))
+            step_mask = mask[timestep].unsqueeze(1)
+            alpha = _log_sum_exp(inner, 1) * step_mask + alpha * (1 - step_mask)
+        return _log_sum_exp(alpha + self.end_transitions.unsqueeze(0), 1)
+
+    def _joint_score(self, logits, tags, mask):
+        """ Score of the gold tag sequence.
+
+        Args:
+            logits (torch.FloatTensor [seq_len, batch_size, n_tags])
+            tags (torch.LongTensor [seq_len, batch_size])
+            mask (torch.FloatTensor [seq_len, batch_size])
+        Returns:
+            (torch.FloatTensor [batch_size])
+        """
+        seq_len = logits.size()[0]
+        flat_transitions = self.transitions.view(-1)
+        score = self.start_transitions.index_select(0, tags[0])
+        score = score + logits[0].gather(1, tags[0].unsqueeze(1)).squeeze(1)
+        for timestep in range(1, seq_len):
+            transition = flat_transitions.index_select(
+                0, tags[timestep - 1] * self.n_tags + tags[timestep])
+            emission = logits[timestep].gather(1, tags[timestep].unsqueeze(1)).squeeze(1)
+            score = score + (transition + emission) * mask[timestep]
+
+        last_index = mask.sum(0).long() - 1
+        last_tags = tags.gather(0, last_index.unsqueeze(0)).squeeze(0)
+        return score + self.end_transitions.index_select(0, last_tags)
+
+    def forward(self, logits, tags, mask):
+        """
+        Args:
+            logits (torch.FloatTensor [seq_len, batch_size, n_tags]): unary potentials
+            tags (torch.LongTensor [seq_len, batch_size]): gold tags
+            mask (torch.Tensor [seq_len, batch_size]): 1 for tokens and 0 for padding; every
+                sequence has at least one token.
+        Returns:
+            (torch.FloatTensor [1]): log likelihood summed over the batch
+        """
+        mask = mask.float()
+        return (self._joint_score(logits, tags, mask) - self._log_partition(logits, mask)).sum()
+
+    def viterbi_tags(self, logits, mask, top_k=1):
+        """ Batched top k Viterbi decoding.
+
+        Args:
+            logits (torch.FloatTensor [seq_len, batch_size, n_tags]): unary potentials
+            mask (torch.Tensor [seq_len, batch_size]): 1 for tokens and 0 for padding
+            top_k (int, optional): number of paths to decode per sequence
+        Returns:
+            (list of lists of tuples): for every sequence, up to `top_k` `(tags, score)` tuples
+                sorted by decreasing score where `tags` is a list of tag indices without padding.
+        """
+        if isinstance(logits, Variable):
+            logits = logits.data
+        if isinstance(mask, Variable):
+            mask = mask.data
+        transitions = self.transitions.data
+        seq_len, batch_size, n_tags = logits.size()
+
+        # Beams of `top_k` partial paths per tag; only the first beam is alive at the start.
+        scores = logits.new(batch_size, top_k, n_tags).fill_(-float('inf'))
+        scores[:, 0, :] = self.start_transitions.data.unsqueeze(0) + logits[0]
+        # Backpointer for a padding timestep points to the same beam and tag
+        identity = (torch.arange(0, top_k).long().view(1, top_k, 1) * n_tags +
+                    torch.arange(0, n_tags).long().view(1, 1, n_tags))
+        identity = identity.expand(batch_size, top_k, n_tags)
+        if logits.is_cuda:
+            identity = identity.cuda(logits.get_device())
+
+        backpointers = []
+        for timestep in range(1, seq_len):
+            # [batch_size, top_k * n_tags (from), n_tags (to)]
+            summed = scores.unsqueeze(3) + transitions.view(1, 1, n_tags, n_tags)
+            summed = summed.view(batch_size, top_k * n_tags, n_tags)
+            best, indices = summed.topk(top_k, dim=1)
+            best = best + logits[timestep].unsqueeze(1)
+
+            is_padding = (mask[timestep] == 0).view(batch_size, 1, 1).expand_as(best)
+            is_token = (mask[timestep] != 0).view(batch_size, 1, 1).expand_as(best)
+            scores = best.masked_fill(is_padding, 0) + scores.masked_fill(is_token, 0)
+            backpointers.append(
+                indices.masked_fill(is_padding, 0) + identity.masked_fill(is_token, 0))
+
+        final = scores + self.end_transitions.data.view(1, 1, n_tags)
+        final_scores, final_indices = final.view(batch_size, top_k * n_tags).topk(top_k, dim=1)
+
+        final_scores = final_scores.tolist()
+        final_indices = final_indices.tolist()
+        backpointers = [b.tolist() for b in backpointers]
+        lengths = [int(length) for length in mask.long().sum(0).tolist()]
+        ret = []
+        for i in range(batch_size):
+            paths = []
+            for score, index in zip(final_scores[i], final_indices[i]):
+                if score == -float('inf'):
+                    continue
+                path = [index % n_tags]
+                for timestep_backpointers in reversed(backpointers):
+                    index = timestep_backpointers[i][index // n_tags][index % n_tags]
+                    path.append(index % n_tags)
+                path.reverse()
+                paths.append((path[:lengths[i]], score))
+            ret.append(paths)
+        return ret
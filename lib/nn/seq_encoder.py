@@ -40,6 +40,10 @@ class SeqEncoder(nn.Module):
             Flag adds directionality to the encoder. Bidirectional encoders outperform
             unidirectional ones by a small margin.
             <http://ruder.io/deep-learning-nlp-best-practices/index.html#fnref:27>
+
+        n_features (int, optional):
+            size of the token features concatenated before the embeddings (e.g. from a
+            `CharacterEncoder`); `forward` must be passed `features` if positive.
     """
 
     @configurable
@@ -53,7 +57,8 @@ class SeqEncoder(nn.Module):
                  n_layers=2,
                  rnn_cell='gru',
                  bidirectional=True,
-                 freeze_embeddings=False):
+                 freeze_embeddings=False,
+                 n_features=0):
         super().__init__()
         self.n_layers = int(n_layers)
         # NOTE: This assert is included because PyTorch throws a weird error if layers==0
@@ -82,7 +87,7 @@ class SeqEncoder(nn.Module):
             raise ValueError("Unsupported RNN Cell: {0}".format(rnn_cell))
 
         self.rnn = self.rnn_cell(
-            input_size=embedding_size,
+            input_size=int(embedding_size) + n_features,
             hidden_size=self.rnn_size,
             num_layers=self.n_layers,
             dropout=rnn_variational_dropout,
@@ -91,11 +96,13 @@ class SeqEncoder(nn.Module):
         self.rnn_dropout = LockedDropout(p=rnn_dropout)
         self.embedding_dropout = nn.Dropout(p=embedding_dropout)
 
-    def forward(self, input_):
+    def forward(self, input_, features=None):
         """
         Args:
             input_: (torch.LongTensor [seq_len, batch_size]): variable containing the encoded
                 features of the input sequence
+            features (torch.FloatTensor [seq_len, batch_size, n_features], optional): token
+                features concatenated before the embeddings
         Returns:
             outputs (torch.FloatTensor [batch_size, seq_len, rnn_size]): variable containing the
                 encoded features of the input sequence
@@ -104,6 +111,8 @@ class SeqEncoder(nn.Module):
         """
         embedded = self.embedding(input_)
         embedded = self.embedding_dropout(embedded)
+        if features is not None:
+            embedded = torch.cat([features, embedded], dim=2)
         output, hidden = self.rnn(embedded)
         output = self.rnn_dropout(output)
 
@@ -0,0 +1,237 @@
+import io
+import logging
+import tarfile
+
+import torch
+import torch.nn as nn
+
+from lib.configurable import configurable
+from lib.nn.character_encoder import CharacterEncoder
+from lib.nn.crf import CRF
+from lib.nn.seq_encoder import SeqEncoder
+
+logger = logging.getLogger(__name__)
+
+# Map `allennlp.models.CrfTagger` parameter name prefixes to `SeqTagger` parameter name prefixes
+_ARCHIVE_PREFIXES = [
+    ('text_field_embedder.token_embedder_tokens.', 'encoder.embedding.'),
+    ('text_field_embedder.token_embedder_token_characters._embedding._module.',
+     'character_encoder.embedding.'),
+    ('text_field_embedder.token_embedder_token_characters._encoder._module.conv_layer_0.',
+     'character_encoder.conv.'),
+    ('encoder._module.', 'encoder.rnn.'),
+    ('tag_projection_layer._module.', 'out.'),
+    ('crf.', 'crf.'),
+]
+
+
+class SeqTagger(nn.Module):
+    """
+    RNN CRF sequence tagger used to tag the subject name in a question.
+
+    Motivation: Replaces the forked `allennlp` `sentence-tagger` predictor that predicts one
+    sentence at a time with a lightweight model that tags a batch at once.
+
+    Args:
+        vocab_size (int): size of the token vocabulary
+        n_tags (int): number of tags (e.g. `I` and `O`)
+        n_characters (int, optional): size of the character vocabulary; if set, the features of a
+            `CharacterEncoder` are concatenated before the token embeddings.
+        character_embedding_size (int, optional): `CharacterEncoder` `embedding_size`
+        n_character_filters (int, optional): `CharacterEncoder` `n_filters`
+        character_ngram_size (int, optional): `CharacterEncoder` `ngram_size`
+        character_dropout (float, optional): `CharacterEncoder` `dropout`
+        **kwargs: arguments passed to `SeqEncoder`
+    """
+
+    @configurable
+    def __init__(self,
+                 vocab_size,
+                 n_tags,
+                 embedding_size=100,
+                 rnn_size=100,
+                 embedding_dropout=0.0,
+                 rnn_dropout=0.0,
+                 rnn_variational_dropout=0.0,
+                 n_layers=2,
+                 rnn_cell='gru',
+                 bidirectional=True,
+                 freeze_embeddings=False,
+                 n_characters=None,
+                 character_embedding_size=25,
+                 n_character_filters=100,
+                 character_ngram_size=5,
+                 character_dropout=0.0):
+        super().__init__()
+
+        self.character_encoder = None
+        if n_characters is not None:
+            self.character_encoder = CharacterEncoder(
+                n_characters,
+                embedding_size=character_embedding_size,
+                n_filters=n_character_filters,
+                ngram_size=character_ngram_size,
+                dropout=character_dropout)
+        self.encoder = SeqEncoder(
+            vocab_size=vocab_size,
+            embedding_size=embedding_size,
+            rnn_size=rnn_size,
+            embedding_dropout=embedding_dropout,
+            rnn_dropout=rnn_dropout,
+            rnn_variational_dropout=rnn_variational_dropout,
+            n_layers=n_layers,
+            rnn_cell=rnn_cell,
+            bidirectional=bidirectional,
+            freeze_embeddings=freeze_embeddings,
+            n_features=0 if n_characters is None else n_character_filters)
+        self.out = nn.Linear(rnn_size, n_tags)
+        self.crf = CRF(n_tags)
+
+    def _logits(self, tokens, characters):
+        features = None
+        if self.character_encoder is not None:
+            if characters is None:
+                raise ValueError('`SeqTagger` with a `CharacterEncoder` requires `characters`.')
+            features = self.character_encoder(characters)
+        output, _ = self.encoder(tokens, features)
+        seq_len, batch_size, rnn_size = output.size()
+        logits = self.out(output.view(seq_len * batch_size, rnn_size))
+        return logits.view(seq_len, batch_size, -1)
+
+    def forward(self, tokens, tags, mask, characters=None):
+        """
+        Args:
+            tokens (torch.LongTensor [seq_len, batch_size])
+            tags (torch.LongTensor [seq_len, batch_size])
+            mask (torch.Tensor [seq_len, batch_size]): 1 for tokens and 0 for padding
+            characters (torch.LongTensor [seq_len, batch_size, n_characters], optional): see
+                `encode_characters`; required with `n_characters`
+        Returns:
+            (torch.FloatTensor [1]): negative log likelihood summed over the batch
+        """
+        return -self.crf(self._logits(tokens, characters), tags, mask)
+
+    def decode(self, tokens, mask, top_k=1, characters=None):
+        """
+        Args:
+            tokens (torch.LongTensor [seq_len, batch_size])
+            mask (torch.Tensor [seq_len, batch_size]): 1 for tokens and 0 for padding
+            top_k (int, optional): number of tag sequences to decode per sequence
+            characters (torch.LongTensor [seq_len, batch_size, n_characters], optional): see
+                `encode_characters`; required with `n_characters`
+        Returns:
+            (list of lists of tuples): for every sequence, up to `top_k` `(tags, score)` tuples
+                sorted by decreasing score.
+        """
+        return self.crf.viterbi_tags(self._logits(tokens, characters), mask, top_k=top_k)
+
+
+def load_archive_vocabulary(path, is_padded=True):
+    """ Load a namespace of an `allennlp` archive `vocabulary` directory.
+
+    Args:
+        path (str): namespace file (e.g. `vocabulary/token_characters.txt`)
+        is_padded (bool, optional): if True, index 0 is reserved for padding like every namespace
+            not in `non_padded_namespaces.txt`.
+    Returns:
+        (dict): token mapped to its index
+    """
+    with open(path, encoding='utf-8') as file_:
+        tokens = file_.read().split('\n')
+    # NOTE: `allennlp` writes one token per line followed by a trailing newline.
+    if len(tokens) > 0 and tokens[-1] == '':
+        tokens = tokens[:-1]
+    offset = 1 if is_padded else 0
+    return {token: i + offset for i, token in enumerate(tokens)}
+
+
+class ArchiveTextEncoder(object):
+    """ Encode whitespace tokenized text with an `allennlp` archive `tokens` namespace like its
+    `single_id` token indexer; therefore, it is the `text_encoder` of `tag_subject_names` for an
+    archive tagger.
+
+    Args:
+        token_to_index (dict): token mapped to its index (e.g. from `load_archive_vocabulary`)
+        lowercase_tokens (bool, optional): `single_id` `lowercase_tokens`
+        unknown_index (int, optional): index of tokens not in `token_to_index`
+    """
+
+    def __init__(self, token_to_index, lowercase_tokens=False, unknown_index=1):
+        self.token_to_index = token_to_index
+        self.lowercase_tokens = lowercase_tokens
+        self.unknown_index = unknown_index
+
+    @property
+    def vocab_size(self):
+        """ Size of the token embedding; padding and unknown indices included. """
+        return max(list(self.token_to_index.values()) + [self.unknown_index]) + 1
+
+    def encode(self, text):
+        """
+        Args:
+            text (str): tokens joined by spaces
+        Returns:
+            (torch.LongTensor [n_tokens])
+        """
+        tokens = text.split(' ')
+        if self.lowercase_tokens:
+            tokens = [token.lower() for token in tokens]
+        return torch.LongTensor(
+            [self.token_to_index.get(token, self.unknown_index) for token in tokens])
+
+
+def load_crf_tagger_state_dict(tagger, state_dict):
+    """ Load `allennlp.models.CrfTagger` weights into `tagger`.
+
+    NOTE: Tokens must be encoded with the archive `vocabulary/tokens.txt` and characters with
+    `vocabulary/token_characters.txt` (see `load_archive_vocabulary` and `encode_characters`).
+    Only `cnn` character encoders with one `ngram_filter_sizes` and no `output_dim` are supported.
+
+    Args:
+        tagger (SeqTagger): tagger configured with the archive `rnn_cell`, `n_layers`,
+            `bidirectional`, `embedding_size` and `rnn_size` and, with a `token_characters`
+            embedder, the archive `n_characters`, `character_embedding_size`,
+            `n_character_filters` and `character_ngram_size`
+        state_dict (dict): `CrfTagger` state dict
+    Raises:
+        (ValueError): the archive has parameters `tagger` cannot represent, the sizes differ or
+            `tagger` has parameters the archive does not have
+    """
+    converted = {}
+    unsupported = []
+    for key, value in state_dict.items():
+        for prefix, new_prefix in _ARCHIVE_PREFIXES:
+            if key.startswith(prefix):
+                converted[new_prefix + key[len(prefix):]] = value
+                break
+        else:
+            unsupported.append(key)
+    if len(unsupported) > 0:
+        raise ValueError('Archive parameters are not supported by `SeqTagger`: %s' % unsupported)
+
+    tagger_state_dict = tagger.state_dict()
+    for key, value in converted.items():
+        if key not in tagger_state_dict:
+            raise ValueError('Archive parameter %s does not exist in `SeqTagger`.' % key)
+        if tuple(tagger_state_dict[key].size()) != tuple(value.size()):
+            raise ValueError('Archive parameter %s has size %s instead of %s.' %
+                             (key, tuple(value.size()), tuple(tagger_state_dict[key].size())))
+        tagger_state_dict[key] = value
+    missing = sorted(set(tagger_state_dict.keys()) - set(converted.keys()))
+    if len(missing) > 0:
+        raise ValueError('`SeqTagger` parameters are not in the archive: %s' % missing)
+    tagger.load_state_dict(tagger_state_dict)
+    logger.info('Loaded %d archive parameters', len(converted))
+
+
+def load_crf_tagger_archive(tagger, archive_path):
+    """ Load the weights from an `allennlp` `model.tar.gz` archive of a `CrfTagger`.
+
+    Args:
+        tagger (SeqTagger)
+        archive_path (str): path to `model.tar.gz`
+    """
+    with tarfile.open(archive_path, 'r:gz') as archive:
+        weights = io.BytesIO(archive.extractfile('weights.th').read())
+    state_dict = torch.load(weights, map_location=lambda storage, loc: storage)
+    load_crf_tagger_state_dict(tagger, state_dict)
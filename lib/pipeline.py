@@ -0,0 +1,297 @@
+"""
+Streaming pipeline of composable stages.
+
+Motivation: The end-to-end notebooks pass whole pickled DataFrames between steps; therefore, every
+step finishes the entire dataset before the next starts. Here, stages connect through bounded
+queues so I/O bound stages (e.g. candidate generation and fact lookups) overlap CPU bound model
+stages and memory stays flat regardless of the size of the question stream.
+
+Example:
+    pipeline = Pipeline([
+        Stage(tag_subject_names, batch_size=256),
+        Stage(generate_candidates, n_workers=4),
+        Stage(generate_facts, n_workers=4),
+        Stage(score_relations, batch_size=1024),
+        Stage(answer),
+    ])
+    for row in pipeline(questions):
+        ...
+
+    `lib.server.QuestionAnswerer.stream` runs the end-to-end stages like above.
+"""
+import logging
+import multiprocessing
+import multiprocessing.queues
+import queue
+import threading
+import time
+import traceback
+
+logger = logging.getLogger(__name__)
+
+# Seconds between checks of the stop event while blocked on a queue
+_POLL_INTERVAL = 0.05
+# Seconds to wait for a worker to exit on teardown before it is abandoned or terminated
+_JOIN_TIMEOUT = 5.0
+
+
+class PipelineError(Exception):
+    """ A stage raised an exception; the message includes the worker traceback. """
+    pass
+
+
+class _Stop(object):
+    """ End of stream sentinel. """
+    pass
+
+
+class _Failure(object):
+    """ Exception raised by a stage for some item, passed downstream to the consumer. """
+
+    def __init__(self, name, message):
+        self.name = name
+        self.message = message
+
+
+class Stage(object):
+    """
+    Args:
+        function (callable): function applied to every item; if `batch_size` is set, the function
+            is applied to a list of items and must return a list of the same length.
+        n_workers (int, optional): number of concurrent workers
+        processes (bool, optional): if True, workers are processes instead of threads; use
+            processes for CPU bound stages. `function` must be picklable.
+        batch_size (int, optional): maximum number of queued items passed to `function` at once
+        name (str, optional): name used for logging and errors
+    """
+
+    def __init__(self, function, n_workers=1, processes=False, batch_size=None, name=None):
+        if n_workers < 1:
+            raise ValueError('A stage requires at least one worker.')
+        self.function = function
+        self.n_workers = n_workers
+        self.processes = processes
+        self.batch_size = batch_size
+        self.name = getattr(function, '__name__', repr(function)) if name is None else name
+
+
+def _apply(stage, items):
+    """ Apply the `stage` function to `(index, item)` pairs returning `(index, output)` pairs. """
+    indices = [index for index, _ in items]
+    inputs = [item for _, item in items]
+    try:
+        if stage.batch_size is None:
+            outputs = [stage.function(item) for item in inputs]
+        else:
+            outputs = stage.function(inputs)
+            if len(outputs) != len(inputs):
+                raise ValueError('Batch stage returned %d outputs for %d inputs.' %
+                                 (len(outputs), len(inputs)))
+    except Exception:
+        failure = _Failure(stage.name, traceback.format_exc())
+        return [(index, failure) for index in indices]
+    return list(zip(indices, outputs))
+
+
+def _get(in_queue, stop_event):
+    """ Get the next item from `in_queue`; `_Stop` once `stop_event` is set. """
+    while not stop_event.is_set():
+        try:
+            return in_queue.get(timeout=_POLL_INTERVAL)
+        except queue.Empty:
+            pass
+    return _Stop()
+
+
+def _put(out_queue, item, stop_event):
+    """ Put `item` into `out_queue`; returns False if `stop_event` was set before it fit. """
+    while not stop_event.is_set():
+        try:
+            out_queue.put(item, timeout=_POLL_INTERVAL)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _drain(queue_):
+    """ Discard every item of `queue_` so producers blocked on it can exit. """
+    try:
+        while True:
+            queue_.get_nowait()
+    except queue.Empty:
+        pass
+
+
+def _work(stage, in_queue, out_queue, stop_event):
+    """ Worker loop applying `stage` to items from `in_queue` until the end of the stream or
+    until `stop_event` is set. """
+    is_stopped = False
+    while not is_stopped:
+        item = _get(in_queue, stop_event)
+        if isinstance(item, _Stop):
+            break
+
+        items = []
+        failures = []
+        while True:
+            if isinstance(item[1], _Failure):
+                failures.append(item)  # Pass upstream failures through
+            else:
+                items.append(item)
+            if stage.batch_size is None or len(items) + len(failures) >= stage.batch_size:
+                break
+            try:
+                item = in_queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, _Stop):
+                is_stopped = True
+                break
+
+        for output in failures + (_apply(stage, items) if len(items) > 0 else []):
+            if not _put(out_queue, output, stop_event):
+                return
+
+
+class Pipeline(object):
+    """
+    Chain of `Stage`s connected with bounded queues.
+
+    Args:
+        stages (list of Stage)
+        max_queue_size (int, optional): maximum number of items waiting between two stages
+        max_in_flight (int, optional): maximum number of items in the pipeline including those
+            waiting to be yielded in order; by default, enough to fill every queue.
+    """
+
+    def __init__(self, stages, max_queue_size=64, max_in_flight=None):
+        if len(stages) == 0:
+            raise ValueError('A pipeline requires at least one stage.')
+        self.stages = stages
+        self.max_queue_size = max_queue_size
+        self.max_in_flight = (max_queue_size * (len(stages) + 1)
+                              if max_in_flight is None else max_in_flight)
+
+    def _make_queue(self, processes):
+        if processes:
+            return multiprocessing.Queue(self.max_queue_size)
+        return queue.Queue(self.max_queue_size)
+
+    def _teardown(self, stop_event, queues, workers, threads):
+        """ Stop every worker and thread of a `__call__`, even if it ended early. """
+        stop_event.set()
+        for i, stage in enumerate(self.stages):
+            _drain(queues[i])
+            for _ in range(stage.n_workers):
+                try:
+                    queues[i].put_nowait(_Stop())
+                except queue.Full:
+                    break
+
+        # NOTE: Workers blocked on a full queue and processes flushing their queue buffers on exit
+        # need room; therefore, the queues are drained while waiting.
+        deadline = time.time() + _JOIN_TIMEOUT
+        for worker in workers + threads:
+            while worker.is_alive() and time.time() < deadline:
+                for queue_ in queues:
+                    _drain(queue_)
+                worker.join(timeout=_POLL_INTERVAL)
+            if not worker.is_alive():
+                continue
+            if isinstance(worker, multiprocessing.Process):
+                logger.warning('Terminating pipeline worker process %s', worker.name)
+                worker.terminate()
+                worker.join()
+            else:
+                # NOTE: Threads cannot be interrupted; a daemon thread stuck in a stage function
+                # exits with the interpreter.
+                logger.warning('Abandoning pipeline worker thread %s', worker.name)
+
+        # Stop the feeder threads of the process queues this process put items into
+        for queue_ in queues:
+            _drain(queue_)
+            if isinstance(queue_, multiprocessing.queues.Queue):
+                queue_.close()
+                # NOTE: Every reader exited; therefore, a feeder thread blocked on a full pipe is
+                # abandoned instead of waited on.
+                join = threading.Thread(target=queue_.join_thread, daemon=True)
+                join.start()
+                join.join(timeout=_JOIN_TIMEOUT)
+
+    def __call__(self, iterable):
+        """
+        Every worker is stopped once the generator finishes, raises or is closed early (e.g. the
+        consumer breaks out of its loop).
+
+        Args:
+            iterable (iterable): input stream
+        Returns:
+            (generator): outputs of the last stage in the same order as `iterable`
+        Raises:
+            (PipelineError): a stage raised an exception
+        """
+        is_processes = any(stage.processes for stage in self.stages)
+        stop_event = multiprocessing.Event() if is_processes else threading.Event()
+        # `queues[i]` is the input of stage `i`; the last queue is the output of the pipeline
+        queues = []
+        for i in range(len(self.stages) + 1):
+            processes = any(
+                stage.processes for stage in self.stages[max(i - 1, 0):i + 1])
+            queues.append(self._make_queue(processes))
+        in_flight = threading.BoundedSemaphore(self.max_in_flight)
+
+        def feed():
+            try:
+                for index, item in enumerate(iterable):
+                    while not in_flight.acquire(timeout=_POLL_INTERVAL):
+                        if stop_event.is_set():
+                            return
+                    if not _put(queues[0], (index, item), stop_event):
+                        return
+            except Exception:
+                _put(queues[0], (-1, _Failure('input', traceback.format_exc())), stop_event)
+            for _ in range(self.stages[0].n_workers):
+                _put(queues[0], _Stop(), stop_event)
+
+        def close(i, workers):
+            # After every worker of stage `i` exits, signal the end of stream downstream
+            for worker in workers:
+                worker.join()
+            n_consumers = self.stages[i + 1].n_workers if i + 1 < len(self.stages) else 1
+            for _ in range(n_consumers):
+                _put(queues[i + 1], _Stop(), stop_event)
+
+        workers = []
+        threads = [threading.Thread(target=feed, daemon=True)]
+        for i, stage in enumerate(self.stages):
+            stage_workers = []
+            for _ in range(stage.n_workers):
+                args = (stage, queues[i], queues[i + 1], stop_event)
+                if stage.processes:
+                    worker = multiprocessing.Process(target=_work, args=args, daemon=True)
+                else:
+                    worker = threading.Thread(target=_work, args=args, daemon=True)
+                stage_workers.append(worker)
+            workers.extend(stage_workers)
+            threads.append(threading.Thread(target=close, args=(i, stage_workers), daemon=True))
+        for thread in workers + threads:
+            thread.start()
+
+        try:
+            buffer = {}
+            next_index = 0
+            while True:
+                item = queues[-1].get()
+                if isinstance(item, _Stop):
+                    break
+                index, output = item
+                if isinstance(output, _Failure):
+                    raise PipelineError('Stage %s failed:\n%s' % (output.name, output.message))
+                buffer[index] = output
+                while next_index in buffer:
+                    yield buffer.pop(next_index)
+                    next_index += 1
+                    in_flight.release()
+        finally:
+            self._teardown(stop_event, queues, workers, threads)
@@ -0,0 +1,150 @@
+"""
+Intra-rung early stopping of hyperparameter search trials.
+
+Motivation: `successive_halving` only compares models at the end of a rung; therefore, a clearly
+bad model still trains for every epoch of its rung. Here, the objective reports its score after
+every epoch and a pruner compares it with the scores other models reported at the same number of
+epochs; models worse than the percentile are stopped and their workers move on to other models.
+
+Example:
+    def objective(resources, checkpoint=None, report=None, **hyperparameters):
+        for epoch in range(resources):
+            ...
+            if report is not None and report(epoch + 1, score):
+                break
+        return score, checkpoint
+
+    hyperband(objective, space, pruner=MedianPruner())
+"""
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class PercentilePruner(object):
+    """ Prune models whose best score is worse than the `percentile` of the best scores other
+    models reported at the same number of resources.
+
+    NOTE: Scores are minimized like in `successive_halving`.
+
+    Args:
+        percentile (float): percentile between 0 and 100 a model must be at or below to continue
+        n_startup_trials (int, optional): minimum number of other models that reported at a
+            number of resources before models are pruned at it
+        n_warmup_steps (float, optional): models are not pruned before these many resources
+        storage (dict-like, optional): storage of the reports; by default, a process local `dict`.
+            With worker processes, pass a `multiprocessing.Manager().dict()` so every worker sees
+            every report; `successive_halving` refuses a process local `dict` with them.
+    """
+
+    def __init__(self, percentile, n_startup_trials=5, n_warmup_steps=0, storage=None):
+        if not 0 <= percentile <= 100:
+            raise ValueError('Percentile must be between 0 and 100.')
+        self.percentile = percentile
+        self.n_startup_trials = n_startup_trials
+        self.n_warmup_steps = n_warmup_steps
+        # NOTE: The best score of each model is keyed by `('score', trial_id, step)` and the step
+        # a model was pruned at by `('pruned', trial_id)`.
+        self.storage = {} if storage is None else storage
+
+    def _get_scores(self):
+        return [(k[1], k[2], v) for k, v in self.storage.items() if k[0] == 'score']
+
+    def report(self, trial_id, step, score):
+        """ Record the score of `trial_id` after `step` total resources.
+
+        Args:
+            trial_id (str): model identifier
+            step (float): total resources (e.g. epochs) used by the model
+            score (float): score to minimize
+        Returns:
+            (bool): if True, the model should stop training.
+        """
+        scores = self._get_scores()
+        best_score = min([v for t, s, v in scores if t == trial_id and s <= step] + [score])
+        self.storage[('score', trial_id, step)] = best_score
+        if step < self.n_warmup_steps:
+            return False
+
+        others = [v for t, s, v in scores if s == step and t != trial_id]
+        if len(others) < self.n_startup_trials:
+            return False
+
+        threshold = np.percentile(others, self.percentile)
+        is_pruned = bool(best_score > threshold)
+        if is_pruned:
+            self.storage[('pruned', trial_id)] = step
+            logger.info('Pruned trial %s at step %s with score %f > %f', trial_id, step,
+                        best_score, threshold)
+        return is_pruned
+
+    def is_pruned(self, trial_id, step=0):
+        """ Check if `trial_id` was pruned after `step` total resources.
+
+        Args:
+            trial_id (str): model identifier
+            step (float, optional): total resources the model used before its last call
+        Returns:
+            (bool)
+        """
+        pruned_step = self.storage.get(('pruned', trial_id))
+        return pruned_step is not None and pruned_step > step
+
+    def get_state(self, trial_id):
+        """ Get the reports of `trial_id` (e.g. to journal them).
+
+        Args:
+            trial_id (str): model identifier
+        Returns:
+            (dict): JSON serializable state for `set_state`
+        """
+        scores = sorted([s, v] for t, s, v in self._get_scores() if t == trial_id)
+        return {'scores': scores, 'pruned': self.storage.get(('pruned', trial_id))}
+
+    def set_state(self, trial_id, state):
+        """ Restore the reports of `trial_id` from `get_state` (e.g. replaying a journal).
+
+        Args:
+            trial_id (str): model identifier
+            state (dict)
+        """
+        for step, score in state['scores']:
+            self.storage[('score', trial_id, step)] = score
+        if state['pruned'] is not None:
+            self.storage[('pruned', trial_id)] = state['pruned']
+
+
+class MedianPruner(PercentilePruner):
+    """ `PercentilePruner` at the 50th percentile. """
+
+    def __init__(self, n_startup_trials=5, n_warmup_steps=0, storage=None):
+        super().__init__(
+            50.0, n_startup_trials=n_startup_trials, n_warmup_steps=n_warmup_steps,
+            storage=storage)
+
+
+class Reporter(object):
+    """ Picklable report callback passed to the objective of a single call.
+
+    Args:
+        pruner (PercentilePruner)
+        trial_id (str): model identifier
+        offset (float): resources used by the model before this call
+    """
+
+    def __init__(self, pruner, trial_id, offset=0):
+        self.pruner = pruner
+        self.trial_id = trial_id
+        self.offset = offset
+
+    def __call__(self, step, score):
+        """
+        Args:
+            step (float): resources used so far in this call (e.g. epochs trained)
+            score (float): score to minimize
+        Returns:
+            (bool): if True, the objective should stop and return its score and checkpoint.
+        """
+        return self.pruner.report(self.trial_id, self.offset + step, score)
@@ -0,0 +1,56 @@
+import torch
+
+from torch.autograd import Variable
+from torchnlp.utils import pad_batch
+
+
+def get_predicate(tokens, start_index, end_index):
+    """ Replace the subject name span in the question with `<e>` like the relation classifier
+    training data.
+
+    Args:
+        tokens (list of str): question tokens
+        start_index (int): start index of the subject name span
+        end_index (int): end index of the subject name span
+    Returns:
+        (str): question predicate (e.g. 'where was <e> born ?')
+    """
+    predicate = ''
+    for i, token in enumerate(tokens):
+        if i == start_index:
+            predicate += '<e>'
+        elif i > start_index and i < end_index:
+            continue
+        else:
+            predicate += token.lower().strip()
+        predicate += ' '
+    return predicate.strip()
+
+
+def get_relation_scores(model, text_encoder, relation_encoder, predicates, candidate_relations):
+    """ Score candidate relations for a batch of predicates with a `lib.nn.SeqToLabel` relation
+    classifier.
+
+    Args:
+        model (lib.nn.SeqToLabel): relation classifier in evaluation mode
+        text_encoder (torchnlp.text_encoders.TextEncoder): checkpoint text encoder
+        relation_encoder (torchnlp.text_encoders.TextEncoder): checkpoint relation encoder
+        predicates (list of str): question predicates
+        candidate_relations (list of lists of str): candidate relations per predicate
+    Returns:
+        (list of lists of float): softmax score per candidate relation per predicate
+    """
+    is_cuda = next(model.parameters()).is_cuda
+    cuda = lambda t: t.cuda() if is_cuda else t
+
+    relation_ids = [[int(relation_encoder.encode(r)[0]) for r in relations]
+                    for relations in candidate_relations]
+    mask = torch.zeros(len(predicates), relation_encoder.vocab_size)
+    for i, ids in enumerate(relation_ids):
+        for id_ in ids:
+            mask[i][id_] = 1
+
+    questions, _ = pad_batch([text_encoder.encode(p) for p in predicates])
+    questions = cuda(Variable(torch.stack(questions).t_().contiguous(), volatile=True))
+    output = model(questions, cuda(Variable(mask, volatile=True))).exp_().data.cpu()
+    return [[float(output[i][id_]) for id_ in ids] for i, ids in enumerate(relation_ids)]
@@ -0,0 +1,222 @@
+"""
+Relation statistics catalog built once per KG version.
+
+Motivation: `Step 3 - Predict Relation and Finish` counts the facts per relation over the whole KG
+table on every run and builds `transform_probability_from_kg_to_train` with a Python loop. Here,
+the counts are computed once, persisted next to the KG version they describe, and the KG to train
+prior is applied to a whole score matrix at once.
+
+Example:
+    statistics = RelationStatistics.load_or_build(
+        'relation_statistics/', FB2M_KG_TABLE,
+        lambda: RelationStatistics.from_connection(connection, df_train.relation))
+    scores, mask = pad_scores(df['softmax_scores'])
+    relation_ids = statistics.get_relation_ids(df['candidate_facts'].apply(list))
+    scores = statistics.apply_prior(scores, relation_ids, n_objects)
+    predicted = select_max(scores, mask)
+"""
+from collections import Counter
+
+import logging
+import os
+import pickle
+
+import numpy as np
+
+from lib.database import iterate_query
+from lib.utils import FB2M_KG_TABLE
+
+logger = logging.getLogger(__name__)
+
+
+class RelationStatistics(object):
+    """
+    Args:
+        relation_counts (dict): relation mapped to the number of facts in the KG
+        subject_counts (dict): subject MID mapped to the number of facts in the KG
+        train_relations (iterable of str): relation of every training example
+        object_counts (dict, optional): object MID mapped to the number of facts in the KG, the
+            in-degree of the MID
+    """
+
+    # NOTE: Bump whenever the attributes change; catalogs saved by another version are rebuilt
+    # (e.g. version 1 catalogs have no `object_counts`).
+    VERSION = 2
+
+    def __init__(self, relation_counts, subject_counts, train_relations, object_counts=None):
+        self.version = self.VERSION
+        self.relation_counts = dict(relation_counts)
+        self.subject_counts = dict(subject_counts)
+        self.object_counts = {} if object_counts is None else dict(object_counts)
+        self.n_facts = sum(self.relation_counts.values())
+        train_relation_counts = Counter(train_relations)
+        n_train = sum(train_relation_counts.values())
+
+        # Given we see a relation occurring with x% probability in the KG, `kg_to_train` is the
+        # ratio to get the probability of the relation occurring in SimpleQuestions.
+        self.kg_to_train = {}
+        for relation, n_rows_train in train_relation_counts.items():
+            if relation not in self.relation_counts:
+                continue
+            relation_probability_kg = self.relation_counts[relation] / self.n_facts
+            relation_probability_train = n_rows_train / n_train
+            self.kg_to_train[relation] = relation_probability_train / relation_probability_kg
+
+        # Dense relation ids; the last id is reserved for unknown relations and padding.
+        self.relations = sorted(self.relation_counts.keys())
+        self._relation_ids = {relation: i for i, relation in enumerate(self.relations)}
+        self.unknown_id = len(self.relations)
+        # NOTE: Relations missing from the training data have a prior of zero like the
+        # `defaultdict(int)` in `Step 3 - Predict Relation and Finish`.
+        self.prior = np.array([self.kg_to_train.get(r, 0.0) for r in self.relations] + [0.0])
+
+    @classmethod
+    def from_facts(cls, facts, train_relations):
+        """
+        Args:
+            facts (iterable of tuples): `(subject_mid, relation, object_mid)` facts
+            train_relations (iterable of str): relation of every training example
+        """
+        relation_counts = Counter()
+        subject_counts = Counter()
+        object_counts = Counter()
+        for subject_mid, relation, object_mid in facts:
+            relation_counts[relation] += 1
+            subject_counts[subject_mid] += 1
+            object_counts[object_mid] += 1
+        return cls(relation_counts, subject_counts, train_relations, object_counts)
+
+    @classmethod
+    def from_connection(cls, connection, train_relations, table=FB2M_KG_TABLE, itersize=100000):
+        """ Count facts with `GROUP BY` scans of the KG table.
+
+        Args:
+            connection (psycopg2.extensions.connection)
+            train_relations (iterable of str): relation of every training example
+            table (str, optional): KG table
+            itersize (int, optional): number of rows fetched per round trip
+        """
+        relation_counts = dict(iterate_query(
+            connection, 'SELECT relation, count(*) FROM ' + table + ' GROUP BY relation',
+            itersize=itersize))
+        subject_counts = dict(iterate_query(
+            connection, 'SELECT subject_mid, count(*) FROM ' + table + ' GROUP BY subject_mid',
+            itersize=itersize))
+        object_counts = dict(iterate_query(
+            connection, 'SELECT object_mid, count(*) FROM ' + table + ' GROUP BY object_mid',
+            itersize=itersize))
+        return cls(relation_counts, subject_counts, train_relations, object_counts)
+
+    @classmethod
+    def get_path(cls, directory, kg_version):
+        return os.path.join(directory, 'relation_statistics.%s.v%d.pkl' % (kg_version, cls.VERSION))
+
+    def save(self, path):
+        with open(path, 'wb') as file_:
+            pickle.dump(self, file_, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def load(path):
+        with open(path, 'rb') as file_:
+            return pickle.load(file_)
+
+    @classmethod
+    def load_or_build(cls, directory, kg_version, build):
+        """ Load the catalog for `kg_version` from `directory` or build and save it.
+
+        Catalogs are keyed by `kg_version` and `VERSION`; a catalog saved by another `VERSION` is
+        rebuilt.
+
+        Args:
+            directory (str)
+            kg_version (str): identifier of the KG the statistics describe (e.g. the KG table);
+                change it whenever the KG changes.
+            build (callable): returns a new `RelationStatistics`
+        Returns:
+            (RelationStatistics)
+        """
+        path = cls.get_path(directory, kg_version)
+        if os.path.isfile(path):
+            logger.info('Loading relation statistics from %s', path)
+            statistics = cls.load(path)
+            if getattr(statistics, 'version', None) == cls.VERSION:
+                return statistics
+            logger.warning('Rebuilding relation statistics %s saved by version %s', path,
+                           getattr(statistics, 'version', None))
+        statistics = build()
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        statistics.save(path)
+        logger.info('Saved relation statistics to %s', path)
+        return statistics
+
+    def get_relation_ids(self, candidate_relations):
+        """ Pad a batch of candidate relation lists into a matrix of relation ids.
+
+        Args:
+            candidate_relations (list of lists of str)
+        Returns:
+            (np.ndarray [n_rows, max_candidates] int): relation ids padded with `unknown_id`
+        """
+        max_candidates = max([len(r) for r in candidate_relations] + [0])
+        relation_ids = np.full((len(candidate_relations), max_candidates), self.unknown_id,
+                               dtype=np.int64)
+        for i, relations in enumerate(candidate_relations):
+            relation_ids[i, :len(relations)] = [
+                self._relation_ids.get(r, self.unknown_id) for r in relations
+            ]
+        return relation_ids
+
+    def apply_prior(self, scores, relation_ids, n_objects=None):
+        """ Multiply the candidate scores by the KG to train prior of their relation and,
+        optionally, the number of candidate objects like the final decision in `Step 3`.
+
+        Args:
+            scores (np.ndarray [n_rows, max_candidates])
+            relation_ids (np.ndarray [n_rows, max_candidates] int)
+            n_objects (np.ndarray [n_rows, max_candidates], optional)
+        Returns:
+            (np.ndarray [n_rows, max_candidates])
+        """
+        scores = scores * self.prior[relation_ids]
+        if n_objects is not None:
+            scores = scores * n_objects
+        return scores
+
+
+def pad_scores(rows, fill_value=0.0):
+    """ Pad a ragged batch of candidate scores into a matrix.
+
+    Args:
+        rows (list of lists of float)
+        fill_value (float, optional)
+    Returns:
+        scores (np.ndarray [n_rows, max_candidates])
+        mask (np.ndarray [n_rows, max_candidates] bool): True for candidates, False for padding
+    """
+    lengths = np.array([len(row) for row in rows], dtype=np.int64)
+    max_candidates = lengths.max() if len(rows) > 0 else 0
+    mask = np.arange(max_candidates)[None, :] < lengths[:, None]
+    scores = np.full(mask.shape, fill_value, dtype=np.float64)
+    scores[mask] = np.concatenate([np.asarray(row, dtype=np.float64) for row in rows] + [[]])
+    return scores, mask
+
+
+def select_max(scores, mask, random_state=None):
+    """ Index of the highest scoring candidate per row; ties are broken at random like
+    `random.choice` in `Step 3`.
+
+    Args:
+        scores (np.ndarray [n_rows, max_candidates])
+        mask (np.ndarray [n_rows, max_candidates] bool)
+        random_state (np.random.RandomState, optional)
+    Returns:
+        (np.ndarray [n_rows] int): candidate index or -1 for rows without candidates
+    """
+    random_state = np.random.RandomState() if random_state is None else random_state
+    if scores.shape[1] == 0:
+        return np.full(scores.shape[0], -1, dtype=np.int64)
+    scores = np.where(mask, scores, -np.inf)
+    is_max = mask & (scores == scores.max(axis=1, keepdims=True))
+    noise = np.where(is_max, random_state.random_sample(scores.shape), -1.0)
+    return np.where(mask.any(axis=1), noise.argmax(axis=1), -1)
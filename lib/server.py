@@ -0,0 +1,512 @@
+"""
+Local question answering service.
+
+Motivation: The end-to-end notebooks replay a dataset; here, live questions are answered over HTTP.
+Concurrent requests are collected into micro-batches so the subject tagger and relation classifier
+run once per batch instead of once per question.
+
+Example:
+    answerer = QuestionAnswerer(
+        tokenize=TOKENIZE,
+        tag=partial(tag_subject_names, tagger, text_encoder, tag_labels),
+        generate_candidates=partial(generate_ngram_candidates, alias_index),
+        knowledge_graph=InMemoryKnowledgeGraph.from_file(FB2M_KG),
+        score_relations=partial(get_relation_scores, model, text_encoder, relation_encoder))
+    Server(answerer, max_batch_size=64, max_wait=0.01).serve(port=8080)
+
+    # Or answer a dataset streaming through `lib.pipeline.Pipeline` stages
+    for answer in answerer.stream(questions, batch_size=256):
+        ...
+
+    $ curl -d '{"question": "where was sasha vujacic born?"}' localhost:8080/answer
+    $ curl localhost:8080/stats
+"""
+from collections import deque
+
+import asyncio
+import json
+import logging
+import time
+
+import numpy as np
+import torch
+
+from torch.autograd import Variable
+from torchnlp.utils import pad_batch
+
+from lib.nn.character_encoder import encode_characters
+from lib.pipeline import Pipeline
+from lib.pipeline import Stage
+from lib.relation_scoring import get_predicate
+
+logger = logging.getLogger(__name__)
+
+
+def get_subject_names(tokens, paths):
+    """ Subject name spans from decoded tag sequences like `Step 1 - Predict Subject Name`.
+
+    Args:
+        tokens (list of str): question tokens
+        paths (list of tuples): `(tags, score)` tuples where tags are 'I' (subject name) or 'O'
+    Returns:
+        (list of dict): subject names with `name`, `score`, `start_index` and `end_index` keys
+    """
+    subject_names = []
+    for tags, score in paths:
+        starts = [i for i, tag in enumerate(tags) if tag == 'I' and (i == 0 or tags[i - 1] == 'O')]
+        # Ignore if multiple subject names are selected
+        if len(starts) != 1:
+            continue
+        ends = [i + 1 for i, tag in enumerate(tags)
+                if tag == 'I' and (i == len(tags) - 1 or tags[i + 1] == 'O')]
+        subject_names.append({
+            'name': ' '.join([tokens[i] for i, tag in enumerate(tags) if tag == 'I']),
+            'score': score,
+            'start_index': starts[0],
+            'end_index': ends[0],
+        })
+    return subject_names
+
+
+def tag_subject_names(tagger, text_encoder, labels, batch_tokens, top_k=500,
+                      character_to_index=None):
+    """ Predict the top k subject names for a batch of questions with one `SeqTagger` call.
+
+    Args:
+        tagger (lib.nn.SeqTagger): subject name tagger in evaluation mode
+        text_encoder (torchnlp.text_encoders.TextEncoder): tagger text encoder
+        labels (list of str): tag mapped from the tag index (e.g. ['O', 'I'])
+        batch_tokens (list of lists of str): question tokens
+        top_k (int, optional): number of tag sequences to decode per question
+        character_to_index (dict, optional): character vocabulary of a tagger with a
+            `CharacterEncoder` (e.g. `load_archive_vocabulary('.../token_characters.txt')`)
+    Returns:
+        (list of lists of dict): `get_subject_names` per question
+    """
+    is_cuda = next(tagger.parameters()).is_cuda
+    cuda = lambda t: t.cuda() if is_cuda else t
+
+    tokens, lengths = pad_batch([text_encoder.encode(' '.join(t)) for t in batch_tokens])
+    tokens = torch.stack(tokens).t_().contiguous()
+    mask = torch.zeros(tokens.size())
+    for i, length in enumerate(lengths):
+        mask[:length, i] = 1
+    characters = None
+    if character_to_index is not None:
+        characters = encode_characters(batch_tokens, character_to_index)
+        characters = cuda(Variable(characters, volatile=True))
+    decoded = tagger.decode(
+        cuda(Variable(tokens, volatile=True)),
+        cuda(Variable(mask, volatile=True)),
+        top_k=top_k,
+        characters=characters)
+    return [
+        get_subject_names(question_tokens, [([labels[i] for i in tags], score)
+                                            for tags, score in paths])
+        for question_tokens, paths in zip(batch_tokens, decoded)
+    ]
+
+
+def select_answer(candidate_facts, relations, scores):
+    """ Select the highest scoring relation and then the subject with the most objects.
+
+    Unlike `Step 3 - Predict Relation and Finish`, ties break on the first candidate so answers
+    are reproducible between requests.
+
+    Args:
+        candidate_facts (dict): relation mapped to a dict of subject MIDs mapped to object MIDs
+        relations (list of str): candidate relations
+        scores (list of float): score per candidate relation
+    Returns:
+        (tuple): `(subject_mid, relation, object_mids)`
+    """
+    relation = relations[int(np.argmax(scores))]
+    subjects = candidate_facts[relation]
+    subject_mid = max(sorted(subjects.keys()), key=lambda mid: len(subjects[mid]))
+    return subject_mid, relation, sorted(subjects[subject_mid])
+
+
+def select_pair(candidate_relations, relations, scores):
+    """ Same as `select_answer` for relation first retrieval where objects are not fetched yet.
+
+    Args:
+        candidate_relations (dict): relation mapped to a dict of subject MIDs mapped to their
+            number of objects
+        relations (list of str): candidate relations
+        scores (list of float): score per candidate relation
+    Returns:
+        (tuple): `(subject_mid, relation)`
+    """
+    relation = relations[int(np.argmax(scores))]
+    subjects = candidate_relations[relation]
+    return max(sorted(subjects.keys()), key=lambda mid: subjects[mid]), relation
+
+
+class QuestionAnswerer(object):
+    """ Answer a batch of questions end to end.
+
+    Args:
+        tokenize (callable): question tokens from a question
+        tag (callable): `get_subject_names` per question from a batch of question tokens
+        generate_candidates (callable): follows the `generate_candidates(row)` contract of
+            `Step 2 - Generate Candidates` (e.g. `partial(generate_ngram_candidates, index)`)
+        knowledge_graph (lib.knowledge_graph.DatabaseKnowledgeGraph or InMemoryKnowledgeGraph)
+        score_relations (callable): score per candidate relation from a batch of predicates and
+            candidate relations (e.g. `partial(get_relation_scores, model, ...)`)
+        relation_first (bool, optional): fetch the relations of the candidate MIDs first and then
+            the objects of the winning `(subject_mid, relation)` pairs only.
+    """
+
+    def __init__(self, tokenize, tag, generate_candidates, knowledge_graph, score_relations,
+                 relation_first=False):
+        self.tokenize = tokenize
+        self.tag = tag
+        self.generate_candidates = generate_candidates
+        self.knowledge_graph = knowledge_graph
+        self.score_relations = score_relations
+        self.relation_first = relation_first
+
+    def _tag(self, questions):
+        """ Batch stage tagging the subject names of `questions`. """
+        batch_tokens = [self.tokenize(question) for question in questions]
+        batch_subject_names = self.tag(batch_tokens)
+        return [{
+            'question': question,
+            'predicted_question_tokens': tokens,
+            'predicted_subject_names': subject_names,
+        } for question, tokens, subject_names in zip(questions, batch_tokens, batch_subject_names)]
+
+    def _fetch(self, row):
+        """ Stage fetching the candidate facts (or relations) of the candidate MIDs of `row`. """
+        get_candidates = (self.knowledge_graph.get_candidate_relations
+                          if self.relation_first else self.knowledge_graph.get_candidate_facts)
+        row['candidates'] = (get_candidates(row['candidate_mids'])
+                             if len(row['candidate_mids']) > 0 else {})
+        return row
+
+    def _score(self, rows):
+        """ Batch stage scoring the candidate relations of `rows` and selecting an answer. """
+        answerable = [row for row in rows if len(row['candidates']) > 0]
+        if len(answerable) == 0:
+            return rows
+
+        relations = [sorted(row['candidates'].keys()) for row in answerable]
+        predicates = [
+            get_predicate(row['predicted_question_tokens'], row['predicted_start_index'],
+                          row['predicted_end_index']) for row in answerable
+        ]
+        scores = self.score_relations(predicates, relations)
+        if self.relation_first:
+            pairs = [
+                select_pair(row['candidates'], row_relations, row_scores)
+                for row, row_relations, row_scores in zip(answerable, relations, scores)
+            ]
+            objects = self.knowledge_graph.get_objects(set(pairs))
+            for row, (subject_mid, relation) in zip(answerable, pairs):
+                row['answer'] = (subject_mid, relation,
+                                 sorted(objects.get((subject_mid, relation), [])))
+        else:
+            for row, row_relations, row_scores in zip(answerable, relations, scores):
+                row['answer'] = select_answer(row['candidates'], row_relations, row_scores)
+        return rows
+
+    def _answer(self, row):
+        """ Stage formatting the answer of `row`. """
+        subject_mid, relation, object_mids = row.get('answer', (None, None, None))
+        return {
+            'question': row['question'],
+            'subject_name': row['predicted_subject_name'] if 'answer' in row else None,
+            'subject_mid': subject_mid,
+            'relation': relation,
+            'object_mids': object_mids,
+        }
+
+    def __call__(self, questions):
+        """
+        Args:
+            questions (list of str)
+        Returns:
+            (list of dict): answer per question with `question`, `subject_name`, `subject_mid`,
+                `relation` and `object_mids` keys; unanswered questions have `None` values.
+        """
+        rows = [self._fetch(self.generate_candidates(row)) for row in self._tag(questions)]
+        return [self._answer(row) for row in self._score(rows)]
+
+    def stream(self, questions, batch_size=64, n_workers=4, **kwargs):
+        """ Answer a stream of questions with a `lib.pipeline.Pipeline`.
+
+        The tagger and relation scoring run on batches while the candidate generation and the
+        knowledge graph lookups of other questions run concurrently in `n_workers` threads.
+
+        Args:
+            questions (iterable of str)
+            batch_size (int, optional): maximum number of questions per tagger or relation
+                scoring call
+            n_workers (int, optional): number of threads generating candidates and fetching facts
+            **kwargs: keyword arguments passed to `Pipeline`
+        Returns:
+            (generator): same answers as `__call__` in the order of `questions`
+        Raises:
+            (lib.pipeline.PipelineError): a stage raised an exception
+        """
+        pipeline = Pipeline([
+            Stage(self._tag, batch_size=batch_size, name='tag'),
+            Stage(self.generate_candidates, n_workers=n_workers, name='candidates'),
+            Stage(self._fetch, n_workers=n_workers, name='facts'),
+            Stage(self._score, batch_size=batch_size, name='score'),
+            Stage(self._answer, name='answer'),
+        ], **kwargs)
+        return pipeline(questions)
+
+
+class MicroBatcher(object):
+    """ Collect concurrent requests into batches.
+
+    A batch is dispatched once it has `max_batch_size` items or `max_wait` seconds after its first
+    item arrived. Batches run one at a time in `executor`; requests arriving during a batch queue
+    up for the next one.
+
+    NOTE: Once `close` is called, new requests are refused and the queued requests are answered
+    before it returns.
+
+    Args:
+        function (callable): outputs from a list of inputs; must return a list of the same length
+        max_batch_size (int, optional): maximum number of inputs passed to `function` at once
+        max_wait (float, optional): maximum seconds to wait for a batch to fill
+        executor (concurrent.futures.Executor, optional): executor running `function`; by
+            default, the event loop default executor.
+        max_latencies (int, optional): number of most recent latencies kept for percentiles
+    """
+
+    def __init__(self, function, max_batch_size=32, max_wait=0.005, executor=None,
+                 max_latencies=10000):
+        self.function = function
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.executor = executor
+        self._queue = None
+        self._task = None
+        self._is_closing = False
+        self._start = None
+        self._latencies = deque(maxlen=max_latencies)
+        self._n_requests = 0
+        self._n_batches = 0
+        self._n_errors = 0
+
+    async def submit(self, item):
+        """ Output of `function` for `item` once its batch finishes.
+
+        Raises:
+            (RuntimeError): the batcher is closing
+            (Exception): the exception raised by `function` for the batch
+        """
+        if self._is_closing:
+            raise RuntimeError('The batcher is closing.')
+        if self._start is None:
+            self._start = time.time()
+        if self._task is None:
+            # NOTE: Create the queue inside the running event loop
+            self._queue = asyncio.Queue()
+            self._task = asyncio.ensure_future(self._run())
+        future = asyncio.get_event_loop().create_future()
+        start = time.time()
+        await self._queue.put((item, future))
+        try:
+            return await future
+        finally:
+            self._latencies.append(time.time() - start)
+
+    async def close(self):
+        """ Refuse new requests, answer the queued requests and stop dispatching batches. """
+        if self._task is None:
+            return
+        self._is_closing = True
+        try:
+            # NOTE: `_run` exits on the `None` sentinel after every request queued before it.
+            await self._queue.put(None)
+            await self._task
+        finally:
+            self._task = None
+            self._queue = None
+            self._is_closing = False
+
+    async def _run(self):
+        loop = asyncio.get_event_loop()
+        is_closed = False
+        while not is_closed:
+            batch = [await self._queue.get()]
+            if batch[0] is None:
+                break
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+                if batch[-1] is None:
+                    break
+            # Pick up requests that arrived while waiting on the event loop
+            while len(batch) < self.max_batch_size and not self._queue.empty():
+                if batch[-1] is None:
+                    break
+                batch.append(self._queue.get_nowait())
+            if batch[-1] is None:
+                is_closed = True
+                batch.pop()
+            if len(batch) > 0:
+                await self._run_batch(batch)
+
+    async def _run_batch(self, batch):
+        """ Run `function` on a batch of `(item, future)` pairs and resolve the futures. """
+        loop = asyncio.get_event_loop()
+        items = [item for item, _ in batch]
+        self._n_requests += len(batch)
+        self._n_batches += 1
+        try:
+            outputs = await loop.run_in_executor(self.executor, self.function, items)
+            if len(outputs) != len(items):
+                raise ValueError('Batch function returned %d outputs for %d inputs.' %
+                                 (len(outputs), len(items)))
+        except Exception as error:
+            logger.exception('Batch of %d failed', len(items))
+            self._n_errors += len(batch)
+            # NOTE: Drop the traceback so callers clearing its frames cannot close `_run`
+            error = error.with_traceback(None)
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        for (_, future), output in zip(batch, outputs):
+            if not future.done():
+                future.set_result(output)
+
+    def get_stats(self):
+        """
+        Returns:
+            (dict): throughput and latency counters; throughput is in requests per second since the
+                first request and latencies are in milliseconds.
+        """
+        latencies = np.array(self._latencies) * 1000
+        percentile = lambda q: float(np.percentile(latencies, q)) if len(latencies) > 0 else None
+        return {
+            'requests': self._n_requests,
+            'batches': self._n_batches,
+            'errors': self._n_errors,
+            'mean_batch_size': self._n_requests / self._n_batches if self._n_batches > 0 else None,
+            'throughput': (self._n_requests / max(time.time() - self._start, 1e-9)
+                           if self._start is not None else None),
+            'latency_p50': percentile(50),
+            'latency_p95': percentile(95),
+            'latency_p99': percentile(99),
+            'latency_max': float(latencies.max()) if len(latencies) > 0 else None,
+        }
+
+
+class Server(object):
+    """ Minimal HTTP/1.1 JSON server.
+
+    Routes:
+        POST /answer: `{"question": str}` answered with the `QuestionAnswerer` output
+        GET /stats: `MicroBatcher.get_stats`
+
+    Args:
+        answerer (callable): outputs from a list of questions (e.g. `QuestionAnswerer`)
+        max_body_size (int, optional): maximum request body size in bytes; larger requests are
+            answered with 413 without reading the body.
+        **kwargs: keyword arguments passed to `MicroBatcher`
+    """
+
+    _REASONS = {
+        200: 'OK',
+        400: 'Bad Request',
+        404: 'Not Found',
+        413: 'Payload Too Large',
+        500: 'Internal Server Error'
+    }
+
+    def __init__(self, answerer, max_body_size=2**16, **kwargs):
+        self.max_body_size = max_body_size
+        self.batcher = MicroBatcher(answerer, **kwargs)
+
+    async def _respond(self, writer, status, body):
+        body = json.dumps(body).encode('utf-8')
+        writer.write(('HTTP/1.1 %d %s\r\nContent-Type: application/json\r\n'
+                      'Content-Length: %d\r\nConnection: close\r\n\r\n' %
+                      (status, self._REASONS[status], len(body))).encode('latin-1') + body)
+        await writer.drain()
+
+    async def _route(self, method, path, body):
+        """
+        Returns:
+            (tuple): `(status, body)`
+        """
+        if method == 'GET' and path == '/stats':
+            return 200, self.batcher.get_stats()
+        if method == 'POST' and path == '/answer':
+            try:
+                question = json.loads(body.decode('utf-8'))['question']
+            except (ValueError, KeyError, TypeError):
+                return 400, {'error': 'Expected a JSON body with a "question" string.'}
+            if not isinstance(question, str) or len(question.strip()) == 0:
+                return 400, {'error': 'Expected a JSON body with a "question" string.'}
+            try:
+                return 200, await self.batcher.submit(question)
+            except Exception as error:
+                return 500, {'error': repr(error)}
+        return 404, {'error': 'No route for %s %s' % (method, path)}
+
+    async def handle(self, reader, writer):
+        """ Handle one HTTP request per connection. """
+        try:
+            request_line = (await reader.readline()).decode('latin-1').split()
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode('latin-1').strip()
+                if line == '':
+                    break
+                key, _, value = line.partition(':')
+                headers[key.strip().lower()] = value.strip()
+            if len(request_line) != 3:
+                await self._respond(writer, 400, {'error': 'Malformed request line.'})
+                return
+            method, path, _ = request_line
+            content_length = headers.get('content-length', '0')
+            if not content_length.isdigit():
+                await self._respond(writer, 400, {'error': 'Malformed Content-Length header.'})
+                return
+            if int(content_length) > self.max_body_size:
+                await self._respond(writer, 413, {
+                    'error': 'Request body is larger than %d bytes.' % self.max_body_size
+                })
+                return
+            body = await reader.readexactly(int(content_length))
+            status, response = await self._route(method, path.split('?')[0], body)
+            await self._respond(writer, status, response)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host='127.0.0.1', port=8080):
+        """
+        Returns:
+            (asyncio.AbstractServer)
+        """
+        return await asyncio.start_server(self.handle, host, port)
+
+    def serve(self, host='127.0.0.1', port=8080):
+        """ Serve forever. """
+        loop = asyncio.get_event_loop()
+        server = loop.run_until_complete(self.start(host, port))
+        logger.info('Serving on %s', server.sockets[0].getsockname())
+        try:
+            loop.run_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.close()
+            loop.run_until_complete(server.wait_closed())
+            loop.run_until_complete(self.batcher.close())
@@ -0,0 +1,183 @@
+"""
+Deterministic sharded batch runs.
+
+Motivation: An end-to-end pass over SimpleQuestions with FB5M takes hours in one process. Here,
+questions are assigned to shards by a stable hash of their key, every shard runs the pipeline
+stages in its own process or host against the shared read-only KG, and the per shard predictions
+and metric counts are merged. Random tie breaking is seeded per question; therefore, the merged
+results are identical to a single process run regardless of the number of shards.
+
+Example:
+    # On host `i` of `n`:
+    df_shard = get_shard(df, n_shards=n, shard_index=i)
+    write_artifact(run_stages(df_shard), get_shard_path('predictions/', 'step_3', i, n))
+    # Once every shard finished:
+    df = merge_shards([get_shard_path('predictions/', 'step_3', i, n) for i in range(n)])
+"""
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import hashlib
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from lib.artifacts import read_artifact
+
+logger = logging.getLogger(__name__)
+
+
+def stable_hash(*keys):
+    """ 64 bit hash of `keys` that, unlike `hash`, is the same in every process and on every host.
+
+    Args:
+        *keys (str or int)
+    Returns:
+        (int)
+    """
+    digest = hashlib.md5('\x1f'.join(str(k) for k in keys).encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'little')
+
+
+def get_shard_index(key, n_shards):
+    """
+    Args:
+        key (str or int): question key (e.g. the question or its id)
+        n_shards (int)
+    Returns:
+        (int): shard of `key` between 0 and `n_shards - 1`
+    """
+    return stable_hash(key) % n_shards
+
+
+def get_shard(df, n_shards, shard_index, key_column=None):
+    """ Rows of `df` assigned to `shard_index`.
+
+    Args:
+        df (pandas.DataFrame)
+        n_shards (int)
+        shard_index (int)
+        key_column (str, optional): column keying every question; by default, the index.
+    Returns:
+        (pandas.DataFrame)
+    """
+    if not 0 <= shard_index < n_shards:
+        raise ValueError('Shard %d does not exist in %d shards.' % (shard_index, n_shards))
+    return df[_get_shard_indices(df, n_shards, key_column) == shard_index]
+
+
+def split_shards(df, n_shards, key_column=None):
+    """ Every shard of `df`; unlike `get_shard` per shard, every key is hashed once.
+
+    Args:
+        df (pandas.DataFrame)
+        n_shards (int)
+        key_column (str, optional): see `get_shard`
+    Returns:
+        (list of pandas.DataFrame): rows of every shard index
+    """
+    shard_indices = _get_shard_indices(df, n_shards, key_column)
+    return [df[shard_indices == i] for i in range(n_shards)]
+
+
+def _get_shard_indices(df, n_shards, key_column):
+    keys = df.index if key_column is None else df[key_column]
+    return np.array([get_shard_index(key, n_shards) for key in keys], dtype=np.int64)
+
+
+def get_shard_path(directory, name, shard_index, n_shards):
+    return os.path.join(directory, '%s.%05d-of-%05d.arrow' % (name, shard_index, n_shards))
+
+
+def get_random_state(seed, key):
+    """ Random state of a question; ties are broken the same way in every shard.
+
+    Args:
+        seed (int)
+        key (str or int): question key
+    Returns:
+        (np.random.RandomState)
+    """
+    return np.random.RandomState(stable_hash(seed, key) % 2**32)
+
+
+def get_tie_breaker(seed, keys, lengths):
+    """ Per candidate random values seeded per question for `segment_argmax`.
+
+    Args:
+        seed (int)
+        keys (iterable of str or int): question key per question
+        lengths (iterable of int): number of candidates per question
+    Returns:
+        (np.ndarray [sum(lengths)] float64)
+    """
+    return np.concatenate([get_random_state(seed, key).random_sample(length)
+                           for key, length in zip(keys, lengths)] + [[]])
+
+
+def run_shards(function, df, n_shards, key_column=None, max_workers=None):
+    """ Run `function` on every shard of `df` in its own process and merge the outputs.
+
+    Args:
+        function (callable): picklable function from a shard `pandas.DataFrame` to a
+            `pandas.DataFrame` with the same index.
+        df (pandas.DataFrame)
+        n_shards (int)
+        key_column (str, optional): see `get_shard`
+        max_workers (int, optional): maximum number of processes; by default, `n_shards`.
+    Returns:
+        (pandas.DataFrame): outputs in the order of `df`
+    """
+    max_workers = n_shards if max_workers is None else max_workers
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        # NOTE: Every worker is only sent the rows of its shard rather than all of `df`.
+        futures = [
+            executor.submit(function, shard) for shard in split_shards(df, n_shards, key_column)
+        ]
+        outputs = [future.result() for future in futures]
+    return merge_outputs(outputs, df.index)
+
+
+def merge_outputs(outputs, index=None):
+    """
+    Args:
+        outputs (list of pandas.DataFrame): per shard outputs
+        index (pandas.Index, optional): order of the merged rows; by default, the index is sorted.
+    Returns:
+        (pandas.DataFrame)
+    """
+    merged = pd.concat(outputs)
+    if not merged.index.is_unique:
+        raise ValueError('Shards must not overlap.')
+    return merged.sort_index() if index is None else merged.loc[index]
+
+
+def merge_shards(paths, index=None):
+    """ Merge per shard artifacts written on separate hosts.
+
+    Args:
+        paths (list of str): see `get_shard_path`
+        index (pandas.Index, optional): see `merge_outputs`
+    Returns:
+        (pandas.DataFrame)
+    """
+    missing = [path for path in paths if not os.path.isfile(path)]
+    if len(missing) > 0:
+        raise ValueError('Shards are missing: %s' % missing)
+    return merge_outputs([read_artifact(path) for path in paths], index)
+
+
+def merge_metrics(metrics):
+    """ Sum per shard metric counts like the counts in `evaluate` of `Step 3`.
+
+    Args:
+        metrics (list of dict): per shard, metric name mapped to a count
+    Returns:
+        (dict)
+    """
+    merged = Counter()
+    for shard_metrics in metrics:
+        merged.update(shard_metrics)
+    return dict(merged)
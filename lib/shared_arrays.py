@@ -0,0 +1,189 @@
+"""
+Memory mapped datasets and embeddings shared by parallel training workers.
+
+Motivation: The relation classifier encodes `train_dataset` and `dev_dataset` into a Python list
+of tensors and builds a dense FastText `embedding_weights` matrix; every parallel trial or data
+parallel worker holding its own copy duplicates gigabytes. Here, the encoded token arrays, the
+relation pools (the masks are built from them per row) and the embedding matrix are written once
+to `.npy` files; workers memory map them copy-on-write, so every process reads the same physical
+pages from the page cache. A `SharedDataset` pickles as its directory; therefore, sending it to a
+worker attaches to the files instead of copying the arrays.
+
+Example:
+    write_dataset('../../.shared/train/', train_dataset, ['text', 'relation', 'pool'])
+    write_arrays('../../.shared/embeddings/', {'embedding_weights': embedding_weights.numpy()})
+
+    # In any process:
+    train_dataset = SharedDataset('../../.shared/train/')
+    arrays = read_arrays('../../.shared/embeddings/')
+    embedding_weights = torch.from_numpy(arrays['embedding_weights'])
+"""
+import logging
+import os
+
+import numpy as np
+import torch
+
+logger = logging.getLogger(__name__)
+
+# NOTE: Copy-on-write pages are shared until written; unlike read only pages, `torch.from_numpy`
+# accepts them.
+MMAP_MODE = 'c'
+
+
+def write_arrays(directory, arrays):
+    """ Write every array to `directory` as a `.npy` file.
+
+    Args:
+        directory (str)
+        arrays (dict): name mapped to a `np.ndarray`
+    """
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    for name, array in arrays.items():
+        path = os.path.join(directory, name + '.npy')
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as file_:
+            np.save(file_, np.ascontiguousarray(array))
+        os.replace(tmp_path, path)
+        logger.info('Wrote %s %s array to %s', array.dtype, array.shape, path)
+
+
+def read_arrays(directory, names=None):
+    """ Memory map the arrays of `directory`; no data is read until it is accessed.
+
+    Args:
+        directory (str)
+        names (list of str, optional): arrays to map; by default, every array.
+    Returns:
+        (dict): name mapped to a `np.memmap`
+    """
+    if names is None:
+        names = sorted(f[:-len('.npy')] for f in os.listdir(directory) if f.endswith('.npy'))
+    return {
+        name: np.load(os.path.join(directory, name + '.npy'), mmap_mode=MMAP_MODE)
+        for name in names
+    }
+
+
+class RaggedArray(object):
+    """ Variable length rows stored as one flat array of values and row offsets.
+
+    Args:
+        values (np.ndarray [n_values]): concatenated rows
+        offsets (np.ndarray [n_rows + 1]): row `i` is `values[offsets[i]:offsets[i + 1]]`
+        shapes (np.ndarray [n_rows, n_dimensions], optional): shape of every row (e.g. `[]` for
+            scalars); by default, rows are vectors.
+    """
+
+    def __init__(self, values, offsets, shapes=None):
+        self.values = values
+        self.offsets = offsets
+        self.shapes = shapes
+
+    @classmethod
+    def from_rows(cls, rows, dtype):
+        """
+        Args:
+            rows (iterable of array-like): variable length rows with the same number of dimensions
+            dtype (np.dtype)
+        Returns:
+            (RaggedArray)
+        Raises:
+            (ValueError): rows have a different number of dimensions.
+        """
+        rows = [np.asarray(row, dtype=dtype) for row in rows]
+        n_dimensions = set(row.ndim for row in rows)
+        if len(n_dimensions) > 1:
+            raise ValueError('Rows must have the same number of dimensions, got %s.' %
+                             sorted(n_dimensions))
+        n_dimensions = n_dimensions.pop() if n_dimensions else 1
+        shapes = np.array([row.shape for row in rows], dtype=np.int64).reshape(
+            len(rows), n_dimensions)
+        rows = [row.reshape(-1) for row in rows]
+        lengths = np.array([len(row) for row in rows], dtype=np.int64)
+        offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        values = np.concatenate(rows + [np.zeros(0, dtype=dtype)])
+        return cls(values, offsets, shapes)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        row = self.values[self.offsets[index]:self.offsets[index + 1]]
+        # NOTE: `reshape` of the contiguous slice is a view of the mapped pages, not a copy.
+        return row if self.shapes is None else row.reshape(tuple(self.shapes[index]))
+
+
+def write_dataset(directory, dataset, columns):
+    """ Write the encoded columns of `dataset` as ragged arrays.
+
+    The shape of every row is written too; therefore, scalars (e.g. a relation index) and matrices
+    are read back with their shape instead of as vectors.
+
+    Args:
+        directory (str)
+        dataset (iterable of dict): rows with a tensor, array or list per column
+        columns (list of str): columns to write
+    """
+    arrays = {}
+    for column in columns:
+        rows = [row[column] for row in dataset]
+        rows = [row.numpy() if torch.is_tensor(row) else np.asarray(row) for row in rows]
+        # NOTE: Empty lists default to `float64`; therefore, the first non-empty row is used.
+        dtype = next((row.dtype for row in rows if row.size > 0), np.int64)
+        ragged = RaggedArray.from_rows(rows, dtype)
+        arrays[column + '.values'] = ragged.values
+        arrays[column + '.offsets'] = ragged.offsets
+        arrays[column + '.shapes'] = ragged.shapes
+    write_arrays(directory, arrays)
+
+
+class SharedDataset(object):
+    """ Dataset of rows backed by ragged arrays memory mapped from `write_dataset`.
+
+    Every row is a dict of tensors viewing the mapped pages without a copy.
+
+    Args:
+        directory (str): directory written by `write_dataset`
+        transform (callable, optional): picklable function applied to every row (e.g. to build a
+            mask from a relation pool)
+    """
+
+    def __init__(self, directory, transform=None):
+        self.directory = directory
+        self.transform = transform
+        self._attach()
+
+    def _attach(self):
+        arrays = read_arrays(self.directory)
+        columns = sorted(set(name.rsplit('.', 1)[0] for name in arrays))
+        # NOTE: Directories written before `.shapes` existed have vector rows.
+        self.columns = {
+            column: RaggedArray(arrays[column + '.values'], arrays[column + '.offsets'],
+                                arrays.get(column + '.shapes'))
+            for column in columns
+        }
+
+    def __getstate__(self):
+        # NOTE: Workers map the files again instead of receiving a copy of the arrays.
+        return {'directory': self.directory, 'transform': self.transform}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._attach()
+
+    def __len__(self):
+        return len(next(iter(self.columns.values())))
+
+    def __getitem__(self, index):
+        if isinstance(index, str):
+            return [self[i][index] for i in range(len(self))]
+        if isinstance(index, slice):
+            return [self[i] for i in range(len(self))[index]]
+        row = {k: torch.from_numpy(v[index]) for k, v in self.columns.items()}
+        return row if self.transform is None else self.transform(row)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
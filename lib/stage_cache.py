@@ -0,0 +1,155 @@
+"""
+Content addressed cache of pipeline stage outputs.
+
+Motivation: Changing the relation ensemble means re-running `Step 1` and `Step 2` by hand or
+trusting stale pickles. Here, every stage output is stored under a hash of the stage inputs, the
+source code of the stage and its configuration, including the `lib.configurable` configuration;
+therefore, re-running the end-to-end evaluation only recomputes the stages whose inputs changed.
+
+Example:
+    cache = StageCache('../../.stage_cache/')
+    step_1 = cache.run('step_1', predict_subject_name, inputs={'split': 'dev'})
+    step_2 = cache.run('step_2', generate_candidates, inputs={'df': step_1},
+                       config={'top_k': 500})
+    df = cache.load(step_2, columns=['candidate_mids', 'predicted_subject_name'])
+"""
+from collections import namedtuple
+
+import hashlib
+import inspect
+import json
+import logging
+import os
+import pickle
+
+from lib.artifacts import read_artifact
+from lib.artifacts import write_artifact
+from lib.configurable import get_config
+
+logger = logging.getLogger(__name__)
+
+# Output of a stage run; pass it as the input of a downstream stage.
+StageOutput = namedtuple('StageOutput', ['name', 'key', 'path'])
+
+
+def _hash_bytes(bytes_):
+    return hashlib.sha256(bytes_).hexdigest()
+
+
+def _hash_file(path, chunk_size=2**20):
+    hash_ = hashlib.sha256()
+    with open(path, 'rb') as file_:
+        for chunk in iter(lambda: file_.read(chunk_size), b''):
+            hash_.update(chunk)
+    return hash_.hexdigest()
+
+
+def _get_source(function):
+    try:
+        return inspect.getsource(function)
+    except (OSError, TypeError):
+        # NOTE: Functions defined in a REPL have no source file; fall back on the bytecode.
+        code = getattr(function, '__code__', None)
+        return repr(function) if code is None else repr(code.co_code)
+
+
+class StageCache(object):
+    """
+    Args:
+        directory (str): directory the stage outputs are stored in
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        # File hashes keyed by `(path, size, mtime)` so large inputs are hashed once per process
+        self._file_hashes = {}
+
+    def fingerprint(self, value):
+        """ Hash of a stage input.
+
+        Args:
+            value (object): a `StageOutput`, the path of an existing file or any JSON or pickle
+                serializable value.
+        Returns:
+            (str)
+        """
+        if isinstance(value, StageOutput):
+            return value.key
+        if isinstance(value, str) and os.path.isfile(value):
+            stat = os.stat(value)
+            cache_key = (os.path.realpath(value), stat.st_size, stat.st_mtime)
+            if cache_key not in self._file_hashes:
+                self._file_hashes[cache_key] = _hash_file(value)
+            return self._file_hashes[cache_key]
+        try:
+            return _hash_bytes(json.dumps(value, sort_keys=True).encode('utf-8'))
+        except TypeError:
+            return _hash_bytes(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def get_key(self, name, function, inputs=None, config=None, dependencies=()):
+        """ Cache key of a stage.
+
+        Args:
+            name (str): name of the stage
+            function (callable): stage function
+            inputs (dict, optional): stage inputs passed to `function` as keyword arguments
+            config (dict, optional): stage configuration passed to `function` as keyword
+                arguments
+            dependencies (iterable of callables or modules, optional): code `function` calls whose
+                source is part of the code version
+        Returns:
+            (str)
+        """
+        inputs = {} if inputs is None else inputs
+        config = {} if config is None else config
+        description = {
+            'name': name,
+            'code': [_hash_bytes(_get_source(f).encode('utf-8'))
+                     for f in [function] + list(dependencies)],
+            'inputs': {k: self.fingerprint(v) for k, v in inputs.items()},
+            'config': self.fingerprint(config),
+            'configurable': self.fingerprint({k: repr(v) for k, v in get_config().items()}),
+        }
+        return _hash_bytes(json.dumps(description, sort_keys=True).encode('utf-8'))
+
+    def get_path(self, name, key):
+        return os.path.join(self.directory, '%s.%s.arrow' % (name, key))
+
+    def run(self, name, function, inputs=None, config=None, dependencies=()):
+        """ Run the stage unless its output is cached.
+
+        `StageOutput` inputs are loaded before they are passed to `function`; therefore, upstream
+        outputs are only read if the stage is recomputed.
+
+        Args:
+            See `get_key`; `function` returns a `pandas.DataFrame`.
+        Returns:
+            (StageOutput)
+        """
+        inputs = {} if inputs is None else inputs
+        config = {} if config is None else config
+        key = self.get_key(name, function, inputs, config, dependencies)
+        path = self.get_path(name, key)
+        output = StageOutput(name, key, path)
+        if os.path.isfile(path):
+            logger.info('Stage %s is cached at %s', name, path)
+            return output
+
+        logger.info('Running stage %s...', name)
+        kwargs = {k: self.load(v) if isinstance(v, StageOutput) else v for k, v in inputs.items()}
+        kwargs.update(config)
+        df = function(**kwargs)
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        write_artifact(df, path)
+        return output
+
+    def load(self, output, columns=None):
+        """
+        Args:
+            output (StageOutput)
+            columns (list of str, optional): columns to read
+        Returns:
+            (pandas.DataFrame)
+        """
+        return read_artifact(output.path, columns=columns)
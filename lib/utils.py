@@ -5,6 +5,8 @@ import random
 import sys
 import time
 
+from functools import lru_cache
+
 import numpy as np
 import pandas as pd
 import psycopg2
@@ -26,6 +28,7 @@ FB5M_KG = os.path.realpath(os.path.join(_directory_path, FB5M_KG))
 FB2M_KG_TABLE = 'fb_two_kg'
 FB5M_KG_TABLE = 'fb_five_kg'
 FB2M_NAME_TABLE = 'fb_two_subject_name'
+FB2M_SUBJECT_RELATION_TABLE = 'fb_two_subject_relation'
 
 
 def resplit_datasets(dataset, other_dataset, random_seed=None, cut=None):
@@ -194,24 +197,45 @@ def torch_equals_ignore_index(tensor, tensor_other, ignore_index=None):
     return torch.equal(tensor, tensor_other)
 
 
-def get_connection():
-    # Load .env file
+@lru_cache(maxsize=None)
+def _read_credentials(pass_path):
+    """ Parse the `.pass` file at `pass_path` once per process; see `get_credentials`. """
     pass_ = {}
+    with open(pass_path) as file_:
+        for line in file_:
+            if line.strip() == '':
+                continue
+            split = line.strip().split('=')
+            pass_[split[0]] = split[1]
+
+    return {
+        'dbname': pass_['DB_NAME'],
+        'port': pass_['DB_PORT'],
+        'user': pass_['DB_USER'],
+        'host': pass_['DB_HOST'],
+        'password': pass_['DB_PASS'],
+    }
 
-    # Get the path relative to the directory this file is in
-    _directory_path = os.path.dirname(os.path.realpath(__file__))
-    pass_path = os.path.join(_directory_path, '../.pass')
-    for line in open(pass_path):
-        split = line.strip().split('=')
-        pass_[split[0]] = split[1]
-
-    # Connect
-    return psycopg2.connect(
-        dbname=pass_['DB_NAME'],
-        port=pass_['DB_PORT'],
-        user=pass_['DB_USER'],
-        host=pass_['DB_HOST'],
-        password=pass_['DB_PASS'])
+
+def get_credentials(pass_path=None):
+    """ Get the database credentials; the `.pass` file is parsed once per process.
+
+    Args:
+        pass_path (str, optional): path to a file of `KEY=VALUE` lines; by default, `.pass` in the
+            repository root.
+    Returns:
+        (dict): new dict of keyword arguments for `psycopg2.connect`; the caller may modify it.
+    """
+    if pass_path is None:
+        # Get the path relative to the directory this file is in
+        _directory_path = os.path.dirname(os.path.realpath(__file__))
+        pass_path = os.path.join(_directory_path, '../.pass')
+    return dict(_read_credentials(pass_path))
+
+
+def get_connection():
+    """ Open a new connection; prefer a pooled `lib.database.Database` for repeated queries. """
+    return psycopg2.connect(**get_credentials())
 
 
 def format_pipe_table(*args, **kwargs):
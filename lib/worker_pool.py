@@ -0,0 +1,135 @@
+"""
+Process pool pinning every model of a hyperparameter search to the worker that trained it.
+
+Motivation: Between rungs, `successive_halving` hands a promoted model to any worker of a
+`ProcessPoolExecutor`; therefore, the objective deserializes the model and optimizer from its
+checkpoint and rebuilds its datasets every rung. Here, every model is pinned to one worker
+process; the objective keeps the model warm in `get_trial_cache` and the encoded datasets in
+`get_process_cache`, so a promotion costs no deserialization.
+
+Example:
+    def objective(resources, checkpoint=None, **hyperparameters):
+        cache = get_trial_cache()
+        if checkpoint is not None and cache.get('checkpoint') == checkpoint:
+            model = cache['model']
+        ...
+        cache.update({'checkpoint': checkpoint, 'model': model})
+        return score, checkpoint
+
+    with StickyProcessPool(n_workers=4) as executor:
+        hyperband(objective, space, executor=executor)
+"""
+from concurrent.futures import Executor
+from concurrent.futures import ProcessPoolExecutor
+
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# NOTE: The below state is per process; in a worker, it lives as long as the worker.
+_trial_id = None
+_trial_caches = {}
+_process_cache = {}
+
+
+def get_trial_cache():
+    """ Get the cache of the model the current worker call trains.
+
+    The cache persists between the calls of a model on a `StickyProcessPool` worker until the
+    model is released; otherwise, an empty cache is returned every call.
+
+    Returns:
+        (dict)
+    """
+    if _trial_id is None:
+        return {}
+    return _trial_caches.setdefault(_trial_id, {})
+
+
+def get_process_cache():
+    """ Get the cache shared by every call in the current process (e.g. for encoded datasets).
+
+    Returns:
+        (dict)
+    """
+    return _process_cache
+
+
+def _call(trial_id, function, args, kwargs):
+    global _trial_id
+    _trial_id = trial_id
+    try:
+        return function(*args, **kwargs)
+    finally:
+        _trial_id = None
+
+
+def _evict(trial_id):
+    _trial_caches.pop(trial_id, None)
+
+
+class StickyProcessPool(Executor):
+    """ Executor of single process workers; calls for the same key run on the same worker.
+
+    NOTE: A model stays on its worker even if another worker is idle; warm models trade load
+    balance for no deserialization.
+
+    Args:
+        n_workers (int): number of worker processes
+    """
+
+    def __init__(self, n_workers):
+        self._workers = [ProcessPoolExecutor(max_workers=1) for _ in range(n_workers)]
+        self._assignments = {}
+        self._n_pending = [0 for _ in range(n_workers)]
+        self._lock = threading.Lock()
+
+    def _get_idle_worker(self):
+        n_assigned = [0 for _ in self._workers]
+        for index in self._assignments.values():
+            n_assigned[index] += 1
+        return min(range(len(self._workers)), key=lambda i: (self._n_pending[i], n_assigned[i]))
+
+    def _submit(self, index, trial_id, function, args, kwargs):
+        with self._lock:
+            self._n_pending[index] += 1
+        future = self._workers[index].submit(_call, trial_id, function, args, kwargs)
+        future.add_done_callback(lambda _: self._done(index))
+        return future
+
+    def _done(self, index):
+        with self._lock:
+            self._n_pending[index] -= 1
+
+    def submit(self, function, *args, **kwargs):
+        """ Run `function` on the least busy worker without a trial cache. """
+        return self._submit(self._get_idle_worker(), None, function, args, kwargs)
+
+    def submit_to(self, key, function, *args, **kwargs):
+        """ Run `function` on the worker `key` is pinned to.
+
+        Args:
+            key (str): model identifier; the first call pins it to the least busy worker.
+            function (callable): picklable function; `get_trial_cache` returns the cache of `key`
+                while it runs.
+            *args: arguments of `function`
+            **kwargs: keyword arguments of `function`
+        Returns:
+            (concurrent.futures.Future)
+        """
+        if key not in self._assignments:
+            self._assignments[key] = self._get_idle_worker()
+        return self._submit(self._assignments[key], key, function, args, kwargs)
+
+    def release(self, key):
+        """ Unpin `key` and evict its trial cache; unknown keys are ignored. """
+        index = self._assignments.pop(key, None)
+        if index is not None:
+            # NOTE: Every worker runs its calls in order; therefore, the cache is evicted after
+            # the pending calls of `key`.
+            self._workers[index].submit(_evict, key)
+
+    def shutdown(self, wait=True):
+        for worker in self._workers:
+            worker.shutdown(wait=wait)
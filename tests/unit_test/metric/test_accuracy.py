@@ -1,5 +1,8 @@
 import unittest
 
+import torch
+
+from lib.metrics import AccuracyAccumulator
 from lib.metrics import get_accuracy
 from tests.lib.utils import get_batch
 
@@ -22,3 +25,35 @@ class TestGetAccuracy(unittest.TestCase):
         self.assertAlmostEqual(accuracy, 1)
         self.assertAlmostEqual(n_correct, 2)
         self.assertAlmostEqual(n_total, 2)
+
+
+class TestAccuracyAccumulator(unittest.TestCase):
+
+    def setUp(self):
+        torch.manual_seed(123)
+        self.outputs = torch.randn(50, 2, 3)
+        self.targets = self.outputs.max(2)[1]
+        self.targets[:20, 1] = (self.targets[:20, 1] + 1) % 3
+
+    def test_get_accuracy(self):
+        # Batches accumulate to the accuracy of `get_accuracy`
+        for ignore_index in [None, 0, 1]:
+            accumulator = AccuracyAccumulator(ignore_index=ignore_index)
+            accumulator.update(self.targets[:15], self.outputs[:15])
+            accumulator.update(self.targets[15:], self.outputs[15:])
+            expected = get_accuracy(
+                list(self.targets.split(1, dim=0)),
+                list(self.outputs.split(1, dim=0)),
+                ignore_index=ignore_index)
+            self.assertEqual(accumulator.get_accuracy(print_=True), expected)
+
+    def test_top_k(self):
+        outputs = torch.FloatTensor([[0.1, 0.5, 0.4], [0.6, 0.3, 0.1], [0.2, 0.3, 0.5]])
+        targets = torch.LongTensor([2, 2, 2])
+        accumulator = AccuracyAccumulator(top_k=2)
+        accumulator.update(targets, outputs)
+        self.assertEqual(accumulator.get_accuracy(), (2 / 3, 2, 3))
+
+        accumulator = AccuracyAccumulator()
+        accumulator.update(targets, outputs)
+        self.assertEqual(accumulator.get_accuracy(), (1 / 3, 1, 3))
@@ -1,6 +1,10 @@
+import random
 import unittest
 
+import torch
+
 from lib.metrics import print_random_sample
+from lib.metrics import RandomSampleAccumulator
 from tests.lib.utils import get_batch
 from torchnlp.text_encoders import WhitespaceEncoder
 
@@ -55,3 +59,43 @@ class TestPrintRandomSample(unittest.TestCase):
             self.input_text_encoder,
             self.output_text_encoder,
             n_samples=40)
+
+
+class TestRandomSampleAccumulator(unittest.TestCase):
+
+    def setUp(self):
+        self.text_encoder = WhitespaceEncoder(['a b c d e'], append_eos=False)
+        self.targets = torch.stack(
+            [self.text_encoder.encode(t) for t in ['a b c d e', 'a a a a a', 'b b b b b']])
+        predictions = torch.stack(
+            [self.text_encoder.encode(t) for t in ['a b c d d', 'a a a a a', 'b b b b b']])
+        self.outputs = torch.zeros(3, 5, self.text_encoder.vocab_size).scatter_(
+            2, predictions.unsqueeze(2), 1)
+
+    def test_update(self):
+        accumulator = RandomSampleAccumulator(n_samples=1, random_state=random.Random(123))
+        accumulator.update(self.targets, self.targets, self.outputs)
+        self.assertEqual(accumulator.n_seen, {'Positive': 2, 'Negative': 1})
+        self.assertEqual(len(accumulator.samples['Positive']), 1)
+        self.assertEqual(accumulator.samples['Negative'][0][0].tolist(),
+                         self.targets[0].tolist())
+        accumulator.print_random_sample(self.text_encoder, self.text_encoder)
+
+    def test_ignore_index(self):
+        accumulator = RandomSampleAccumulator(ignore_index=self.text_encoder.stoi['e'])
+        accumulator.update(self.targets, self.targets, self.outputs)
+        self.assertEqual(accumulator.n_seen, {'Positive': 3, 'Negative': 0})
+        accumulator.print_random_sample(self.text_encoder, self.text_encoder)
+
+    def test_reservoir_uniform(self):
+        # Every positive example is sampled with the same probability
+        counts = [0, 0]
+        random_state = random.Random(123)
+        for _ in range(2000):
+            accumulator = RandomSampleAccumulator(n_samples=1, random_state=random_state)
+            for i in range(3):
+                accumulator.update(self.targets[i:i + 1], self.targets[i:i + 1],
+                                   self.outputs[i:i + 1])
+            source = accumulator.samples['Positive'][0][0]
+            counts[int(source[0] == self.text_encoder.stoi['b'])] += 1
+        self.assertGreater(min(counts), 900)
@@ -0,0 +1,58 @@
+import itertools
+import math
+import unittest
+
+import torch
+from torch.autograd import Variable
+
+from lib.nn import CRF
+
+
+class TestCRF(unittest.TestCase):
+
+    def setUp(self):
+        self.n_tags = 3
+        self.crf = CRF(self.n_tags)
+        self.logits = Variable(torch.randn(4, 2, self.n_tags))
+        # Second sequence is padded after two tokens
+        self.mask = Variable(torch.LongTensor([[1, 1], [1, 1], [1, 0], [1, 0]]))
+        self.lengths = [4, 2]
+
+    def _score(self, i, tags):
+        """ Brute force score of `tags` for sequence `i`. """
+        logits = self.logits.data[:, i]
+        score = self.crf.start_transitions.data[tags[0]] + logits[0, tags[0]]
+        for t in range(1, len(tags)):
+            score += self.crf.transitions.data[tags[t - 1], tags[t]] + logits[t, tags[t]]
+        return float(score + self.crf.end_transitions.data[tags[-1]])
+
+    def _all_scores(self, i):
+        paths = itertools.product(range(self.n_tags), repeat=self.lengths[i])
+        return sorted([(self._score(i, list(tags)), list(tags)) for tags in paths], reverse=True)
+
+    def test_forward(self):
+        tags = Variable(torch.LongTensor([[0, 1], [2, 1], [1, 0], [0, 0]]))
+        log_likelihood = float(self.crf(self.logits, tags, self.mask))
+        expected = 0
+        for i in range(2):
+            log_partition = math.log(sum(math.exp(score) for score, _ in self._all_scores(i)))
+            gold = tags.data[:self.lengths[i], i].tolist()
+            expected += self._score(i, gold) - log_partition
+        self.assertAlmostEqual(log_likelihood, expected, places=4)
+
+    def test_viterbi_tags(self):
+        top_k = 4
+        decoded = self.crf.viterbi_tags(self.logits, self.mask, top_k=top_k)
+        self.assertEqual(len(decoded), 2)
+        for i in range(2):
+            expected = self._all_scores(i)[:top_k]
+            self.assertEqual(len(decoded[i]), top_k)
+            for (tags, score), (expected_score, expected_tags) in zip(decoded[i], expected):
+                self.assertEqual(tags, expected_tags)
+                self.assertAlmostEqual(score, expected_score, places=4)
+
+    def test_viterbi_tags_top_k_larger_than_paths(self):
+        logits = Variable(torch.randn(1, 1, self.n_tags))
+        mask = Variable(torch.LongTensor([[1]]))
+        decoded = self.crf.viterbi_tags(logits, mask, top_k=10)
+        self.assertEqual(len(decoded[0]), self.n_tags)
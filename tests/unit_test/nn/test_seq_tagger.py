@@ -0,0 +1,127 @@
+import os
+import unittest
+
+import torch
+from torch.autograd import Variable
+
+from lib.nn import SeqTagger
+from lib.nn.character_encoder import encode_characters
+from lib.nn.seq_tagger import ArchiveTextEncoder
+from lib.nn.seq_tagger import load_archive_vocabulary
+from lib.nn.seq_tagger import load_crf_tagger_state_dict
+
+ARCHIVE_VOCABULARY = os.path.join('pretrained_models',
+                                  'subject_recognition_grid_search_2.02_11_20:56:18', 'vocabulary')
+
+
+def _to_archive_state_dict(tagger):
+    """ `allennlp.models.CrfTagger` state dict of `tagger`. """
+    prefixes = [
+        ('encoder.embedding.', 'text_field_embedder.token_embedder_tokens.'),
+        ('encoder.rnn.', 'encoder._module.'),
+        ('character_encoder.embedding.',
+         'text_field_embedder.token_embedder_token_characters._embedding._module.'),
+        ('character_encoder.conv.',
+         'text_field_embedder.token_embedder_token_characters._encoder._module.conv_layer_0.'),
+        ('out.', 'tag_projection_layer._module.'),
+        ('crf.', 'crf.'),
+    ]
+    state_dict = {}
+    for key, value in tagger.state_dict().items():
+        prefix, new_prefix = next(p for p in prefixes if key.startswith(p[0]))
+        state_dict[new_prefix + key[len(prefix):]] = value
+    return state_dict
+
+
+class TestSeqTagger(unittest.TestCase):
+
+    def setUp(self):
+        self.vocab_size = 10
+        self.n_tags = 2
+        self.tokens = Variable(torch.LongTensor([[1, 2], [3, 4], [5, 0]]))
+        self.tags = Variable(torch.LongTensor([[0, 1], [1, 1], [0, 0]]))
+        self.mask = Variable(torch.LongTensor([[1, 1], [1, 1], [1, 0]]))
+
+    def _tagger(self, **kwargs):
+        return SeqTagger(self.vocab_size, self.n_tags, embedding_size=4, rnn_size=4, **kwargs)
+
+    def test_forward(self):
+        tagger = self._tagger()
+        loss = tagger(self.tokens, self.tags, self.mask)
+        loss.backward()
+        self.assertTrue(float(loss) > 0)
+
+    def test_decode(self):
+        tagger = self._tagger()
+        tagger.train(mode=False)
+        decoded = tagger.decode(self.tokens, self.mask, top_k=2)
+        self.assertEqual([len(paths[0][0]) for paths in decoded], [3, 2])
+
+    def test_load_crf_tagger_state_dict(self):
+        source = self._tagger(rnn_cell='lstm')
+        target = self._tagger(rnn_cell='lstm')
+        load_crf_tagger_state_dict(target, _to_archive_state_dict(source))
+        self.assertTrue(torch.equal(source.crf.transitions.data, target.crf.transitions.data))
+        self.assertTrue(torch.equal(source.out.weight.data, target.out.weight.data))
+
+    def test_load_crf_tagger_state_dict_characters(self):
+        kwargs = {'n_characters': 8, 'character_embedding_size': 3, 'n_character_filters': 6}
+        source = self._tagger(rnn_cell='lstm', **kwargs)
+        target = self._tagger(rnn_cell='lstm', **kwargs)
+        load_crf_tagger_state_dict(target, _to_archive_state_dict(source))
+        self.assertTrue(
+            torch.equal(source.character_encoder.conv.weight.data,
+                        target.character_encoder.conv.weight.data))
+
+        source.train(mode=False)
+        target.train(mode=False)
+        characters = Variable(encode_characters([['ab', 'c', 'd'], ['e', 'fgh']], {
+            'a': 2,
+            'b': 3
+        }))
+        self.assertEqual(
+            source.decode(self.tokens, self.mask, characters=characters),
+            target.decode(self.tokens, self.mask, characters=characters))
+
+    def test_load_crf_tagger_state_dict_missing(self):
+        # The archive has no character encoder
+        state_dict = _to_archive_state_dict(self._tagger())
+        with self.assertRaises(ValueError):
+            load_crf_tagger_state_dict(self._tagger(n_characters=8), state_dict)
+
+    def test_load_crf_tagger_state_dict_unsupported(self):
+        state_dict = {'text_field_embedder.token_embedder_token_characters.weight': None}
+        with self.assertRaises(ValueError):
+            load_crf_tagger_state_dict(self._tagger(), state_dict)
+
+    def test_load_crf_tagger_state_dict_size(self):
+        state_dict = {'crf.transitions': torch.zeros(3, 3)}
+        with self.assertRaises(ValueError):
+            load_crf_tagger_state_dict(self._tagger(), state_dict)
+
+    def test_characters_required(self):
+        with self.assertRaises(ValueError):
+            self._tagger(n_characters=8).decode(self.tokens, self.mask)
+
+    def test_encode_characters(self):
+        characters = encode_characters([['ab'], ['c', 'z']], {'a': 2, 'b': 3, 'c': 4})
+        self.assertEqual(tuple(characters.size()), (2, 2, 6))
+        self.assertEqual(characters[0, 0].tolist(), [2, 3, 0, 0, 0, 0])
+        self.assertEqual(characters[1, 1].tolist(), [1, 0, 0, 0, 0, 0])
+        self.assertEqual(characters[1, 0].tolist(), [0, 0, 0, 0, 0, 0])
+
+    def test_load_archive_vocabulary(self):
+        characters = load_archive_vocabulary(
+            os.path.join(ARCHIVE_VOCABULARY, 'token_characters.txt'))
+        self.assertEqual(characters['@@UNKNOWN@@'], 1)
+        self.assertNotIn(0, characters.values())
+        labels = load_archive_vocabulary(
+            os.path.join(ARCHIVE_VOCABULARY, 'labels.txt'), is_padded=False)
+        self.assertEqual(labels, {'O': 0, 'I': 1})
+
+    def test_archive_text_encoder(self):
+        tokens = load_archive_vocabulary(os.path.join(ARCHIVE_VOCABULARY, 'tokens.txt'))
+        text_encoder = ArchiveTextEncoder(tokens, lowercase_tokens=True)
+        self.assertEqual(text_encoder.vocab_size, len(tokens) + 1)
+        self.assertEqual(
+            text_encoder.encode('What is zzzunknownzzz').tolist(), [tokens['what'], tokens['is'], 1])
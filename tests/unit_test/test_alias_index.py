@@ -0,0 +1,62 @@
+import math
+import unittest
+
+from lib.alias_index import AliasIndex
+from lib.alias_index import generate_ngram_candidates
+from lib.alias_index import question_ngrams
+
+
+class TestAliasIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.alias_index = AliasIndex([
+            ('01', 'u.s. route 2'),
+            ('02', 'route 2'),
+            ('03', 'route 2'),
+            ('04', 'cities'),
+            ('05', ''),
+        ])
+        self.row = {
+            'predicted_question_tokens':
+                ['what', 'major', 'cities', 'does', 'u.s.', 'route', '2', 'run', 'through', '?'],
+            'predicted_subject_names': [{
+                'name': 'route 2',
+                'score': 10.0,
+                'start_index': 5,
+                'end_index': 7
+            }, {
+                'name': 'cities',
+                'score': 5.0,
+                'start_index': 2,
+                'end_index': 3
+            }]
+        }
+
+    def test_question_ngrams(self):
+        self.assertEqual(
+            question_ngrams(['a', 'b', 'c']), [(0, 1), (0, 2), (0, 3), (1, 2), (1, 3), (2, 3)])
+        self.assertEqual(question_ngrams(['a', 'b', 'c'], max_n_tokens=1), [(0, 1), (1, 2), (2, 3)])
+
+    def test_lookup(self):
+        self.assertEqual(len(self.alias_index), 3)
+        self.assertEqual(self.alias_index.max_n_tokens, 3)
+        self.assertEqual(
+            self.alias_index.lookup(['route 2', 'missing']), {'route 2': ['02', '03']})
+
+    def test_generate_ngram_candidates_longest(self):
+        row = generate_ngram_candidates(self.alias_index, self.row)
+        self.assertEqual(row['candidate_mids'], ['01'])
+        self.assertEqual(row['predicted_start_index'], 4)
+        self.assertEqual(row['predicted_end_index'], 7)
+        self.assertEqual(row['predicted_subject_name'], 'u.s. route 2')
+
+    def test_generate_ngram_candidates_span_score(self):
+        alias_index = AliasIndex([('04', 'cities'), ('06', 'run')])
+        row = generate_ngram_candidates(alias_index, self.row)
+        self.assertEqual(row['candidate_mids'], ['04'])
+        self.assertEqual(row['predicted_start_index'], 2)
+
+    def test_generate_ngram_candidates_none(self):
+        row = generate_ngram_candidates(AliasIndex([('07', 'missing')]), self.row)
+        self.assertEqual(row['candidate_mids'], [])
+        self.assertTrue(math.isnan(row['predicted_start_index']))
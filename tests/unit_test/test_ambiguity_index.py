@@ -0,0 +1,97 @@
+import random
+import tempfile
+import unittest
+
+from lib.ambiguity_index import AmbiguityIndex
+from lib.ambiguity_index import get_predicate_to_relation
+from lib.ambiguity_index import get_upper_bound
+
+ALIASES = [('a', 'star'), ('b', 'star'), ('c', 'sasha vujacic')]
+FACTS = [
+    ('a', 'music/single/versions', 'x'),
+    ('a', 'music/single/versions', 'y'),
+    ('b', 'music/single/versions', 'z'),
+    ('b', 'film/film/genre', 'w'),
+    ('c', 'people/person/place_of_birth', 'v'),
+    ('c', 'people/person/nationality', 'u'),
+]
+
+
+class TestAmbiguityIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = AmbiguityIndex.from_facts(ALIASES, FACTS)
+
+    def test_get_mids(self):
+        self.assertEqual(
+            self.index.get_mids([('star', 'music/single/versions'), ('star', 'missing'),
+                                 ('missing', 'film/film/genre')]), [{
+                                     'a': 2,
+                                     'b': 1
+                                 }, {}, {}])
+        self.assertEqual(self.index.get_relations(['sasha vujacic'])[0], {
+            'people/person/place_of_birth': {
+                'c': 1
+            },
+            'people/person/nationality': {
+                'c': 1
+            }
+        })
+
+    def test_normalize(self):
+        index = AmbiguityIndex.from_facts([('c', ' Sasha Vujacic')], FACTS)
+        self.assertEqual(
+            index.get_mids([('SASHA VUJACIC', 'people/person/nationality')]), [{
+                'c': 1
+            }])
+        self.assertEqual(index.get_relations(['sasha vujacic']), index.get_relations(['Sasha Vujacic']))
+
+    def test_get_upper_bound(self):
+        predicate_to_relation = get_predicate_to_relation(
+            ['what s a version of <e>', 'where was <e> born', 'where was <e> born'],
+            ['music/single/versions', 'people/person/place_of_birth', 'people/person/nationality'])
+        rows = [{
+            'subject_name': 'Star',
+            'predicate': 'what s a version of <e>',
+            'relation': 'music/single/versions',
+            'subject': 'b'
+        }, {
+            'subject_name': 'sasha vujacic',
+            'predicate': 'where was <e> born',
+            'relation': 'people/person/place_of_birth',
+            'subject': 'c'
+        }, {
+            'subject_name': None,
+            'predicate': None,
+            'relation': 'film/film/genre',
+            'subject': 'b'
+        }]
+        interpretations, metrics = get_upper_bound(self.index, rows, predicate_to_relation,
+                                                   random.Random(123))
+        self.assertEqual(interpretations[0], [('music/single/versions', 'a'),
+                                              ('music/single/versions', 'b')])
+        self.assertEqual(interpretations[2], [])
+        self.assertEqual(len(interpretations[1]), 2)
+        self.assertEqual(metrics['skipped'], 1)
+        self.assertEqual(metrics['multiple_subjects'], 1)
+        self.assertEqual(metrics['multiple_relations'], 1)
+        # `a` has the most objects; therefore, the first question is answered incorrectly
+        self.assertEqual(metrics.get('answerable', 0), 0)
+        self.assertLessEqual(metrics['subject_and_relation_correct'], 1)
+
+    def test_load_or_build(self):
+        with tempfile.TemporaryDirectory() as directory:
+            AmbiguityIndex.load_or_build(directory, 'fb_two_kg', lambda: self.index)
+            index = AmbiguityIndex.load_or_build(directory, 'fb_two_kg', None)
+        self.assertEqual(len(index), 2)
+
+    def test_load_or_build_stale_version(self):
+        with tempfile.TemporaryDirectory() as directory:
+            stale = AmbiguityIndex.from_facts(ALIASES, FACTS)
+            del stale.version
+            stale.save(AmbiguityIndex.get_path(directory, 'fb_two_kg'))
+            index = AmbiguityIndex.load_or_build(directory, 'fb_two_kg', lambda: self.index)
+            self.assertEqual(index.version, AmbiguityIndex.VERSION)
+            self.assertEqual(
+                AmbiguityIndex.load_or_build(directory, 'fb_two_kg', None).version,
+                AmbiguityIndex.VERSION)
@@ -0,0 +1,40 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from lib.artifacts import read_artifact
+from lib.artifacts import write_artifact
+
+
+class TestArtifacts(unittest.TestCase):
+
+    def setUp(self):
+        self.df = pd.DataFrame({
+            'question': ['where was sasha vujacic born', 'what is a release'],
+            'subject_name': ['sasha vujacic', None],
+            'candidate_mids': [['0f2y0', '01g4wmh'], []],
+            'candidate_mid_ids': [np.array([1, 2]), np.array([], dtype=np.int64)],
+            'predicted_start_index': [2, 0],
+        }, index=[7, 3])
+
+    def test_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'step_2_generate_candidates.arrow')
+            write_artifact(self.df, path)
+            df = read_artifact(path)
+        self.assertEqual(list(df.index), [7, 3])
+        self.assertEqual(df['candidate_mids'].tolist(), [['0f2y0', '01g4wmh'], []])
+        self.assertFalse(isinstance(df['subject_name'][3], str))
+        self.assertEqual(df['candidate_mid_ids'][7].tolist(), [1, 2])
+        self.assertEqual(df['predicted_start_index'].tolist(), [2, 0])
+
+    def test_projection(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'step_2_generate_candidates.arrow')
+            write_artifact(self.df, path)
+            df = read_artifact(path, columns=['candidate_mids', 'question'])
+        self.assertEqual(list(df.columns), ['candidate_mids', 'question'])
+        self.assertEqual(list(df.index), [7, 3])
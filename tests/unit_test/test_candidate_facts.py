@@ -0,0 +1,82 @@
+import unittest
+
+import numpy as np
+
+from lib.candidate_facts import CandidateFacts
+from lib.candidate_facts import segment_argmax
+from lib.codec import encode_mids
+from lib.codec import RelationVocabulary
+
+CANDIDATE_FACTS = [
+    {
+        'people/person/place_of_birth': {
+            '0f2y0': set(['06q1r'])
+        },
+        'people/person/nationality': {
+            '0f2y0': set(['09c7w0']),
+            '01g4wmh': set(['09c7w0', '0d060g'])
+        }
+    },
+    {},
+    None,
+    {
+        'film/film/genre': {
+            '02lx2r': set(['05zppz'])
+        }
+    },
+]
+
+
+class TestCandidateFacts(unittest.TestCase):
+
+    def setUp(self):
+        self.vocabulary = RelationVocabulary(
+            ['people/person/place_of_birth', 'people/person/nationality', 'film/film/genre'])
+        self.candidate_facts = CandidateFacts.from_dicts(CANDIDATE_FACTS, self.vocabulary)
+
+    def test_segment_argmax(self):
+        offsets = np.array([0, 3, 3, 5])
+        values = np.array([1.0, 2.0, 2.0, 0.0, -1.0])
+        self.assertEqual(segment_argmax(values, offsets).tolist(), [1, -1, 3])
+        random_state = np.random.RandomState(123)
+        selected = set(segment_argmax(values, offsets, random_state)[0] for _ in range(50))
+        self.assertEqual(selected, set([1, 2]))
+        self.assertEqual(segment_argmax(np.zeros(0), np.array([0, 0])).tolist(), [-1])
+
+    def test_from_dicts(self):
+        self.assertEqual(len(self.candidate_facts), 4)
+        self.assertEqual(self.candidate_facts.get_n_relations().tolist(), [2, 0, 0, 1])
+        self.assertEqual(self.candidate_facts.get_relation_n_objects().tolist(), [1, 3, 1])
+        with self.assertRaises(ValueError):
+            self.candidate_facts.flatten([[0.5], None, None, [1.0]])
+
+    def test_predict_and_evaluate(self):
+        scores = self.candidate_facts.flatten([[0.4, 0.6], None, None, [1.0]])
+        predicted = self.candidate_facts.predict(scores, np.random.RandomState(123))
+        self.assertEqual(predicted[0].tolist(), [1, -1, -1, 2])
+        # `01g4wmh` has the most objects for `people/person/nationality`
+        self.assertEqual(predicted[1].tolist(), [2, -1, -1, 3])
+
+        relation_ids = self.vocabulary.encode(['people/person/nationality', 'film/film/genre',
+                                               'film/film/genre', 'film/film/genre'])
+        subject_ids = encode_mids(['01g4wmh', '0f2y0', '0f2y0', '02lx2r'])
+        object_ids = encode_mids(['0d060g', '06q1r', '06q1r', '09c7w0'])
+        metrics = self.candidate_facts.evaluate(predicted, relation_ids, subject_ids, object_ids)
+        self.assertEqual(metrics['relation'].tolist(), [True, False, False, True])
+        self.assertEqual(metrics['subject_and_relation'].tolist(), [True, False, False, True])
+        self.assertEqual(metrics['object'].tolist(), [True, False, False, False])
+
+        self.assertEqual(
+            self.candidate_facts.to_tuples(predicted, self.vocabulary)[:2],
+            [('people/person/nationality', '01g4wmh', set(['09c7w0', '0d060g'])),
+             (None, None, None)])
+
+    def test_get_candidate_recall(self):
+        relation_ids = self.vocabulary.encode(['people/person/nationality', 'film/film/genre',
+                                               'film/film/genre', 'film/film/genre'])
+        subject_ids = encode_mids(['0f2y0', '0f2y0', '0f2y0', '02lx2r'])
+        object_ids = encode_mids(['0d060g', '06q1r', '06q1r', '05zppz'])
+        recall = self.candidate_facts.get_candidate_recall(relation_ids, subject_ids, object_ids)
+        self.assertEqual(recall['relation'].tolist(), [True, False, False, True])
+        self.assertEqual(recall['subject'].tolist(), [True, False, False, True])
+        self.assertEqual(recall['object'].tolist(), [False, False, False, True])
@@ -0,0 +1,40 @@
+import unittest
+
+from lib.candidate_pruning import get_pruning_tradeoff
+from lib.candidate_pruning import prune_candidate_mids
+from lib.relation_statistics import RelationStatistics
+
+FACTS = [
+    ('a', 'people/person/nationality', 'x'),
+    ('a', 'people/person/place_of_birth', 'y'),
+    ('b', 'people/person/place_of_birth', 'a'),
+    ('c', 'music/album/release_type', 'w'),
+    ('d', 'music/album/release_type', 'w'),
+]
+
+
+class TestCandidatePruning(unittest.TestCase):
+
+    def setUp(self):
+        self.statistics = RelationStatistics.from_facts(FACTS, [])
+
+    def test_prune_candidate_mids(self):
+        self.assertEqual(self.statistics.object_counts['a'], 1)
+        # `a` has two facts and an in-degree of one; `c`, `d` and `b` tie with one fact
+        self.assertEqual(prune_candidate_mids(self.statistics, ['c', 'd', 'a', 'b'], 3),
+                         ['a', 'c', 'd'])
+        self.assertEqual(prune_candidate_mids(self.statistics, ['c', 'a'], None), ['c', 'a'])
+        self.assertEqual(prune_candidate_mids(self.statistics, [], 1), [])
+
+    def test_get_pruning_tradeoff(self):
+        tradeoff = get_pruning_tradeoff(self.statistics, [['a', 'b'], ['c', 'missing']],
+                                        ['b', 'c'], [1, None])
+        self.assertEqual(tradeoff[0], {
+            'Top N': 1,
+            'Recall': 0.5,
+            'Rows Fetched': 3,
+            'Fraction of Rows': 3 / 4
+        })
+        self.assertEqual(tradeoff[1]['Top N'], 'All')
+        self.assertEqual(tradeoff[1]['Recall'], 1.0)
+        self.assertEqual(tradeoff[1]['Rows Fetched'], 4)
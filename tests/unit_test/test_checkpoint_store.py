@@ -0,0 +1,34 @@
+import os
+import tempfile
+import unittest
+
+from lib.checkpoint_store import CheckpointStore
+
+
+class TestCheckpointStore(unittest.TestCase):
+
+    def test_lru(self):
+        with tempfile.TemporaryDirectory() as directory:
+            store = CheckpointStore(directory, max_in_memory=2)
+            for i in range(3):
+                store.put('0.%d' % i, {'epoch': i})
+            self.assertEqual(list(store._in_memory.keys()), ['0.1', '0.2'])
+            # Evicted checkpoints are loaded from disk
+            self.assertEqual(store.get('0.0'), {'epoch': 0})
+            self.assertEqual(list(store._in_memory.keys()), ['0.2', '0.0'])
+            self.assertEqual(len(os.listdir(directory)), 3)
+
+    def test_delete(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'model.pt')
+            with open(path, 'w') as file_:
+                file_.write('model')
+            store = CheckpointStore(os.path.join(directory, 'store'), delete_paths=True)
+            store.put('a/b', path)
+            self.assertIn('a/b', store)
+            store.delete('a/b')
+            store.delete('missing')
+            self.assertNotIn('a/b', store)
+            self.assertFalse(os.path.isfile(path))
+            with self.assertRaises(KeyError):
+                store.get('a/b')
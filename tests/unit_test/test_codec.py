@@ -0,0 +1,41 @@
+import unittest
+
+import numpy as np
+
+from lib.codec import decode_mid
+from lib.codec import decode_mids
+from lib.codec import encode_mid
+from lib.codec import encode_mids
+from lib.codec import RelationVocabulary
+
+
+class TestCodec(unittest.TestCase):
+
+    def test_mids(self):
+        mids = ['01g4wmh', '0f2y0', '0', '_', 'zzzzzzzzzzzz', '06q1r']
+        mid_ids = encode_mids(mids)
+        self.assertEqual(mid_ids.dtype, np.int64)
+        self.assertEqual(len(set(mid_ids)), len(mids))
+        self.assertEqual(decode_mids(mid_ids), mids)
+        self.assertEqual(encode_mid('0f2y0'), 1 << 25 | 0 << 20 | 13 << 15 | 2 << 10 | 29 << 5)
+        self.assertEqual(encode_mid('www.freebase.com/m/0f2y0'), encode_mid('m.0f2y0'))
+        self.assertNotEqual(encode_mid('00'), encode_mid('0'))
+        self.assertEqual(decode_mid(encode_mid('00')), '00')
+        self.assertEqual(encode_mids([]).shape, (0,))
+
+    def test_invalid_mids(self):
+        with self.assertRaises(ValueError):
+            encode_mid('0a')
+        with self.assertRaises(ValueError):
+            encode_mid('')
+        with self.assertRaises(ValueError):
+            encode_mid('0' * 13)
+
+    def test_relation_vocabulary(self):
+        vocabulary = RelationVocabulary(
+            ['people/person/place_of_birth', 'film/film/genre', 'film/film/genre'])
+        self.assertEqual(len(vocabulary), 2)
+        relation_ids = vocabulary.encode(['people/person/place_of_birth', 'missing'])
+        self.assertEqual(relation_ids.dtype, np.int32)
+        self.assertEqual(relation_ids.tolist(), [1, 2])
+        self.assertEqual(vocabulary.decode(relation_ids), ['people/person/place_of_birth', None])
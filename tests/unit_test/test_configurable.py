@@ -1,10 +1,14 @@
+import gc
 import unittest
 import numpy as np
 
 from lib.configurable import _dict_to_flat_config
+from lib.configurable import _function_info
 from lib.configurable import add_config
 from lib.configurable import clear_config
+from lib.configurable import clear_profile
 from lib.configurable import configurable
+from lib.configurable import get_profile_report
 from lib.configurable import HyperparameterSpaceConfig
 from lib.configurable import log_config
 
@@ -64,6 +68,7 @@ class TestConfigurable(unittest.TestCase):
 
     def tearDown(self):
         clear_config()
+        clear_profile()
 
     def test_dict_to_flat_config(self):
         dict_ = {
@@ -130,6 +135,58 @@ class TestConfigurable(unittest.TestCase):
         clear_config()
         self.assertNotEqual(self.defaults['mock_func'], mock_func()[1])
 
+    def test_mock_func_config_changes(self):
+        # Defaults resolved by a past call are not reused after the configuration changes
+        add_config({__name__: self.defaults})
+        self.assertEqual(('arg', 'kwarg'), mock_func_2())
+        add_config({__name__: {'mock_func_2.kwarg': 'kwarg_new'}})
+        self.assertEqual(('arg', 'kwarg_new'), mock_func_2())
+        clear_config()
+        self.assertEqual(('arg', None), mock_func_2('arg'))
+
+    def test_profiling(self):
+        mock_func_2('arg')
+        self.assertNotIn('mock_func_2', get_profile_report())
+
+        add_config({
+            __name__: self.defaults,
+            'lib.configurable.get_profiling_config': {
+                'enabled': True,
+                'cprofile': True
+            }
+        })
+        for _ in range(3):
+            mock_func_2()
+        MockClass().mock_func()
+        report = get_profile_report()
+        lines = [line for line in report.split('\n') if line.endswith(__name__ + '.mock_func_2')]
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(lines[0].split()[0], '3')  # Number of calls
+        self.assertIn(__name__ + '.MockClass.__init__', report)
+        self.assertIn('cProfile of %s.mock_func_2:' % __name__, report)
+
+        # Profiling stops once disabled
+        clear_config()
+        mock_func_2('arg')
+        self.assertEqual(report, get_profile_report())
+
+    def test_mock_class_init_cache(self):
+        # The cache is shared by every instance and does not keep instances alive
+        add_config({__name__: self.defaults})
+        instances = [MockClass() for _ in range(5)]
+        self.assertEqual([i.arg for i in instances], ['arg'] * 5)
+        keys = [k for k in _function_info if k[0].__qualname__ == 'MockClass.__init__']
+        self.assertEqual(len(keys), 1)
+        del instances
+        gc.collect()
+        self.assertFalse(any(isinstance(o, MockClass) for o in gc.get_objects()))
+
+        # Positional arguments of a method are mapped after `self`
+        self.assertEqual(MockClass('other_arg').arg, 'other_arg')
+        instance = MockClass('arg')
+        MockClass.__init__(instance, 'unbound_arg')
+        self.assertEqual(instance.arg, 'unbound_arg')
+
     def test_mock_func_var_args(self):
         add_config({__name__: self.defaults})
         self.assertEqual(mock_func('arg')[0][0], 'arg')
@@ -0,0 +1,188 @@
+import asyncio
+import os
+import tempfile
+import threading
+import unittest
+
+import psycopg2
+
+from lib.database import ConnectionPool
+from lib.database import Database
+from lib.database import iterate_query
+from lib.knowledge_graph import DatabaseKnowledgeGraph
+from lib.utils import get_credentials
+
+
+class MockCursor(object):
+
+    def __init__(self, connection, name=None):
+        self.connection = connection
+        self.name = name
+        self.itersize = 2000
+
+    def execute(self, sql, args=None):
+        if self.connection.fail:
+            raise psycopg2.OperationalError('Connection lost')
+        self.connection.executed.append((sql, args))
+
+    def fetchall(self):
+        return self.connection.rows
+
+    def __iter__(self):
+        if self.name is not None and self.connection.autocommit:
+            raise psycopg2.ProgrammingError("can't use a named cursor outside of transactions")
+        return iter(self.connection.rows)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class MockConnection(object):
+
+    def __init__(self, rows=None):
+        self.rows = [] if rows is None else rows
+        self.executed = []
+        self.cursors = []
+        self.autocommit = False
+        self.closed = 0
+        self.fail = False
+
+    def cursor(self, name=None):
+        self.cursors.append(MockCursor(self, name))
+        return self.cursors[-1]
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+
+class TestDatabase(unittest.TestCase):
+
+    def setUp(self):
+        self.connections = []
+
+        def connection_factory():
+            connection = MockConnection([('0f2y0', 'people/person/nationality', '06q1r')])
+            self.connections.append(connection)
+            return connection
+
+        self.pool = ConnectionPool(max_connections=2, connection_factory=connection_factory)
+
+    def test_get_credentials(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, '.pass')
+            with open(path, 'w') as file_:
+                file_.write('DB_NAME=simple_qa\nDB_PORT=5432\nDB_USER=user\nDB_HOST=localhost\n'
+                            'DB_PASS=password\n\n')
+            credentials = get_credentials(path)
+        self.assertEqual(credentials['dbname'], 'simple_qa')
+        self.assertEqual(credentials['password'], 'password')
+
+        # The cached credentials are not shared with the caller
+        credentials['dbname'] = 'other'
+        self.assertEqual(get_credentials(path)['dbname'], 'simple_qa')
+
+    def test_prepared_once_per_connection(self):
+        database = Database(self.pool)
+        database.query('mid_to_alias', '0f2y0')
+        database.query('mid_to_alias', '06q1r')
+        self.assertEqual(len(self.connections), 1)
+        self.assertTrue(self.connections[0].autocommit)
+        executed = self.connections[0].executed
+        self.assertEqual(executed[0][0],
+                         'PREPARE mid_to_alias (text) AS SELECT alias FROM fb_two_subject_name '
+                         'WHERE mid = $1')
+        self.assertEqual(executed[1:], [('EXECUTE mid_to_alias (%s)', ('0f2y0',)),
+                                        ('EXECUTE mid_to_alias (%s)', ('06q1r',))])
+        self.assertEqual(database.get_stats()['mid_to_alias']['count'], 2)
+
+    def test_get_candidate_facts(self):
+        knowledge_graph = DatabaseKnowledgeGraph(Database(self.pool))
+        self.assertEqual(
+            knowledge_graph.get_candidate_facts(['0f2y0']),
+            {'people/person/nationality': {'0f2y0': set(['06q1r'])}})
+        self.assertEqual(self.connections[0].executed[-1],
+                         ('EXECUTE candidate_facts (%s)', (['0f2y0'],)))
+
+    def test_query_async(self):
+        database = Database(self.pool)
+        loop = asyncio.new_event_loop()
+        try:
+            rows = loop.run_until_complete(database.query_async('alias_to_mid', 'sasha'))
+        finally:
+            loop.close()
+        self.assertEqual(len(rows), 1)
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            Database(self.pool).query('alias_to_mid')
+
+    def test_discard_on_error(self):
+        database = Database(self.pool)
+        database.query('alias_to_mid', 'sasha')
+        self.connections[0].fail = True
+        with self.assertRaises(psycopg2.OperationalError):
+            database.query('alias_to_mid', 'sasha')
+        self.assertTrue(self.connections[0].closed)
+        database.query('alias_to_mid', 'sasha')
+        self.assertEqual(len(self.connections), 2)
+        self.assertEqual(self.connections[1].executed[0][0][:7], 'PREPARE')
+
+    def test_max_connections(self):
+        first = self.pool.get()
+        second = self.pool.get()
+        borrowed = []
+        thread = threading.Thread(target=lambda: borrowed.append(self.pool.get()))
+        thread.start()
+        thread.join(0.05)
+        self.assertEqual(borrowed, [])
+        self.pool.put(first)
+        thread.join()
+        self.assertEqual(borrowed, [first])
+        self.pool.put(second)
+        self.pool.put(borrowed[0])
+        self.pool.close()
+        self.assertTrue(all(connection.closed for connection in self.connections))
+
+    def test_fork(self):
+        self.pool.put(self.pool.get())
+        self.pool._pid = -1  # Pretend the pool was created in another process
+        connection = self.pool.get()
+        self.assertEqual(len(self.connections), 2)
+        self.assertIs(connection, self.connections[1])
+        self.assertFalse(self.connections[0].closed)
+
+    def test_iterate_query(self):
+        connection = MockConnection([(1,), (2,), (3,)])
+        connection.autocommit = True
+        self.assertEqual(list(iterate_query(connection, 'SELECT', itersize=2)), [(1,), (2,), (3,)])
+        self.assertEqual(connection.cursors[0].itersize, 2)
+        self.assertIsNotNone(connection.cursors[0].name)
+        self.assertTrue(connection.autocommit)
+
+    def test_iterate_close(self):
+        database = Database(self.pool)
+        rows = database.iterate('SELECT mid FROM fb_two_kg')
+        self.assertEqual(next(rows), ('0f2y0', 'people/person/nationality', '06q1r'))
+        self.assertEqual(self.pool._idle, [])
+        rows.close()
+        self.assertEqual(self.pool._idle, self.connections)
+
+    def test_get_objects(self):
+        knowledge_graph = DatabaseKnowledgeGraph(Database(self.pool))
+        self.assertEqual(
+            knowledge_graph.get_objects([('0f2y0', 'people/person/nationality')]),
+            {('0f2y0', 'people/person/nationality'): set(['06q1r'])})
+        self.assertEqual(self.connections[0].executed[-1],
+                         ('EXECUTE objects (%s, %s)', (['0f2y0'], ['people/person/nationality'])))
@@ -0,0 +1,45 @@
+import os
+import tempfile
+
+import numpy as np
+import pytest
+
+from lib.journal import Journal
+
+
+def test_journal_reload():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'journal.jsonl')
+        journal = Journal(path)
+        journal.record_trial('0.1', 0, 3.0, 0.5, 'checkpoint.pt', {'integer': np.int64(3)})
+        journal.record_rung('0.', 0, ['0.1'])
+        assert journal.n_records == 2
+
+        journal = Journal(path)
+        assert journal.n_records == 2
+        record = journal.get_trial('0.1', 0)
+        assert record['score'] == 0.5
+        assert record['checkpoint'] == 'checkpoint.pt'
+        assert record['hyperparameters'] == {'integer': 3}
+        assert journal.get_trial('0.1', 1) is None
+        assert journal.get_rung('0.', 0) == ['0.1']
+        assert journal.get_rung('0.', 1) is None
+
+
+def test_journal_partial_record():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'journal.jsonl')
+        Journal(path).record_trial('0', 0, 3.0, 0.5, None, {})
+        with open(path, 'a') as file_:
+            file_.write('{"type": "tri')
+
+        journal = Journal(path)
+        assert journal.n_records == 1
+        assert journal.get_trial('0', 0)['checkpoint'] is None
+
+
+def test_journal_checkpoint_error():
+    with tempfile.TemporaryDirectory() as directory:
+        journal = Journal(os.path.join(directory, 'journal.jsonl'))
+        with pytest.raises(ValueError):
+            journal.record_trial('0', 0, 3.0, 0.5, {'state': 1}, {})
@@ -0,0 +1,44 @@
+import os
+import tempfile
+import unittest
+
+from lib.knowledge_graph import InMemoryKnowledgeGraph
+
+
+class TestKnowledgeGraph(unittest.TestCase):
+
+    def test_from_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'kg.txt')
+            with open(path, 'w') as file_:
+                file_.write('www.freebase.com/m/01g4wmh\twww.freebase.com/music/album/'
+                            'release_type\twww.freebase.com/m/02lx2r www.freebase.com/m/01\n')
+                file_.write('www.freebase.com/m/02\twww.freebase.com/people/person/gender'
+                            '\twww.freebase.com/m/05zppz\n')
+            knowledge_graph = InMemoryKnowledgeGraph.from_file(path)
+
+        self.assertEqual(
+            knowledge_graph.get_candidate_facts(['01g4wmh', 'missing']),
+            {'music/album/release_type': {'01g4wmh': set(['02lx2r', '01'])}})
+        self.assertEqual(knowledge_graph.get_candidate_facts([]), {})
+
+    def test_relation_first(self):
+        knowledge_graph = InMemoryKnowledgeGraph([
+            ('a', 'people/person/nationality', 'x'),
+            ('a', 'people/person/nationality', 'y'),
+            ('a', 'people/person/place_of_birth', 'z'),
+            ('b', 'people/person/nationality', 'x'),
+        ])
+        self.assertEqual(
+            knowledge_graph.get_candidate_relations(['a', 'b']), {
+                'people/person/nationality': {
+                    'a': 2,
+                    'b': 1
+                },
+                'people/person/place_of_birth': {
+                    'a': 1
+                }
+            })
+        self.assertEqual(
+            knowledge_graph.get_objects([('a', 'people/person/nationality')]),
+            {('a', 'people/person/nationality'): set(['x', 'y'])})
@@ -0,0 +1,86 @@
+import itertools
+import multiprocessing
+import random
+import threading
+import time
+import unittest
+
+from lib.pipeline import Pipeline
+from lib.pipeline import PipelineError
+from lib.pipeline import Stage
+
+
+def square(x):
+    return x * x
+
+
+def sleepy_increment(x):
+    time.sleep(random.random() * 0.001)
+    return x + 1
+
+
+def batch_negate(batch):
+    return [-x for x in batch]
+
+
+def fail_on_three(x):
+    if x == 3:
+        raise ValueError('Three')
+    return x
+
+
+class TestPipeline(unittest.TestCase):
+
+    def test_order(self):
+        pipeline = Pipeline([Stage(sleepy_increment, n_workers=4), Stage(square, n_workers=2)])
+        self.assertEqual(list(pipeline(range(100))), [(x + 1)**2 for x in range(100)])
+
+    def test_batch(self):
+        pipeline = Pipeline([Stage(batch_negate, batch_size=8)], max_queue_size=4)
+        self.assertEqual(list(pipeline(range(50))), [-x for x in range(50)])
+
+    def test_processes(self):
+        pipeline = Pipeline([Stage(square, n_workers=2, processes=True), Stage(sleepy_increment)])
+        self.assertEqual(list(pipeline(iter(range(20)))), [x * x + 1 for x in range(20)])
+
+    def test_empty(self):
+        self.assertEqual(list(Pipeline([Stage(square)])([])), [])
+
+    def test_failure(self):
+        pipeline = Pipeline([Stage(fail_on_three, n_workers=2), Stage(square)])
+        with self.assertRaises(PipelineError):
+            list(pipeline(range(10)))
+
+    def test_batch_failure(self):
+        pipeline = Pipeline([Stage(lambda batch: batch[:1], batch_size=4)])
+        with self.assertRaises(PipelineError):
+            list(pipeline(range(10)))
+
+    def test_close_early(self):
+        n_threads = threading.active_count()
+        pipeline = Pipeline(
+            [Stage(sleepy_increment, n_workers=4),
+             Stage(square, n_workers=2, processes=True)],
+            max_queue_size=2)
+        outputs = pipeline(itertools.count())
+        self.assertEqual([next(outputs) for _ in range(5)], [(x + 1)**2 for x in range(5)])
+        outputs.close()
+        self.assertEqual(threading.active_count(), n_threads)
+        self.assertEqual(multiprocessing.active_children(), [])
+
+    def test_failure_teardown(self):
+        n_threads = threading.active_count()
+        pipeline = Pipeline(
+            [Stage(fail_on_three, n_workers=2, processes=True),
+             Stage(square, n_workers=2)],
+            max_queue_size=1)
+        with self.assertRaises(PipelineError):
+            list(pipeline(range(1000)))
+        self.assertEqual(threading.active_count(), n_threads)
+        self.assertEqual(multiprocessing.active_children(), [])
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            Pipeline([])
+        with self.assertRaises(ValueError):
+            Stage(square, n_workers=0)
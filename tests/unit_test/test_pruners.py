@@ -0,0 +1,61 @@
+import pytest
+
+from lib.pruners import MedianPruner
+from lib.pruners import PercentilePruner
+from lib.pruners import Reporter
+
+
+def test_median_pruner():
+    pruner = MedianPruner(n_startup_trials=2)
+    assert not pruner.report('a', 1, 1.0)
+    assert not pruner.report('b', 1, 2.0)
+    # Not enough models reported at step 2
+    assert not pruner.report('c', 2, 3.0)
+    # `c` is worse than the median of `a` and `b` at step 1
+    assert pruner.report('c', 1, 3.0)
+    assert not pruner.report('d', 1, 1.5)
+    assert pruner.is_pruned('c')
+    assert not pruner.is_pruned('c', step=1)
+    assert not pruner.is_pruned('d')
+
+
+def test_percentile_pruner_best_score():
+    pruner = PercentilePruner(25.0, n_startup_trials=1)
+    pruner.report('a', 1, 1.0)
+    pruner.report('b', 1, 0.5)
+    assert not pruner.report('a', 2, 1.0)
+    # The best score of `b` so far is compared
+    assert not pruner.report('b', 2, 4.0)
+    assert pruner.report('c', 2, 2.0)
+
+
+def test_percentile_pruner_warmup():
+    pruner = PercentilePruner(0.0, n_startup_trials=1, n_warmup_steps=2)
+    pruner.report('a', 1, 1.0)
+    assert not pruner.report('b', 1, 2.0)
+
+
+def test_percentile_pruner_percentile_error():
+    with pytest.raises(ValueError):
+        PercentilePruner(101)
+
+
+def test_reporter():
+    pruner = MedianPruner(n_startup_trials=1)
+    pruner.report('a', 4, 1.0)
+    report = Reporter(pruner, 'b', offset=3)
+    assert report(1, 2.0)
+    assert pruner.is_pruned('b', 3)
+
+
+def test_percentile_pruner_state():
+    pruner = MedianPruner(n_startup_trials=1)
+    pruner.report('a', 1, 1.0)
+    pruner.report('b', 1, 2.0)
+    state = pruner.get_state('b')
+    assert state == {'scores': [[1, 2.0]], 'pruned': 1}
+
+    restored = MedianPruner(n_startup_trials=1)
+    restored.set_state('b', state)
+    assert restored.is_pruned('b')
+    assert restored.get_state('b') == state
@@ -0,0 +1,89 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from lib.relation_statistics import pad_scores
+from lib.relation_statistics import RelationStatistics
+from lib.relation_statistics import select_max
+
+FACTS = [
+    ('a', 'people/person/nationality', 'x'),
+    ('a', 'people/person/place_of_birth', 'y'),
+    ('b', 'people/person/place_of_birth', 'z'),
+    ('c', 'music/album/release_type', 'w'),
+]
+TRAIN_RELATIONS = ['people/person/nationality', 'people/person/place_of_birth',
+                   'people/person/place_of_birth', 'film/film/genre']
+
+
+class TestRelationStatistics(unittest.TestCase):
+
+    def setUp(self):
+        self.statistics = RelationStatistics.from_facts(FACTS, TRAIN_RELATIONS)
+
+    def test_counts(self):
+        self.assertEqual(self.statistics.n_facts, 4)
+        self.assertEqual(self.statistics.subject_counts, {'a': 2, 'b': 1, 'c': 1})
+        # Same as `transform_probability_from_kg_to_train` in Step 3
+        self.assertAlmostEqual(self.statistics.kg_to_train['people/person/nationality'],
+                               (1 / 4) / (1 / 4))
+        self.assertAlmostEqual(self.statistics.kg_to_train['people/person/place_of_birth'],
+                               (2 / 4) / (2 / 4))
+        self.assertNotIn('film/film/genre', self.statistics.kg_to_train)
+
+    def test_apply_prior(self):
+        candidate_relations = [['people/person/nationality', 'music/album/release_type'],
+                               ['people/person/place_of_birth'], ['unknown']]
+        scores, mask = pad_scores([[0.5, 0.25], [0.5], [1.0]])
+        n_objects, _ = pad_scores([[1, 2], [3], [1]])
+        relation_ids = self.statistics.get_relation_ids(candidate_relations)
+        prior = self.statistics.apply_prior(scores, relation_ids, n_objects)
+
+        expected = [[
+            score * self.statistics.kg_to_train.get(r, 0) * n
+            for score, r, n in zip(row_scores, row_relations, row_n_objects)
+        ] for row_scores, row_relations, row_n_objects in zip(
+            [[0.5, 0.25], [0.5], [1.0]], candidate_relations, [[1, 2], [3], [1]])]
+        for i, row in enumerate(expected):
+            np.testing.assert_allclose(prior[i][mask[i]], row)
+
+    def test_select_max(self):
+        scores, mask = pad_scores([[0.1, 0.3, 0.3], [0.2], []])
+        counts = {1: 0, 2: 0}
+        random_state = np.random.RandomState(123)
+        for _ in range(100):
+            selected = select_max(scores, mask, random_state)
+            self.assertEqual(selected[1:].tolist(), [0, -1])
+            counts[selected[0]] += 1
+        self.assertGreater(counts[1], 0)
+        self.assertGreater(counts[2], 0)
+        self.assertEqual(select_max(*pad_scores([[], []])).tolist(), [-1, -1])
+
+    def test_load_or_build(self):
+        with tempfile.TemporaryDirectory() as directory:
+            directory = os.path.join(directory, 'statistics')
+            built = []
+            build = lambda: built.append(True) or self.statistics
+            RelationStatistics.load_or_build(directory, 'fb_two_kg', build)
+            statistics = RelationStatistics.load_or_build(directory, 'fb_two_kg', build)
+        self.assertEqual(len(built), 1)
+        self.assertEqual(statistics.relation_counts, self.statistics.relation_counts)
+        np.testing.assert_equal(statistics.prior, self.statistics.prior)
+
+    def test_load_or_build_stale_version(self):
+        with tempfile.TemporaryDirectory() as directory:
+            # A catalog pickled before `version` and `object_counts` existed
+            stale = RelationStatistics.from_facts(FACTS, TRAIN_RELATIONS)
+            del stale.version
+            del stale.object_counts
+            stale.save(RelationStatistics.get_path(directory, 'fb_two_kg'))
+
+            built = []
+            build = lambda: built.append(True) or self.statistics
+            statistics = RelationStatistics.load_or_build(directory, 'fb_two_kg', build)
+            self.assertEqual(len(built), 1)
+            self.assertEqual(statistics.object_counts, self.statistics.object_counts)
+            RelationStatistics.load_or_build(directory, 'fb_two_kg', build)
+            self.assertEqual(len(built), 1)
@@ -0,0 +1,178 @@
+import asyncio
+import json
+import unittest
+
+from lib.alias_index import AliasIndex
+from lib.alias_index import generate_ngram_candidates
+from lib.knowledge_graph import InMemoryKnowledgeGraph
+from lib.server import get_subject_names
+from lib.server import MicroBatcher
+from lib.server import QuestionAnswerer
+from lib.server import Server
+
+FACTS = [
+    ('m.sasha', 'people/person/place_of_birth', 'm.ljubljana'),
+    ('m.sasha', 'people/person/nationality', 'm.slovenia'),
+    ('m.sasha', 'people/person/nationality', 'm.italy'),
+    ('m.sasha_2', 'people/person/place_of_birth', 'm.paris'),
+]
+
+
+def tag(batch_tokens):
+    # Tag the last two tokens before the question mark
+    return [
+        get_subject_names(tokens, [(['O'] * (len(tokens) - 3) + ['I', 'I', 'O'], 1.0)])
+        for tokens in batch_tokens
+    ]
+
+
+def score_relations(predicates, candidate_relations):
+    return [[1.0 if 'nationality' in relation else 0.0
+             for relation in relations]
+            for relations in candidate_relations]
+
+
+def make_answerer(**kwargs):
+    alias_index = AliasIndex([('m.sasha', 'sasha vujacic'), ('m.sasha_2', 'sasha vujacic')])
+    return QuestionAnswerer(
+        tokenize=lambda question: question.split(),
+        tag=tag,
+        generate_candidates=lambda row: generate_ngram_candidates(alias_index, row),
+        knowledge_graph=InMemoryKnowledgeGraph(FACTS),
+        score_relations=score_relations,
+        **kwargs)
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+class TestServer(unittest.TestCase):
+
+    def test_get_subject_names(self):
+        tokens = ['where', 'was', 'sasha', 'vujacic', 'born', '?']
+        subject_names = get_subject_names(tokens, [
+            (['O', 'O', 'I', 'I', 'O', 'O'], 2.0),
+            (['I', 'O', 'I', 'I', 'O', 'O'], 1.0),
+        ])
+        self.assertEqual(subject_names, [{
+            'name': 'sasha vujacic',
+            'score': 2.0,
+            'start_index': 2,
+            'end_index': 4
+        }])
+
+    def test_question_answerer(self):
+        answers = make_answerer()(['what is sasha vujacic ?', 'who is john smith ?'])
+        self.assertEqual(answers[0]['subject_mid'], 'm.sasha')
+        self.assertEqual(answers[0]['relation'], 'people/person/nationality')
+        self.assertEqual(answers[0]['object_mids'], ['m.italy', 'm.slovenia'])
+        self.assertIsNone(answers[1]['subject_mid'])
+
+    def test_question_answerer_relation_first(self):
+        questions = ['what is sasha vujacic ?', 'who is john smith ?']
+        self.assertEqual(make_answerer(relation_first=True)(questions), make_answerer()(questions))
+
+    def test_question_answerer_stream(self):
+        questions = ['what is sasha vujacic ?', 'who is john smith ?'] * 20
+        for kwargs in [{}, {'relation_first': True}]:
+            answerer = make_answerer(**kwargs)
+            self.assertEqual(
+                list(answerer.stream(iter(questions), batch_size=8, n_workers=2)),
+                answerer(questions))
+
+    def test_micro_batcher(self):
+        batches = []
+
+        def function(items):
+            batches.append(items)
+            return [item * 2 for item in items]
+
+        async def main():
+            batcher = MicroBatcher(function, max_batch_size=4, max_wait=0.05)
+            outputs = await asyncio.gather(*[batcher.submit(i) for i in range(10)])
+            await batcher.close()
+            return outputs, batcher.get_stats()
+
+        outputs, stats = run(main())
+        self.assertEqual(outputs, [i * 2 for i in range(10)])
+        self.assertEqual(sorted(sum(batches, [])), list(range(10)))
+        self.assertTrue(all(len(batch) <= 4 for batch in batches))
+        self.assertLess(len(batches), 10)
+        self.assertEqual(stats['requests'], 10)
+        self.assertEqual(stats['batches'], len(batches))
+
+    def test_micro_batcher_close(self):
+
+        async def main():
+            batcher = MicroBatcher(lambda items: [item * 2 for item in items], max_batch_size=2)
+            self.assertIsNone(batcher.get_stats()['throughput'])
+            # Every request queued before `close` is answered
+            futures = [asyncio.ensure_future(batcher.submit(i)) for i in range(5)]
+            await asyncio.sleep(0)
+            await batcher.close()
+            self.assertTrue(all(future.done() for future in futures))
+            return [future.result() for future in futures], batcher.get_stats()
+
+        outputs, stats = run(main())
+        self.assertEqual(outputs, [i * 2 for i in range(5)])
+        self.assertEqual(stats['requests'], 5)
+        self.assertGreater(stats['throughput'], 0)
+
+    def test_micro_batcher_failure(self):
+
+        async def main():
+            batcher = MicroBatcher(lambda items: items[:1], max_wait=0.01)
+            with self.assertRaises(ValueError):
+                await asyncio.gather(batcher.submit(1), batcher.submit(2))
+            await batcher.close()
+            return batcher.get_stats()
+
+        self.assertEqual(run(main())['errors'], 2)
+
+    def test_http(self):
+        server = Server(make_answerer(), max_wait=0.01, max_body_size=256)
+
+        async def request(port, raw):
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(raw)
+            response = await reader.read()
+            writer.close()
+            head, _, body = response.decode('utf-8').partition('\r\n\r\n')
+            return int(head.split()[1]), json.loads(body)
+
+        def post(port, body):
+            body = body.encode('utf-8')
+            head = 'POST /answer HTTP/1.1\r\nContent-Length: %d\r\n\r\n' % len(body)
+            return request(port, head.encode('utf-8') + body)
+
+        async def main():
+            http_server = await server.start(port=0)
+            port = http_server.sockets[0].getsockname()[1]
+            responses = await asyncio.gather(
+                post(port, json.dumps({'question': 'what is sasha vujacic ?'})),
+                post(port, '{}'),
+                request(port, b'GET /missing HTTP/1.1\r\n\r\n'),
+                request(port, b'POST /answer HTTP/1.1\r\nContent-Length: abc\r\n\r\n'),
+                request(port, b'POST /answer HTTP/1.1\r\nContent-Length: -1\r\n\r\n'),
+                post(port, json.dumps({'question': 'a' * 256})))
+            stats = await request(port, b'GET /stats HTTP/1.1\r\n\r\n')
+            http_server.close()
+            await http_server.wait_closed()
+            await server.batcher.close()
+            return responses, stats
+
+        responses, stats = run(main())
+        self.assertEqual(responses[0][0], 200)
+        self.assertEqual(responses[0][1]['subject_mid'], 'm.sasha')
+        self.assertEqual(responses[1][0], 400)
+        self.assertEqual(responses[2][0], 404)
+        self.assertEqual(responses[3][0], 400)
+        self.assertEqual(responses[4][0], 400)
+        self.assertEqual(responses[5][0], 413)
+        self.assertEqual(stats[0], 200)
+        self.assertEqual(stats[1]['requests'], 1)
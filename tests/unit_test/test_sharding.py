@@ -0,0 +1,80 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from lib.artifacts import write_artifact
+from lib.candidate_facts import CandidateFacts
+from lib.codec import RelationVocabulary
+from lib.sharding import get_shard
+from lib.sharding import get_shard_index
+from lib.sharding import get_shard_path
+from lib.sharding import get_tie_breaker
+from lib.sharding import merge_metrics
+from lib.sharding import merge_shards
+from lib.sharding import run_shards
+from lib.sharding import split_shards
+from lib.sharding import stable_hash
+
+RELATIONS = ['people/person/place_of_birth', 'people/person/nationality', 'film/film/genre']
+
+
+def predict(df):
+    """ Select a relation per question where every candidate relation ties. """
+    vocabulary = RelationVocabulary(RELATIONS)
+    candidate_facts = CandidateFacts.from_dicts(
+        [{r: {'0f2y0': set(['06q1r'])} for r in RELATIONS} for _ in range(df.shape[0])],
+        vocabulary)
+    tie_breaker = get_tie_breaker(123, df.index, candidate_facts.get_n_relations())
+    predicted = candidate_facts.predict(np.ones(len(candidate_facts.relation_ids)),
+                                        tie_breaker=tie_breaker)
+    return pd.DataFrame({
+        'relation': [r for r, _, _ in candidate_facts.to_tuples(predicted, vocabulary)]
+    }, index=df.index)
+
+
+class TestSharding(unittest.TestCase):
+
+    def setUp(self):
+        self.df = pd.DataFrame({'question': ['question %d' % i for i in range(40)]},
+                               index=range(100, 140))
+
+    def test_stable_hash(self):
+        self.assertEqual(stable_hash('where was <e> born'), stable_hash('where was <e> born'))
+        self.assertEqual(stable_hash(1, 'a'), stable_hash('1', 'a'))
+        self.assertNotEqual(stable_hash('a', 'b'), stable_hash('ab'))
+
+    def test_get_shard(self):
+        shards = [get_shard(self.df, 3, i) for i in range(3)]
+        self.assertEqual(sorted(i for shard in shards for i in shard.index), list(self.df.index))
+        self.assertTrue(all(get_shard_index(i, 3) == 1 for i in shards[1].index))
+        with self.assertRaises(ValueError):
+            get_shard(self.df, 3, 3)
+
+    def test_split_shards(self):
+        shards = split_shards(self.df, 3)
+        for i, shard in enumerate(shards):
+            pd.testing.assert_frame_equal(shard, get_shard(self.df, 3, i))
+
+    def test_run_shards(self):
+        expected = predict(self.df)
+        self.assertGreater(len(set(expected['relation'])), 1)
+        sharded = run_shards(predict, self.df, n_shards=3)
+        pd.testing.assert_frame_equal(expected, sharded)
+
+    def test_merge_shards(self):
+        with tempfile.TemporaryDirectory() as directory:
+            paths = [get_shard_path(directory, 'step_3', i, 2) for i in range(2)]
+            for i, path in enumerate(paths):
+                write_artifact(predict(get_shard(self.df, 2, i)), path)
+            merged = merge_shards(paths, self.df.index)
+            with self.assertRaises(ValueError):
+                merge_shards(paths + [os.path.join(directory, 'missing.arrow')])
+        self.assertEqual(merged['relation'].tolist(), predict(self.df)['relation'].tolist())
+
+    def test_merge_metrics(self):
+        self.assertEqual(
+            merge_metrics([{'relation_correct': 2, 'n_examples': 3}, {'n_examples': 1}]),
+            {'relation_correct': 2, 'n_examples': 4})
@@ -0,0 +1,93 @@
+import os
+import pickle
+import tempfile
+import unittest
+
+import numpy as np
+import torch
+
+from lib.shared_arrays import RaggedArray
+from lib.shared_arrays import read_arrays
+from lib.shared_arrays import SharedDataset
+from lib.shared_arrays import write_arrays
+from lib.shared_arrays import write_dataset
+
+
+def add_mask(row):
+    row['mask'] = torch.zeros(4).index_fill_(0, row['pool'], 1)
+    return row
+
+
+class TestSharedArrays(unittest.TestCase):
+
+    def setUp(self):
+        self.dataset = [
+            {'text': torch.LongTensor([4, 5, 6]), 'relation': torch.LongTensor([1]), 'pool': [1, 3]},
+            {'text': torch.LongTensor([7]), 'relation': torch.LongTensor([2]), 'pool': []},
+        ]
+
+    def test_read_write_arrays(self):
+        with tempfile.TemporaryDirectory() as directory:
+            weights = np.random.rand(5, 3).astype(np.float32)
+            write_arrays(directory, {'embedding_weights': weights})
+            arrays = read_arrays(directory)
+            self.assertIsInstance(arrays['embedding_weights'], np.memmap)
+            np.testing.assert_array_equal(arrays['embedding_weights'], weights)
+            # Writes are not shared with the file or other processes
+            torch.from_numpy(arrays['embedding_weights'])[0] = 0
+            np.testing.assert_array_equal(read_arrays(directory)['embedding_weights'], weights)
+
+    def test_ragged_array(self):
+        ragged = RaggedArray.from_rows([[1, 2], [], [3]], np.int64)
+        self.assertEqual(len(ragged), 3)
+        self.assertEqual(ragged[0].tolist(), [1, 2])
+        self.assertEqual(ragged[1].tolist(), [])
+        self.assertEqual(ragged[2].tolist(), [3])
+
+    def test_ragged_array_shapes(self):
+        ragged = RaggedArray.from_rows([3, 4], np.int64)
+        self.assertEqual(ragged[0].shape, ())
+        self.assertEqual(ragged[1].tolist(), 4)
+        ragged = RaggedArray.from_rows([[[1, 2], [3, 4]], np.zeros((0, 2))], np.int64)
+        self.assertEqual(ragged[0].tolist(), [[1, 2], [3, 4]])
+        self.assertEqual(ragged[1].shape, (0, 2))
+        with self.assertRaises(ValueError):
+            RaggedArray.from_rows([1, [2]], np.int64)
+
+    def test_shared_dataset_scalars(self):
+        with tempfile.TemporaryDirectory() as directory:
+            dataset = [{'relation': torch.tensor(1)}, {'relation': 2}]
+            write_dataset(directory, dataset, ['relation'])
+            dataset = SharedDataset(directory)
+            self.assertEqual(dataset[0]['relation'].dim(), 0)
+            self.assertEqual([r.item() for r in dataset['relation']], [1, 2])
+
+    def test_shared_dataset_without_shapes(self):
+        with tempfile.TemporaryDirectory() as directory:
+            write_dataset(directory, self.dataset, ['text'])
+            os.remove(os.path.join(directory, 'text.shapes.npy'))
+            self.assertEqual(SharedDataset(directory)[1]['text'].tolist(), [7])
+
+    def test_shared_dataset(self):
+        with tempfile.TemporaryDirectory() as directory:
+            write_dataset(directory, self.dataset, ['text', 'relation', 'pool'])
+            dataset = SharedDataset(directory, transform=add_mask)
+            self.assertEqual(len(dataset), 2)
+            self.assertEqual(dataset[0]['text'].tolist(), [4, 5, 6])
+            self.assertEqual(dataset[1]['relation'].tolist(), [2])
+            self.assertEqual(dataset[0]['mask'].tolist(), [0, 1, 0, 1])
+            self.assertEqual(dataset[1]['mask'].tolist(), [0, 0, 0, 0])
+            self.assertEqual([r.tolist() for r in dataset['text']], [[4, 5, 6], [7]])
+            self.assertEqual(len(dataset[:1]), 1)
+            # Rows view the mapped pages
+            self.assertTrue(
+                np.shares_memory(dataset[0]['text'].numpy(), dataset.columns['text'].values))
+
+    def test_shared_dataset_pickle(self):
+        with tempfile.TemporaryDirectory() as directory:
+            write_dataset(directory, self.dataset, ['text'])
+            dataset = SharedDataset(directory)
+            pickled = pickle.dumps(dataset)
+            # Only the directory is pickled
+            self.assertLess(len(pickled), 200)
+            self.assertEqual(pickle.loads(pickled)[0]['text'].tolist(), [4, 5, 6])
@@ -0,0 +1,73 @@
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from lib.configurable import add_config
+from lib.configurable import clear_config
+from lib.configurable import configurable
+from lib.stage_cache import StageCache
+
+calls = []
+
+
+@configurable
+def predict_subject_name(split, top_k=1):
+    calls.append('predict_subject_name')
+    return pd.DataFrame({'question': ['where was sasha vujacic born'], 'split': [split]})
+
+
+def generate_candidates(df, n_candidates):
+    calls.append('generate_candidates')
+    df['candidate_mids'] = [['0f2y0'] * n_candidates]
+    return df
+
+
+class TestStageCache(unittest.TestCase):
+
+    def setUp(self):
+        del calls[:]
+        clear_config()
+
+    def tearDown(self):
+        clear_config()
+
+    def test_run(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = StageCache(directory)
+
+            def run(n_candidates):
+                step_1 = cache.run('step_1', predict_subject_name, inputs={'split': 'dev'})
+                return cache.run('step_2', generate_candidates, inputs={'df': step_1},
+                                 config={'n_candidates': n_candidates})
+
+            step_2 = run(2)
+            self.assertEqual(calls, ['predict_subject_name', 'generate_candidates'])
+            self.assertEqual(cache.load(step_2)['candidate_mids'][0], ['0f2y0', '0f2y0'])
+
+            # Unchanged stages are not recomputed
+            run(2)
+            self.assertEqual(len(calls), 2)
+
+            # Only the stage with a changed config is recomputed
+            step_2 = run(1)
+            self.assertEqual(calls[2:], ['generate_candidates'])
+            self.assertEqual(cache.load(step_2, columns=['candidate_mids']).shape, (1, 1))
+
+            # `lib.configurable` configuration invalidates every stage
+            add_config({'tests.unit_test.test_stage_cache.predict_subject_name.top_k': 2})
+            run(1)
+            self.assertEqual(calls[3:], ['predict_subject_name', 'generate_candidates'])
+
+    def test_file_input(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = StageCache(directory)
+            path = os.path.join(directory, 'dev.txt')
+            with open(path, 'w') as file_:
+                file_.write('a')
+            key = cache.get_key('step_1', predict_subject_name, inputs={'split': path})
+            with open(path, 'w') as file_:
+                file_.write('ab')
+            self.assertNotEqual(
+                key, cache.get_key('step_1', predict_subject_name, inputs={'split': path}))
@@ -0,0 +1,45 @@
+import os
+
+from lib.worker_pool import get_process_cache
+from lib.worker_pool import get_trial_cache
+from lib.worker_pool import StickyProcessPool
+
+
+def count_calls():
+    cache = get_trial_cache()
+    cache['n_calls'] = cache.get('n_calls', 0) + 1
+    return os.getpid(), cache['n_calls']
+
+
+def count_process_calls():
+    cache = get_process_cache()
+    cache['n_calls'] = cache.get('n_calls', 0) + 1
+    return cache['n_calls']
+
+
+def test_sticky_process_pool():
+    with StickyProcessPool(n_workers=2) as executor:
+        a = [executor.submit_to('a', count_calls).result() for _ in range(3)]
+        b = executor.submit_to('b', count_calls).result()
+        # `a` stays on its worker with its trial cache
+        assert len(set(pid for pid, _ in a)) == 1
+        assert [n_calls for _, n_calls in a] == [1, 2, 3]
+        assert b[1] == 1
+
+        executor.release('a')
+        executor.release('missing')
+        assert executor.submit_to('a', count_calls).result()[1] == 1
+
+
+def test_sticky_process_pool_submit():
+    with StickyProcessPool(n_workers=1) as executor:
+        # Without a key, the trial cache is not kept
+        assert executor.submit(count_calls).result()[1] == 1
+        assert executor.submit(count_calls).result()[1] == 1
+        assert executor.submit(count_process_calls).result() == 1
+        assert executor.submit(count_process_calls).result() == 2
+
+
+def test_get_trial_cache():
+    get_trial_cache()['model'] = 'model'
+    assert get_trial_cache() == {}